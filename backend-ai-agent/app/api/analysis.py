@@ -1,27 +1,99 @@
 """Code analysis endpoints."""
 
+import asyncio
 import uuid
-from typing import Dict, Any, List
-from fastapi import APIRouter, HTTPException
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.utils.logger import get_logger
+from app.utils.sse import SSE_HEADERS, format_sse, relay_llm_events
+from app.utils.pipeline import StageTimer, offload, run_stages
+from app.utils.disconnect import CancelOnDisconnectRoute
+from app.utils.deadline import degradation
+from app.services.similar_code import retrieval
 from app.models.schemas import (
     CodeAnalysisRequest, 
     CodeAnalysisResponse,
-    CodeLanguage
+    CodeLanguage,
+    JobInfo,
+    JobStatus
 )
 from app.services.code_analyzer import CodeAnalyzer
 from app.services.llm_service import LLMService
+from app.services.admission import LLMOverloadedError
+from app.services.job_queue import get_job_queue
+from app.services.result_store import get_result_store
 
-router = APIRouter()
+router = APIRouter(route_class=CancelOnDisconnectRoute)
 logger = get_logger(__name__)
 
 # Initialize services
 code_analyzer = CodeAnalyzer()
 llm_service = LLMService()
+job_queue = get_job_queue()
+result_store = get_result_store()
 
-@router.post("/analyze", response_model=CodeAnalysisResponse)
-async def analyze_code(request: CodeAnalysisRequest):
+# Job kinds whose results are served by GET /analyze/{analysis_id}
+ANALYSIS_JOBS = ("analyze", "analyze_python2")
+
+def build_analysis_response(analysis_id: str, language: CodeLanguage,
+                            analysis_result: Dict[str, Any], llm_analysis: Dict[str, Any]) -> CodeAnalysisResponse:
+    """Combine static and LLM analysis results into the API response.
+    
+    Args:
+        analysis_id: Unique analysis identifier
+        language: Programming language
+        analysis_result: Result of CodeAnalyzer.analyze
+        llm_analysis: Result of the business logic analysis
+        
+    Returns:
+        Combined analysis response
+    """
+    return CodeAnalysisResponse(
+        analysis_id=analysis_id,
+        language=language,
+        complexity_score=analysis_result.get("complexity_score", 0.0),
+        dependencies=analysis_result.get("dependencies", []),
+        security_issues=analysis_result.get("security_issues", []),
+        compatibility_issues=analysis_result.get("compatibility_issues", []),
+        business_logic_summary=llm_analysis.get("business_logic_summary"),
+        recommendations=llm_analysis.get("recommendations", []),
+        **degradation(),
+        **retrieval()
+    )
+
+def build_python2_analysis_response(analysis_id: str, py2_analysis: Dict[str, Any],
+                                    llm_analysis: Dict[str, Any]) -> CodeAnalysisResponse:
+    """Combine Python 2 static analysis and LLM migration analysis into the API response.
+    
+    Args:
+        analysis_id: Unique analysis identifier
+        py2_analysis: Result of CodeAnalyzer.analyze_python2_specific
+        llm_analysis: Result of the Python 2 migration analysis
+        
+    Returns:
+        Combined analysis response
+    """
+    return CodeAnalysisResponse(
+        analysis_id=analysis_id,
+        language=CodeLanguage.PYTHON,
+        complexity_score=py2_analysis.get("complexity_score", 0.0),
+        dependencies=py2_analysis.get("dependencies", []),
+        security_issues=py2_analysis.get("security_issues", []),
+        compatibility_issues=py2_analysis.get("python3_issues", []),
+        business_logic_summary=llm_analysis.get("business_logic_summary"),
+        recommendations=llm_analysis.get("migration_recommendations", []),
+        **degradation(),
+        **retrieval()
+    )
+
+@router.post("/analyze", response_model=CodeAnalysisResponse, responses={202: {"model": JobInfo}})
+async def analyze_code(
+    request: CodeAnalysisRequest,
+    async_mode: bool = Query(False, alias="async", description="Run as a background job"),
+    idempotency_key: Optional[str] = Header(None)
+):
     """Analyze source code for complexity, dependencies, and issues.
     
     This endpoint performs comprehensive code analysis including:
@@ -30,56 +102,125 @@ async def analyze_code(request: CodeAnalysisRequest):
     - Dependency detection
     - Security issue identification
     - Business logic inference
+    
+    With ``?async=true`` the analysis runs as a background job: the response
+    is 202 with the job status and the result is served by
+    ``GET /analyze/{analysis_id}``.
+    If the same request was answered in the last RESULT_STORE_REUSE_HOURS,
+    that analysis is returned at once instead (200).
     """
     
-    analysis_id = str(uuid.uuid4())
+    if async_mode:
+        # The same request answered recently is returned at once instead of queueing a job
+        stored = await result_store.find("analysis", "analyze", request)
+        if stored is not None:
+            return CodeAnalysisResponse(**stored)
+        return await job_queue.accept("analyze", request.model_dump(mode="json"), idempotency_key)
+    return await run_analysis(str(uuid.uuid4()), request)
+
+async def run_analysis(analysis_id: str, request: CodeAnalysisRequest) -> CodeAnalysisResponse:
+    """Run static and LLM analysis of a request under the given ID."""
+    
     logger.info(f"Starting code analysis {analysis_id} for {request.language.value}")
     
     try:
-        # Perform basic code analysis
-        analysis_result = await code_analyzer.analyze(
-            code=request.code,
-            language=request.language,
-            filename=request.filename,
-            context=request.context
-        )
-        
-        # Use LLM for business logic inference and recommendations
-        llm_analysis = await llm_service.analyze_business_logic(
-            code=request.code,
-            language=request.language,
-            context=request.context
-        )
+        # Static analysis and LLM business logic inference are independent
+        results = await run_stages("analyze", {
+            "static": offload(
+                code_analyzer.analyze,
+                code=request.code,
+                language=request.language,
+                filename=request.filename,
+                context=request.context
+            ),
+            "llm": llm_service.analyze_business_logic(
+                code=request.code,
+                language=request.language,
+                context=request.context
+            ),
+        })
         
         # Combine results
-        response = CodeAnalysisResponse(
-            analysis_id=analysis_id,
-            language=request.language,
-            complexity_score=analysis_result.get("complexity_score", 0.0),
-            dependencies=analysis_result.get("dependencies", []),
-            security_issues=analysis_result.get("security_issues", []),
-            compatibility_issues=analysis_result.get("compatibility_issues", []),
-            business_logic_summary=llm_analysis.get("business_logic_summary"),
-            recommendations=llm_analysis.get("recommendations", []),
-        )
+        response = build_analysis_response(analysis_id, request.language, results["static"], results["llm"])
+        await result_store.save("analysis", analysis_id, "analyze", request, response)
         
         logger.info(f"Code analysis {analysis_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Code analysis {analysis_id} failed: {error_msg}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-@router.post("/analyze/python2", response_model=CodeAnalysisResponse)
-async def analyze_python2_code(request: CodeAnalysisRequest):
+@router.post("/analyze/stream")
+async def analyze_code_stream(request: CodeAnalysisRequest):
+    """Streaming variant of /analyze using Server-Sent Events.
+    
+    Events:
+    - static: static analysis results, sent as soon as they are ready
+    - token: raw LLM output as it is generated
+    - field: each LLM field (business_logic_summary, recommendations, ...) once complete
+    - error: the LLM stage failed; static results are still delivered
+    - result: the final CodeAnalysisResponse
+    """
+    
+    analysis_id = str(uuid.uuid4())
+    logger.info(f"Starting streaming code analysis {analysis_id} for {request.language.value}")
+    
+    async def events():
+        timer = StageTimer("analyze_stream")
+        # Static analysis runs alongside the LLM stream and is sent as soon as it is ready
+        static_task = asyncio.create_task(timer.run("static", offload(
+            code_analyzer.analyze,
+            code=request.code,
+            language=request.language,
+            filename=request.filename,
+            context=request.context
+        )))
+        static_sent = False
+        
+        try:
+            llm_analysis: Dict[str, Any] = {}
+            llm_events = llm_service.stream_business_logic(code=request.code, language=request.language)
+            llm_start = asyncio.get_running_loop().time()
+            async for event in relay_llm_events(llm_events, llm_analysis):
+                if not static_sent and static_task.done():
+                    yield format_sse("static", {"analysis_id": analysis_id, **static_task.result()})
+                    static_sent = True
+                yield event
+            timer.record("llm", asyncio.get_running_loop().time() - llm_start)
+            
+            analysis_result = await static_task
+            if not static_sent:
+                yield format_sse("static", {"analysis_id": analysis_id, **analysis_result})
+        finally:
+            static_task.cancel()
+            timer.finish()
+        
+        response = build_analysis_response(analysis_id, request.language, analysis_result, llm_analysis)
+        await result_store.save("analysis", analysis_id, "analyze", request, response)
+        yield format_sse("result", response.model_dump(mode='json'))
+        logger.info(f"Streaming code analysis {analysis_id} completed")
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/analyze/python2", response_model=CodeAnalysisResponse, responses={202: {"model": JobInfo}})
+async def analyze_python2_code(
+    request: CodeAnalysisRequest,
+    async_mode: bool = Query(False, alias="async", description="Run as a background job"),
+    idempotency_key: Optional[str] = Header(None)
+):
     """Specialized analysis for Python 2 code.
     
     This endpoint specifically analyzes Python 2 code for:
     - Python 2 to 3 compatibility issues
     - Deprecated syntax and libraries
     - Modernization opportunities
+    
+    Supports ``?async=true`` like ``/analyze``.
     """
     
     # Ensure language is Python
@@ -89,59 +230,73 @@ async def analyze_python2_code(request: CodeAnalysisRequest):
             detail="This endpoint is specifically for Python code analysis"
         )
     
-    analysis_id = str(uuid.uuid4())
+    if async_mode:
+        # The same request answered recently is returned at once instead of queueing a job
+        stored = await result_store.find("analysis", "analyze_python2", request)
+        if stored is not None:
+            return CodeAnalysisResponse(**stored)
+        return await job_queue.accept("analyze_python2", request.model_dump(mode="json"), idempotency_key)
+    return await run_python2_analysis(str(uuid.uuid4()), request)
+
+async def run_python2_analysis(analysis_id: str, request: CodeAnalysisRequest) -> CodeAnalysisResponse:
+    """Run Python 2 static and LLM migration analysis of a request under the given ID."""
+    
     logger.info(f"Starting Python 2 analysis {analysis_id}")
     
     try:
-        # Perform Python 2 specific analysis
-        py2_analysis = await code_analyzer.analyze_python2_specific(
-            code=request.code,
-            filename=request.filename,
-            context=request.context
-        )
+        # Python 2 specific static analysis and LLM migration insights run concurrently
+        results = await run_stages("analyze_python2", {
+            "static": offload(
+                code_analyzer.analyze_python2_specific,
+                code=request.code,
+                filename=request.filename,
+                context=request.context
+            ),
+            "llm": llm_service.analyze_python2_migration(
+                code=request.code,
+                context=request.context
+            ),
+        })
         
-        # Use LLM for Python 2 specific insights
-        llm_analysis = await llm_service.analyze_python2_migration(
-            code=request.code,
-            context=request.context
-        )
-        
-        response = CodeAnalysisResponse(
-            analysis_id=analysis_id,
-            language=CodeLanguage.PYTHON,
-            complexity_score=py2_analysis.get("complexity_score", 0.0),
-            dependencies=py2_analysis.get("dependencies", []),
-            security_issues=py2_analysis.get("security_issues", []),
-            compatibility_issues=py2_analysis.get("python3_issues", []),
-            business_logic_summary=llm_analysis.get("business_logic_summary"),
-            recommendations=llm_analysis.get("migration_recommendations", []),
-        )
+        response = build_python2_analysis_response(analysis_id, results["static"], results["llm"])
+        await result_store.save("analysis", analysis_id, "analyze_python2", request, response)
         
         logger.info(f"Python 2 analysis {analysis_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Python 2 analysis {analysis_id} failed: {error_msg}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Python 2 analysis failed: {str(e)}")
 
-@router.get("/analyze/{analysis_id}", response_model=CodeAnalysisResponse)
+@router.get(
+    "/analyze/{analysis_id}",
+    response_model=CodeAnalysisResponse,
+    responses={202: {"model": JobInfo}, 500: {"model": JobInfo}}
+)
 async def get_analysis_result(analysis_id: str):
-    """Retrieve a previous analysis result.
+    """Retrieve a stored analysis result.
     
-    Note: This is a placeholder implementation. In a real system,
-    you would store analysis results in a database or cache.
+    Results of all analyses are kept for RESULT_STORE_RETENTION_DAYS. For an
+    asynchronous analysis that has not finished yet the response is 202 with
+    the job status and progress; a failed job is reported as 500 with its
+    status.
     """
     
-    logger.info(f"Retrieving analysis result {analysis_id}")
+    stored = await result_store.get("analysis", analysis_id)
+    if stored is not None:
+        return CodeAnalysisResponse(**stored)
     
-    # For now, return a not found error
-    # In a real implementation, this would fetch from database/cache
-    raise HTTPException(
-        status_code=404,
-        detail=f"Analysis result {analysis_id} not found. Results are not currently persisted."
-    )
+    record = await job_queue.get(analysis_id)
+    if record is None or record["kind"] not in ANALYSIS_JOBS:
+        raise HTTPException(status_code=404, detail=f"Analysis result {analysis_id} not found")
+    
+    if record["status"] != JobStatus.SUCCEEDED.value:
+        return job_queue.status_response(record)
+    return CodeAnalysisResponse(**record["result"])
 
 @router.post("/analyze/batch", response_model=List[CodeAnalysisResponse])
 async def batch_analyze_code(requests: List[CodeAnalysisRequest]):
@@ -159,9 +314,12 @@ async def batch_analyze_code(requests: List[CodeAnalysisRequest]):
     for i, request in enumerate(requests):
         try:
             # Reuse the single analysis logic
-            result = await analyze_code(request)
+            result = await run_analysis(str(uuid.uuid4()), request)
             results.append(result)
             logger.debug(f"Batch analysis {batch_id}: completed item {i+1}/{len(requests)}")
+        except LLMOverloadedError:
+            # No point continuing the batch while the model server is saturated
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -177,4 +335,15 @@ async def batch_analyze_code(requests: List[CodeAnalysisRequest]):
             detail="All analyses in the batch failed"
         )
     
-    return results
\ No newline at end of file
+    return results
+
+async def _analysis_job(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    response = await run_analysis(job_id, CodeAnalysisRequest(**payload))
+    return response.model_dump(mode="json")
+
+async def _python2_analysis_job(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    response = await run_python2_analysis(job_id, CodeAnalysisRequest(**payload))
+    return response.model_dump(mode="json")
+
+job_queue.register("analyze", _analysis_job, "/api/v1/analyze/{job_id}", stages=("static", "llm"))
+job_queue.register("analyze_python2", _python2_analysis_job, "/api/v1/analyze/{job_id}", stages=("static", "llm"))
@@ -1,25 +1,41 @@
 """Code conversion endpoints."""
 
 import uuid
-from typing import List
-from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.utils.logger import get_logger
+from app.utils.sse import SSE_HEADERS, format_sse, relay_llm_events
+from app.utils.pipeline import offload, run_stages
+from app.utils.disconnect import CancelOnDisconnectRoute
+from app.utils.deadline import degradation
+from app.services.similar_code import retrieval
 from app.models.schemas import (
     CodeConversionRequest, 
     CodeConversionResponse,
     ConversionType,
-    CodeLanguage
+    CodeLanguage,
+    JobInfo,
+    JobStatus
 )
 from app.services.code_converter import CodeConverter
 from app.services.llm_service import LLMService
+from app.services.admission import LLMOverloadedError
+from app.services.job_queue import get_job_queue
+from app.services.result_store import get_result_store
 
-router = APIRouter()
+router = APIRouter(route_class=CancelOnDisconnectRoute)
 logger = get_logger(__name__)
 
 # Initialize services
 code_converter = CodeConverter()
 llm_service = LLMService()
+job_queue = get_job_queue()
+result_store = get_result_store()
+
+# Job kinds whose results are served by GET /convert/{conversion_id}
+CONVERSION_JOBS = ("convert", "convert_python2_to_3", "modernize")
 
 def clean_string_list(data: list) -> List[str]:
     """Convert list items to strings, handling dict objects.
@@ -44,17 +60,71 @@ def clean_string_list(data: list) -> List[str]:
             result.append(str(item))
     return result
 
-@router.post("/convert", response_model=CodeConversionResponse)
-async def convert_code(request: CodeConversionRequest):
+def build_conversion_response(conversion_id: str, request: CodeConversionRequest,
+                              conversion_result: Dict[str, Any], llm_validation: Dict[str, Any]) -> CodeConversionResponse:
+    """Combine rule-based conversion and LLM validation into the API response.
+    
+    Args:
+        conversion_id: Unique conversion identifier
+        request: Original conversion request
+        conversion_result: Result of the CodeConverter conversion
+        llm_validation: Result of the LLM validation
+        
+    Returns:
+        Combined conversion response
+    """
+    # Clean LLM validation results to ensure all list items are strings
+    llm_warnings = clean_string_list(llm_validation.get("warnings", []))
+    llm_errors = clean_string_list(llm_validation.get("errors", []))
+    llm_compatibility = clean_string_list(llm_validation.get("compatibility_notes", []))
+    llm_tests = clean_string_list(llm_validation.get("test_suggestions", []))
+    
+    return CodeConversionResponse(
+        conversion_id=conversion_id,
+        original_code=request.code,
+        converted_code=conversion_result.get("converted_code", ""),
+        language=request.language,
+        conversion_type=request.conversion_type,
+        changes_made=conversion_result.get("changes_made", []),
+        warnings=conversion_result.get("warnings", []) + llm_warnings,
+        errors=conversion_result.get("errors", []) + llm_errors,
+        compatibility_notes=llm_compatibility,
+        test_suggestions=llm_tests,
+        **degradation(),
+        **retrieval()
+    )
+
+@router.post("/convert", response_model=CodeConversionResponse, responses={202: {"model": JobInfo}})
+async def convert_code(
+    request: CodeConversionRequest,
+    async_mode: bool = Query(False, alias="async", description="Run as a background job"),
+    idempotency_key: Optional[str] = Header(None)
+):
     """Convert source code based on the specified conversion type.
     
     This endpoint performs code conversion including:
     - Python 2 to Python 3 conversion
     - Code modernization
     - Security fixes
+    
+    With ``?async=true`` the conversion runs as a background job: the response
+    is 202 with the job status and the result is served by
+    ``GET /convert/{conversion_id}``.
+    If the same request was answered in the last RESULT_STORE_REUSE_HOURS,
+    that conversion is returned at once instead (200).
     """
     
-    conversion_id = str(uuid.uuid4())
+    if async_mode:
+        # The same request answered recently is returned at once instead of queueing a job
+        stored = await result_store.find("conversion", "convert", request)
+        if stored is not None:
+            return CodeConversionResponse(**stored)
+        return await job_queue.accept("convert", request.model_dump(mode="json"), idempotency_key)
+    return await run_conversion(str(uuid.uuid4()), request)
+
+async def run_conversion(conversion_id: str, request: CodeConversionRequest) -> CodeConversionResponse:
+    """Run rule-based conversion and LLM validation of a request under the given ID."""
+    
     logger.info(f"Starting code conversion {conversion_id}: {request.conversion_type.value}")
     
     try:
@@ -76,37 +146,67 @@ async def convert_code(request: CodeConversionRequest):
             language=request.language
         )
         
-        # Clean LLM validation results to ensure all list items are strings
-        llm_warnings = clean_string_list(llm_validation.get("warnings", []))
-        llm_errors = clean_string_list(llm_validation.get("errors", []))
-        llm_compatibility = clean_string_list(llm_validation.get("compatibility_notes", []))
-        llm_tests = clean_string_list(llm_validation.get("test_suggestions", []))
-        
         # Combine results
-        response = CodeConversionResponse(
-            conversion_id=conversion_id,
-            original_code=request.code,
-            converted_code=conversion_result.get("converted_code", ""),
-            language=request.language,
-            conversion_type=request.conversion_type,
-            changes_made=conversion_result.get("changes_made", []),
-            warnings=conversion_result.get("warnings", []) + llm_warnings,
-            errors=conversion_result.get("errors", []) + llm_errors,
-            compatibility_notes=llm_compatibility,
-            test_suggestions=llm_tests
-        )
+        response = build_conversion_response(conversion_id, request, conversion_result, llm_validation)
+        await result_store.save("conversion", conversion_id, "convert", request, response)
         
         logger.info(f"Code conversion {conversion_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Code conversion {conversion_id} failed: {error_msg}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
 
-@router.post("/convert/python2-to-3", response_model=CodeConversionResponse)
-async def convert_python2_to_python3(request: CodeConversionRequest):
+@router.post("/convert/stream")
+async def convert_code_stream(request: CodeConversionRequest):
+    """Streaming variant of /convert using Server-Sent Events.
+    
+    The rule-based conversion is sent first as a ``static`` event, followed
+    by ``token``/``field`` events from the LLM validation and a final
+    ``result`` event with the CodeConversionResponse.
+    """
+    
+    conversion_id = str(uuid.uuid4())
+    logger.info(f"Starting streaming code conversion {conversion_id}: {request.conversion_type.value}")
+    
+    async def events():
+        conversion_result = await code_converter.convert(
+            code=request.code,
+            language=request.language,
+            conversion_type=request.conversion_type,
+            target_version=request.target_version,
+            options=request.options,
+            filename=request.filename
+        )
+        yield format_sse("static", {"conversion_id": conversion_id, **conversion_result})
+        
+        llm_validation: Dict[str, Any] = {}
+        llm_events = llm_service.stream_conversion_validation(
+            original_code=request.code,
+            converted_code=conversion_result.get("converted_code", ""),
+            conversion_type=request.conversion_type,
+            language=request.language
+        )
+        async for event in relay_llm_events(llm_events, llm_validation):
+            yield event
+        
+        response = build_conversion_response(conversion_id, request, conversion_result, llm_validation)
+        await result_store.save("conversion", conversion_id, "convert", request, response)
+        yield format_sse("result", response.model_dump(mode='json'))
+        logger.info(f"Streaming code conversion {conversion_id} completed")
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/convert/python2-to-3", response_model=CodeConversionResponse, responses={202: {"model": JobInfo}})
+async def convert_python2_to_python3(
+    request: CodeConversionRequest,
+    async_mode: bool = Query(False, alias="async", description="Run as a background job"),
+    idempotency_key: Optional[str] = Header(None)
+):
     """Specialized Python 2 to Python 3 conversion.
     
     This endpoint specifically handles Python 2 to Python 3 conversion with:
@@ -114,6 +214,8 @@ async def convert_python2_to_python3(request: CodeConversionRequest):
     - Library migration
     - Compatibility improvements
     - Best practices application
+    
+    Supports ``?async=true`` like ``/convert``.
     """
     
     # Validate request
@@ -126,7 +228,17 @@ async def convert_python2_to_python3(request: CodeConversionRequest):
     if request.conversion_type != ConversionType.PYTHON_2_TO_3:
         request.conversion_type = ConversionType.PYTHON_2_TO_3
     
-    conversion_id = str(uuid.uuid4())
+    if async_mode:
+        # The same request answered recently is returned at once instead of queueing a job
+        stored = await result_store.find("conversion", "convert_python2_to_3", request)
+        if stored is not None:
+            return CodeConversionResponse(**stored)
+        return await job_queue.accept("convert_python2_to_3", request.model_dump(mode="json"), idempotency_key)
+    return await run_python2_to_3_conversion(str(uuid.uuid4()), request)
+
+async def run_python2_to_3_conversion(conversion_id: str, request: CodeConversionRequest) -> CodeConversionResponse:
+    """Run Python 2 to 3 conversion and LLM validation of a request under the given ID."""
+    
     logger.info(f"Starting Python 2 to 3 conversion {conversion_id}")
     
     try:
@@ -143,36 +255,63 @@ async def convert_python2_to_python3(request: CodeConversionRequest):
             converted_code=py2_conversion.get("converted_code", "")
         )
         
-        # Clean LLM validation results
-        llm_warnings = clean_string_list(llm_validation.get("warnings", []))
-        llm_errors = clean_string_list(llm_validation.get("errors", []))
-        llm_compatibility = clean_string_list(llm_validation.get("compatibility_notes", []))
-        llm_tests = clean_string_list(llm_validation.get("test_suggestions", []))
-        
-        response = CodeConversionResponse(
-            conversion_id=conversion_id,
-            original_code=request.code,
-            converted_code=py2_conversion.get("converted_code", ""),
-            language=CodeLanguage.PYTHON,
-            conversion_type=ConversionType.PYTHON_2_TO_3,
-            changes_made=py2_conversion.get("changes_made", []),
-            warnings=py2_conversion.get("warnings", []) + llm_warnings,
-            errors=py2_conversion.get("errors", []) + llm_errors,
-            compatibility_notes=llm_compatibility,
-            test_suggestions=llm_tests
-        )
+        response = build_conversion_response(conversion_id, request, py2_conversion, llm_validation)
+        await result_store.save("conversion", conversion_id, "convert_python2_to_3", request, response)
         
         logger.info(f"Python 2 to 3 conversion {conversion_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Python 2 to 3 conversion {conversion_id} failed: {error_msg}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Python 2 to 3 conversion failed: {str(e)}")
 
-@router.post("/convert/modernize", response_model=CodeConversionResponse)
-async def modernize_code(request: CodeConversionRequest):
+@router.post("/convert/python2-to-3/stream")
+async def convert_python2_to_python3_stream(request: CodeConversionRequest):
+    """Streaming variant of /convert/python2-to-3 using Server-Sent Events."""
+    
+    if request.language != CodeLanguage.PYTHON:
+        raise HTTPException(
+            status_code=400,
+            detail="This endpoint is specifically for Python code conversion"
+        )
+    request.conversion_type = ConversionType.PYTHON_2_TO_3
+    
+    conversion_id = str(uuid.uuid4())
+    logger.info(f"Starting streaming Python 2 to 3 conversion {conversion_id}")
+    
+    async def events():
+        py2_conversion = await code_converter.convert_python2_to_python3(
+            code=request.code,
+            filename=request.filename,
+            options=request.options
+        )
+        yield format_sse("static", {"conversion_id": conversion_id, **py2_conversion})
+        
+        llm_validation: Dict[str, Any] = {}
+        llm_events = llm_service.stream_python3_validation(
+            original_code=request.code,
+            converted_code=py2_conversion.get("converted_code", "")
+        )
+        async for event in relay_llm_events(llm_events, llm_validation):
+            yield event
+        
+        response = build_conversion_response(conversion_id, request, py2_conversion, llm_validation)
+        await result_store.save("conversion", conversion_id, "convert_python2_to_3", request, response)
+        yield format_sse("result", response.model_dump(mode='json'))
+        logger.info(f"Streaming Python 2 to 3 conversion {conversion_id} completed")
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/convert/modernize", response_model=CodeConversionResponse, responses={202: {"model": JobInfo}})
+async def modernize_code(
+    request: CodeConversionRequest,
+    async_mode: bool = Query(False, alias="async", description="Run as a background job"),
+    idempotency_key: Optional[str] = Header(None)
+):
     """Modernize code to use current best practices.
     
     This endpoint modernizes code by:
@@ -180,28 +319,43 @@ async def modernize_code(request: CodeConversionRequest):
     - Replacing deprecated functions
     - Improving code structure
     - Adding type hints (for Python)
+    
+    Supports ``?async=true`` like ``/convert``.
     """
     
     # Set conversion type to modernization
     request.conversion_type = ConversionType.MODERNIZATION
     
-    conversion_id = str(uuid.uuid4())
+    if async_mode:
+        # The same request answered recently is returned at once instead of queueing a job
+        stored = await result_store.find("conversion", "modernize", request)
+        if stored is not None:
+            return CodeConversionResponse(**stored)
+        return await job_queue.accept("modernize", request.model_dump(mode="json"), idempotency_key)
+    return await run_modernization(str(uuid.uuid4()), request)
+
+async def run_modernization(conversion_id: str, request: CodeConversionRequest) -> CodeConversionResponse:
+    """Run rule-based modernization and LLM suggestions for a request under the given ID."""
+    
     logger.info(f"Starting code modernization {conversion_id} for {request.language.value}")
     
     try:
-        # Perform modernization
-        modernization_result = await code_converter.modernize(
-            code=request.code,
-            language=request.language,
-            filename=request.filename,
-            options=request.options
-        )
-        
-        # Use LLM for additional modernization suggestions
-        llm_suggestions = await llm_service.suggest_modernizations(
-            code=request.code,
-            language=request.language
-        )
+        # Rule-based modernization and LLM suggestions both work on the original code
+        results = await run_stages("modernize", {
+            "static": offload(
+                code_converter.modernize,
+                code=request.code,
+                language=request.language,
+                filename=request.filename,
+                options=request.options
+            ),
+            "llm": llm_service.suggest_modernizations(
+                code=request.code,
+                language=request.language
+            ),
+        })
+        modernization_result = results["static"]
+        llm_suggestions = results["llm"]
         
         # Clean LLM suggestions results
         llm_changes = clean_string_list(llm_suggestions.get("suggested_changes", []))
@@ -220,34 +374,49 @@ async def modernize_code(request: CodeConversionRequest):
             warnings=modernization_result.get("warnings", []) + llm_warnings,
             errors=modernization_result.get("errors", []) + llm_errors,
             compatibility_notes=llm_compatibility,
-            test_suggestions=llm_tests
+            test_suggestions=llm_tests,
+            **degradation(),
+            **retrieval()
         )
         
+        await result_store.save("conversion", conversion_id, "modernize", request, response)
+        
         logger.info(f"Code modernization {conversion_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Code modernization {conversion_id} failed: {error_msg}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Modernization failed: {str(e)}")
 
-@router.get("/convert/{conversion_id}", response_model=CodeConversionResponse)
+@router.get(
+    "/convert/{conversion_id}",
+    response_model=CodeConversionResponse,
+    responses={202: {"model": JobInfo}, 500: {"model": JobInfo}}
+)
 async def get_conversion_result(conversion_id: str):
-    """Retrieve a previous conversion result.
+    """Retrieve a stored conversion result.
     
-    Note: This is a placeholder implementation. In a real system,
-    you would store conversion results in a database or cache.
+    Results of all conversions are kept for RESULT_STORE_RETENTION_DAYS. For
+    an asynchronous conversion that has not finished yet the response is 202
+    with the job status and progress; a failed job is reported as 500 with
+    its status.
     """
     
-    logger.info(f"Retrieving conversion result {conversion_id}")
+    stored = await result_store.get("conversion", conversion_id)
+    if stored is not None:
+        return CodeConversionResponse(**stored)
     
-    # For now, return a not found error
-    # In a real implementation, this would fetch from database/cache
-    raise HTTPException(
-        status_code=404,
-        detail=f"Conversion result {conversion_id} not found. Results are not currently persisted."
-    )
+    record = await job_queue.get(conversion_id)
+    if record is None or record["kind"] not in CONVERSION_JOBS:
+        raise HTTPException(status_code=404, detail=f"Conversion result {conversion_id} not found")
+    
+    if record["status"] != JobStatus.SUCCEEDED.value:
+        return job_queue.status_response(record)
+    return CodeConversionResponse(**record["result"])
 
 @router.post("/convert/preview", response_model=CodeConversionResponse)
 async def preview_conversion(request: CodeConversionRequest):
@@ -289,4 +458,20 @@ async def preview_conversion(request: CodeConversionRequest):
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Conversion preview {preview_id} failed: {error_msg}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Preview failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Preview failed: {str(e)}")
+
+async def _conversion_job(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    response = await run_conversion(job_id, CodeConversionRequest(**payload))
+    return response.model_dump(mode="json")
+
+async def _python2_to_3_job(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    response = await run_python2_to_3_conversion(job_id, CodeConversionRequest(**payload))
+    return response.model_dump(mode="json")
+
+async def _modernization_job(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    response = await run_modernization(job_id, CodeConversionRequest(**payload))
+    return response.model_dump(mode="json")
+
+job_queue.register("convert", _conversion_job, "/api/v1/convert/{job_id}")
+job_queue.register("convert_python2_to_3", _python2_to_3_job, "/api/v1/convert/{job_id}")
+job_queue.register("modernize", _modernization_job, "/api/v1/convert/{job_id}", stages=("static", "llm"))
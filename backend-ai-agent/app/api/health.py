@@ -1,18 +1,38 @@
 """Health check endpoints."""
 
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 from fastapi import APIRouter, HTTPException
-from ollama import Client as OllamaClient
+from fastapi.responses import JSONResponse
 
 from app.utils.logger import get_logger
 from app.models.schemas import HealthResponse
 from app.utils.config_basic import get_settings
+from app.services.llm_cache import get_llm_cache
+from app.services.analysis_cache import get_static_analysis_cache
+from app.services.job_queue import get_job_queue
+from app.services.result_store import get_result_store
+from app.services.admission import get_admission_controller
+from app.services.provider_health import get_provider_health
+from app.services.circuit_breaker import get_circuit_breakers
+from app.services.model_warmup import get_model_warmer
+from app.services.similar_code import get_similar_code_store
+from app.services.llm_clients import get_client_registry
 
 router = APIRouter()
 logger = get_logger(__name__)
 settings = get_settings()
 
+async def list_ollama_models() -> List[Dict[str, Any]]:
+    """List Ollama's models over the pooled, lifespan-managed connection.
+    
+    Probes run often, so they reuse the keep-alive pool instead of opening
+    a new client (and connection pool) per request.
+    """
+    response = await get_client_registry().http_client("ollama").get("/api/tags", timeout=5)
+    response.raise_for_status()
+    return response.json().get("models", [])
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Comprehensive health check endpoint.
@@ -26,22 +46,22 @@ async def health_check():
     
     # Check Ollama
     try:
-        ollama_client = OllamaClient(host=settings.ollama_host)
         # Try to list models to check connectivity
-        models = ollama_client.list()
+        models = await list_ollama_models()
         dependencies["ollama"] = "healthy"
-        logger.debug(f"Ollama health check passed, found {len(models.get('models', []))} models")
+        logger.debug(f"Ollama health check passed, found {len(models)} models")
     except Exception as e:
         dependencies["ollama"] = f"unhealthy: {str(e)}"
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Ollama health check failed: {error_msg}")
     
-    # Check ChromaDB (placeholder - implement when ChromaDB is integrated)
-    dependencies["chromadb"] = "pending"
+    # ChromaDB backs the optional similar-code store
+    similar = get_similar_code_store()
+    dependencies["chromadb"] = similar.stats()["status"] if similar else "disabled"
     
     # Determine overall health
-    unhealthy_deps = [k for k, v in dependencies.items() if v != "healthy" and v != "pending"]
+    unhealthy_deps = [k for k, v in dependencies.items() if v != "healthy" and v != "disabled"]
     
     if unhealthy_deps:
         logger.warning(f"Unhealthy dependencies: {unhealthy_deps}")
@@ -54,18 +74,31 @@ async def health_check():
         dependencies=dependencies
     )
 
+@router.get("/health/ready", response_model=Dict[str, Any])
+async def readiness():
+    """Readiness probe.
+    
+    Returns 503 until the configured model has been loaded by the startup
+    warm-up, so load balancers only route traffic to warm instances. Use
+    /health for liveness.
+    """
+    
+    warmup = get_model_warmer().stats()
+    if not warmup["ready"]:
+        return JSONResponse(status_code=503, content={"status": "not_ready", "warmup": warmup})
+    return {"status": "ready", "warmup": warmup}
+
 @router.get("/health/ollama", response_model=Dict[str, str])
 async def ollama_health():
     """Specific Ollama health check."""
     
     try:
-        ollama_client = OllamaClient(host=settings.ollama_host)
-        models = ollama_client.list()
+        models = await list_ollama_models()
         
         return {
             "status": "healthy",
             "host": settings.ollama_host,
-            "model_count": str(len(models.get('models', []))),
+            "model_count": str(len(models)),
             "target_model": settings.ollama_model
         }
     except Exception as e:
@@ -101,15 +134,14 @@ async def detailed_health():
     
     # Check Ollama with more detail
     try:
-        ollama_client = OllamaClient(host=settings.ollama_host)
-        models = ollama_client.list()
+        models = await list_ollama_models()
         
         health_info["dependencies"]["ollama"] = {
             "status": "healthy",
             "host": settings.ollama_host,
-            "total_models": len(models.get('models', [])),
+            "total_models": len(models),
             "target_model": settings.ollama_model,
-            "models_available": [model.get('name', 'unknown') for model in models.get('models', [])]
+            "models_available": [model.get('name', 'unknown') for model in models]
         }
     except Exception as e:
         health_info["dependencies"]["ollama"] = {
@@ -118,11 +150,21 @@ async def detailed_health():
             "host": settings.ollama_host
         }
     
-    # ChromaDB status (placeholder)
-    health_info["dependencies"]["chromadb"] = {
-        "status": "pending",
+    # ChromaDB status (similar-code store)
+    similar = get_similar_code_store()
+    health_info["dependencies"]["chromadb"] = similar.stats() if similar else {
+        "status": "disabled",
         "collection": settings.chroma_collection_name,
         "persist_directory": settings.chroma_persist_directory
     }
     
+    health_info["llm_cache"] = get_llm_cache().stats()
+    health_info["static_analysis_cache"] = get_static_analysis_cache().stats()
+    health_info["jobs"] = get_job_queue().stats()
+    health_info["result_store"] = get_result_store().stats()
+    health_info["llm_admission"] = get_admission_controller().stats()
+    health_info["llm_providers"] = get_provider_health().stats()
+    health_info["circuit_breakers"] = get_circuit_breakers().stats()
+    health_info["model_warmup"] = get_model_warmer().stats()
+    
     return health_info
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""Metrics endpoints."""
+
+from typing import Dict, Any
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import get_metrics
+
+router = APIRouter()
+metrics = get_metrics()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Expose all metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/json", response_model=Dict[str, Any])
+async def json_metrics():
+    """Expose all metrics as JSON for quick inspection."""
+    return metrics.snapshot()
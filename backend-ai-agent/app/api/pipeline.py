@@ -0,0 +1,119 @@
+"""Combined multi-step pipeline endpoints."""
+
+import uuid
+from typing import Any, Dict, Tuple
+from fastapi import APIRouter, HTTPException
+
+from app.utils.logger import get_logger
+from app.utils.pipeline import StageTimer, offload, run_stages
+from app.utils.disconnect import CancelOnDisconnectRoute
+from app.utils.deadline import degradation
+from app.services.similar_code import retrieval
+from app.models.schemas import (
+    CodeConversionRequest,
+    CodeLanguage,
+    ConversionType,
+    MigrationPipelineRequest,
+    MigrationPipelineResponse
+)
+from app.services.code_analyzer import CodeAnalyzer
+from app.services.code_converter import CodeConverter
+from app.services.test_generator import TestGenerator
+from app.services.llm_service import LLMService
+from app.services.admission import LLMOverloadedError
+from app.api.analysis import build_python2_analysis_response
+from app.api.conversion import build_conversion_response
+from app.api.testing import build_shadow_tests_response
+
+router = APIRouter(route_class=CancelOnDisconnectRoute)
+logger = get_logger(__name__)
+
+# Initialize services
+code_analyzer = CodeAnalyzer()
+code_converter = CodeConverter()
+test_generator = TestGenerator()
+llm_service = LLMService()
+
+MIGRATION_TASKS = ["python2_migration", "python3_validation", "shadow_scenarios"]
+
+@router.post("/pipeline/python2-to-3", response_model=MigrationPipelineResponse)
+async def python2_migration_pipeline(request: MigrationPipelineRequest):
+    """Python 2 analysis, conversion and shadow tests in one request.
+    
+    Serves the results of /analyze/python2, /convert/python2-to-3 and
+    /generate-shadow-tests from a single LLM generation: the code is sent
+    to the model once with a combined prompt instead of three times.
+    """
+    
+    pipeline_id = str(uuid.uuid4())
+    logger.info(f"Starting Python 2 migration pipeline {pipeline_id}")
+    
+    conversion_request = CodeConversionRequest(
+        code=request.code,
+        language=CodeLanguage.PYTHON,
+        conversion_type=ConversionType.PYTHON_2_TO_3,
+        options=request.options,
+        filename=request.filename
+    )
+    
+    async def convert_and_review() -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]], int]:
+        # The LLM stage validates the converted code, so it waits for the
+        # (fast, rule-based) conversion; the other static stages run alongside
+        timer = StageTimer("python2_pipeline_llm")
+        conversion = await timer.run("conversion", offload(
+            code_converter.convert_python2_to_python3,
+            code=request.code,
+            filename=request.filename,
+            options=request.options
+        ))
+        llm_results, generations = await timer.run("llm", llm_service.analyze_combined(
+            code=request.code,
+            tasks=MIGRATION_TASKS,
+            converted_code=conversion.get("converted_code", "")
+        ))
+        timer.finish()
+        return conversion, llm_results, generations
+    
+    try:
+        results = await run_stages("python2_pipeline", {
+            "analysis": offload(
+                code_analyzer.analyze_python2_specific,
+                code=request.code,
+                filename=request.filename
+            ),
+            "shadow_tests": offload(
+                test_generator.generate_shadow_tests,
+                code=request.code,
+                language=CodeLanguage.PYTHON,
+                test_framework=request.test_framework
+            ),
+            "conversion_and_llm": convert_and_review(),
+        })
+        conversion, llm_results, generations = results["conversion_and_llm"]
+        
+        response = MigrationPipelineResponse(
+            pipeline_id=pipeline_id,
+            analysis=build_python2_analysis_response(
+                pipeline_id, results["analysis"], llm_results["python2_migration"]
+            ),
+            conversion=build_conversion_response(
+                pipeline_id, conversion_request, conversion, llm_results["python3_validation"]
+            ),
+            shadow_tests=build_shadow_tests_response(
+                pipeline_id, results["shadow_tests"], llm_results["shadow_scenarios"]
+            ),
+            llm_generations=generations,
+            **degradation(),
+            **retrieval()
+        )
+        
+        logger.info(f"Python 2 migration pipeline {pipeline_id} completed with {generations} LLM generation(s)")
+        return response
+    
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        # Escape curly braces in error message to avoid loguru format issues
+        error_msg = str(e).replace('{', '{{').replace('}', '}}')
+        logger.error(f"Python 2 migration pipeline {pipeline_id} failed: {error_msg}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Python 2 migration pipeline failed: {str(e)}")
\ No newline at end of file
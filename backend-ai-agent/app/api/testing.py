@@ -3,8 +3,14 @@
 import uuid
 from typing import List, Dict, Any
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.utils.logger import get_logger
+from app.utils.sse import SSE_HEADERS, format_sse, relay_llm_events
+from app.utils.pipeline import offload, run_stages
+from app.utils.disconnect import CancelOnDisconnectRoute
+from app.utils.deadline import degradation
+from app.services.similar_code import retrieval
 from app.models.schemas import (
     TestGenerationRequest,
     TestGenerationResponse,
@@ -12,13 +18,38 @@ from app.models.schemas import (
 )
 from app.services.test_generator import TestGenerator
 from app.services.llm_service import LLMService
+from app.services.admission import LLMOverloadedError
+from app.services.result_store import get_result_store
 
-router = APIRouter()
+router = APIRouter(route_class=CancelOnDisconnectRoute)
 logger = get_logger(__name__)
 
 # Initialize services
 test_generator = TestGenerator()
 llm_service = LLMService()
+result_store = get_result_store()
+
+def build_shadow_tests_response(test_id: str, shadow_tests: Dict[str, Any],
+                                llm_scenarios: Dict[str, Any]) -> TestGenerationResponse:
+    """Combine generated shadow tests and LLM scenarios into the API response.
+    
+    Args:
+        test_id: Unique test generation identifier
+        shadow_tests: Result of TestGenerator.generate_shadow_tests
+        llm_scenarios: Result of the shadow scenario suggestions
+        
+    Returns:
+        Combined test generation response
+    """
+    return TestGenerationResponse(
+        test_id=test_id,
+        generated_tests=shadow_tests.get("generated_tests", ""),
+        test_framework=shadow_tests.get("test_framework", ""),
+        coverage_estimate=shadow_tests.get("coverage_estimate", 0.0),
+        test_cases=shadow_tests.get("test_cases", []) + llm_scenarios.get("shadow_scenarios", []),
+        **degradation(),
+        **retrieval()
+    )
 
 @router.post("/generate-tests", response_model=TestGenerationResponse)
 async def generate_tests(request: TestGenerationRequest):
@@ -58,18 +89,71 @@ async def generate_tests(request: TestGenerationRequest):
             generated_tests=test_result.get("generated_tests", ""),
             test_framework=test_result.get("test_framework", ""),
             coverage_estimate=test_result.get("coverage_estimate", 0.0),
-            test_cases=test_result.get("test_cases", []) + llm_suggestions.get("additional_test_cases", [])
+            test_cases=test_result.get("test_cases", []) + llm_suggestions.get("additional_test_cases", []),
+            **degradation(),
+            **retrieval()
         )
         
+        await result_store.save("tests", test_id, "generate_tests", request, response)
+        
         logger.info(f"Test generation {test_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Test generation {test_id} failed: {error_msg}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Test generation failed: {str(e)}")
 
+@router.post("/generate-tests/stream")
+async def generate_tests_stream(request: TestGenerationRequest):
+    """Streaming variant of /generate-tests using Server-Sent Events.
+    
+    The template-generated tests are sent first as a ``static`` event,
+    followed by ``token``/``field`` events for the LLM test suggestions and
+    a final ``result`` event with the TestGenerationResponse.
+    """
+    
+    test_id = str(uuid.uuid4())
+    logger.info(f"Starting streaming test generation {test_id} for {request.language.value}")
+    
+    async def events():
+        test_result = await test_generator.generate_tests(
+            code=request.code,
+            language=request.language,
+            test_framework=request.test_framework,
+            test_type=request.test_type,
+            coverage_target=request.coverage_target
+        )
+        yield format_sse("static", {"test_id": test_id, **test_result})
+        
+        llm_suggestions: Dict[str, Any] = {}
+        llm_events = llm_service.stream_additional_tests(
+            code=request.code,
+            language=request.language,
+            generated_tests=test_result.get("generated_tests", ""),
+            test_framework=test_result.get("test_framework", "")
+        )
+        async for event in relay_llm_events(llm_events, llm_suggestions):
+            yield event
+        
+        response = TestGenerationResponse(
+            test_id=test_id,
+            generated_tests=test_result.get("generated_tests", ""),
+            test_framework=test_result.get("test_framework", ""),
+            coverage_estimate=test_result.get("coverage_estimate", 0.0),
+            test_cases=test_result.get("test_cases", []) + llm_suggestions.get("additional_test_cases", []),
+            **degradation(),
+            **retrieval()
+        )
+        await result_store.save("tests", test_id, "generate_tests", request, response)
+        yield format_sse("result", response.model_dump(mode='json'))
+        logger.info(f"Streaming test generation {test_id} completed")
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/generate-tests/python", response_model=TestGenerationResponse)
 async def generate_python_tests(request: TestGenerationRequest):
     """Generate Python-specific unit tests.
@@ -116,12 +200,18 @@ async def generate_python_tests(request: TestGenerationRequest):
             generated_tests=python_tests.get("generated_tests", ""),
             test_framework=python_tests.get("test_framework", ""),
             coverage_estimate=python_tests.get("coverage_estimate", 0.0),
-            test_cases=python_tests.get("test_cases", []) + llm_improvements.get("improved_test_cases", [])
+            test_cases=python_tests.get("test_cases", []) + llm_improvements.get("improved_test_cases", []),
+            **degradation(),
+            **retrieval()
         )
         
+        await result_store.save("tests", test_id, "generate_python_tests", request, response)
+        
         logger.info(f"Python test generation {test_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -142,36 +232,47 @@ async def generate_shadow_tests(request: TestGenerationRequest):
     logger.info(f"Starting shadow test generation {test_id} for {request.language.value}")
     
     try:
-        # Generate shadow tests
-        shadow_tests = await test_generator.generate_shadow_tests(
-            code=request.code,
-            language=request.language,
-            test_framework=request.test_framework
-        )
+        # Template-based shadow tests and LLM scenarios are independent
+        results = await run_stages("shadow_tests", {
+            "static": offload(
+                test_generator.generate_shadow_tests,
+                code=request.code,
+                language=request.language,
+                test_framework=request.test_framework
+            ),
+            "llm": llm_service.suggest_shadow_test_scenarios(
+                code=request.code,
+                language=request.language
+            ),
+        })
         
-        # Use LLM for additional shadow test scenarios
-        llm_scenarios = await llm_service.suggest_shadow_test_scenarios(
-            code=request.code,
-            language=request.language
-        )
+        response = build_shadow_tests_response(test_id, results["static"], results["llm"])
         
-        response = TestGenerationResponse(
-            test_id=test_id,
-            generated_tests=shadow_tests.get("generated_tests", ""),
-            test_framework=shadow_tests.get("test_framework", ""),
-            coverage_estimate=shadow_tests.get("coverage_estimate", 0.0),
-            test_cases=shadow_tests.get("test_cases", []) + llm_scenarios.get("shadow_scenarios", [])
-        )
+        await result_store.save("tests", test_id, "generate_shadow_tests", request, response)
         
         logger.info(f"Shadow test generation {test_id} completed successfully")
         return response
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         # Escape curly braces in error message to avoid loguru format issues
         error_msg = str(e).replace('{', '{{').replace('}', '}}')
         logger.error(f"Shadow test generation {test_id} failed: {error_msg}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Shadow test generation failed: {str(e)}")
 
+@router.get("/generate-tests/{test_id}", response_model=TestGenerationResponse)
+async def get_test_generation_result(test_id: str):
+    """Retrieve a stored test generation result.
+    
+    Results are kept for RESULT_STORE_RETENTION_DAYS.
+    """
+    
+    stored = await result_store.get("tests", test_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"Test generation result {test_id} not found")
+    return TestGenerationResponse(**stored)
+
 @router.get("/test-frameworks", response_model=List[Dict[str, str]])
 async def get_test_frameworks():
     """Get available test frameworks for different languages.
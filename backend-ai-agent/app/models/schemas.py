@@ -60,6 +60,10 @@ class CodeAnalysisResponse(BaseModel):
     compatibility_issues: List[Dict[str, Any]] = Field(default_factory=list, description="Compatibility issues")
     business_logic_summary: Optional[str] = Field(None, description="Business logic summary")
     recommendations: List[str] = Field(default_factory=list, description="Improvement recommendations")
+    degraded: bool = Field(False, description="Optional LLM stages were left out to meet the request deadline")
+    skipped_stages: List[str] = Field(default_factory=list, description="Stages skipped or cut off to meet the request deadline")
+    retrieved: bool = Field(False, description="LLM output was reused from a stored result for the same code")
+    similarity: Optional[float] = Field(None, description="Lowest similarity of the stored results used, as is or as a reference")
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Analysis timestamp")
 
 class CodeConversionResponse(BaseModel):
@@ -75,6 +79,10 @@ class CodeConversionResponse(BaseModel):
     errors: List[str] = Field(default_factory=list, description="Conversion errors")
     compatibility_notes: List[str] = Field(default_factory=list, description="Compatibility notes")
     test_suggestions: List[str] = Field(default_factory=list, description="Test suggestions")
+    degraded: bool = Field(False, description="Optional LLM stages were left out to meet the request deadline")
+    skipped_stages: List[str] = Field(default_factory=list, description="Stages skipped or cut off to meet the request deadline")
+    retrieved: bool = Field(False, description="LLM output was reused from a stored result for the same code")
+    similarity: Optional[float] = Field(None, description="Lowest similarity of the stored results used, as is or as a reference")
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Conversion timestamp")
 
 class TestGenerationRequest(BaseModel):
@@ -94,8 +102,55 @@ class TestGenerationResponse(BaseModel):
     test_framework: str = Field(..., description="Test framework used")
     coverage_estimate: float = Field(..., description="Estimated coverage percentage")
     test_cases: List[Dict[str, Any]] = Field(default_factory=list, description="Test case descriptions")
+    degraded: bool = Field(False, description="Optional LLM stages were left out to meet the request deadline")
+    skipped_stages: List[str] = Field(default_factory=list, description="Stages skipped or cut off to meet the request deadline")
+    retrieved: bool = Field(False, description="LLM output was reused from a stored result for the same code")
+    similarity: Optional[float] = Field(None, description="Lowest similarity of the stored results used, as is or as a reference")
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Generation timestamp")
 
+class MigrationPipelineRequest(BaseModel):
+    """Request model for the combined Python 2 to 3 migration pipeline."""
+    
+    code: str = Field(..., description="Python 2 source code")
+    filename: Optional[str] = Field(None, description="Original filename")
+    options: Optional[Dict[str, Any]] = Field(None, description="Conversion options")
+    test_framework: Optional[str] = Field(None, description="Preferred test framework for shadow tests")
+
+class MigrationPipelineResponse(BaseModel):
+    """Response model for the combined Python 2 to 3 migration pipeline."""
+    
+    pipeline_id: str = Field(..., description="Unique pipeline identifier")
+    analysis: CodeAnalysisResponse = Field(..., description="Python 2 migration analysis")
+    conversion: CodeConversionResponse = Field(..., description="Python 2 to 3 conversion and validation")
+    shadow_tests: TestGenerationResponse = Field(..., description="Shadow tests for the conversion")
+    llm_generations: int = Field(..., description="LLM generations sent to the model; cached or shared answers are not counted")
+    degraded: bool = Field(False, description="Optional LLM stages were left out to meet the request deadline")
+    skipped_stages: List[str] = Field(default_factory=list, description="Stages skipped or cut off to meet the request deadline")
+    retrieved: bool = Field(False, description="LLM output was reused from a stored result for the same code")
+    similarity: Optional[float] = Field(None, description="Lowest similarity of the stored results used, as is or as a reference")
+    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Pipeline timestamp")
+
+class JobStatus(str, Enum):
+    """States of an asynchronous job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class JobInfo(BaseModel):
+    """Status of an asynchronous analysis or conversion job."""
+    
+    job_id: str = Field(..., description="Job identifier, also the analysis_id/conversion_id of the result")
+    kind: str = Field(..., description="Job type, e.g. analyze or convert")
+    status: JobStatus = Field(..., description="Job state")
+    progress: float = Field(0.0, description="Estimated completion (0-1)")
+    stage: Optional[str] = Field(None, description="Last completed pipeline stage")
+    error: Optional[str] = Field(None, description="Failure reason")
+    result_url: str = Field(..., description="URL serving the result once the job has succeeded")
+    created_at: datetime = Field(..., description="Submission time")
+    started_at: Optional[datetime] = Field(None, description="Start of execution")
+    finished_at: Optional[datetime] = Field(None, description="End of execution")
+
 class HealthResponse(BaseModel):
     """Health check response model."""
     
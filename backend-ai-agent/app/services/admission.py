@@ -0,0 +1,162 @@
+"""Admission control and bounded concurrency for LLM generations.
+
+Each provider gets a limiter with a fixed number of generation slots, a
+bounded wait queue and a queue-time deadline. Requests beyond that capacity
+are rejected immediately with a retry hint instead of piling up on the
+model server.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+queue_depth = metrics.gauge("llm_admission_queue_depth", "Generations waiting for a slot")
+active_slots = metrics.gauge("llm_admission_active", "Generations currently holding a slot")
+queue_wait = metrics.histogram("llm_admission_wait_seconds", "Time spent waiting for a generation slot")
+rejections = metrics.counter("llm_admission_rejected_total", "Generations rejected by admission control")
+
+
+class LLMOverloadedError(Exception):
+    """Raised when a generation cannot be admitted in time."""
+
+    def __init__(self, provider: str, reason: str, status_code: int, retry_after: int):
+        self.provider = provider
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+        super().__init__(f"LLM provider {provider} is overloaded ({reason}), retry after {retry_after}s")
+
+
+class ProviderLimiter:
+    """Concurrency limiter with a bounded queue for a single provider."""
+
+    def __init__(self, provider: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        """Initialize the limiter.
+
+        Args:
+            provider: Provider name used in metrics and errors
+            max_concurrency: Generations allowed to run at once
+            max_queue: Generations allowed to wait for a slot
+            queue_timeout: Maximum seconds a generation may wait
+        """
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.active = 0
+        # Smoothed generation time, used to estimate Retry-After
+        self.avg_hold = 5.0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _retry_after(self) -> int:
+        """Estimate how long until a slot is likely to be free."""
+        backlog = (self.waiting + 1) / max(self.max_concurrency, 1)
+        return max(1, int(round(self.avg_hold * backlog)))
+
+    def expected_seconds(self) -> float:
+        """Estimate how long a generation started now would take, including its queue wait."""
+        backlog = self.waiting / max(self.max_concurrency, 1) if self._semaphore.locked() else 0.0
+        return self.avg_hold * (1 + backlog)
+
+    def _reject(self, reason: str, status_code: int) -> LLMOverloadedError:
+        rejections.inc(provider=self.provider, reason=reason)
+        error = LLMOverloadedError(self.provider, reason, status_code, self._retry_after())
+        logger.warning(str(error))
+        return error
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold a generation slot for the duration of the block.
+
+        Yields:
+            Seconds spent waiting in the queue for the slot
+
+        Raises:
+            LLMOverloadedError: If the queue is full (429) or the
+                queue-time deadline passes before a slot frees up (503)
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise self._reject("queue_full", 429)
+
+        self.waiting += 1
+        queue_depth.set(self.waiting, provider=self.provider)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout", 503) from None
+        finally:
+            self.waiting -= 1
+            queue_depth.set(self.waiting, provider=self.provider)
+            waited = time.monotonic() - start
+            queue_wait.observe(waited, provider=self.provider)
+
+        self.active += 1
+        active_slots.set(self.active, provider=self.provider)
+        held_since = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.avg_hold = 0.8 * self.avg_hold + 0.2 * (time.monotonic() - held_since)
+            self.active -= 1
+            active_slots.set(self.active, provider=self.provider)
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current limiter state."""
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "avg_generation_seconds": round(self.avg_hold, 3),
+        }
+
+
+class AdmissionController:
+    """Holds one limiter per provider."""
+
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        """Get the limiter for a provider, creating it from settings on first use.
+
+        Args:
+            provider: Provider name
+
+        Returns:
+            ProviderLimiter instance
+        """
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            limiter = ProviderLimiter(provider, *settings.llm_admission_limits(provider))
+            self._limiters[provider] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the state of every limiter."""
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+# Global admission controller
+admission_controller = AdmissionController()
+
+def get_admission_controller() -> AdmissionController:
+    """Get the global admission controller.
+
+    Returns:
+        AdmissionController instance
+    """
+    return admission_controller
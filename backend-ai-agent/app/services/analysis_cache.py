@@ -0,0 +1,95 @@
+"""In-memory cache of static analysis results.
+
+Static analysis is deterministic, so results are keyed by the analysis kind,
+language, filename and the SHA-256 of the exact code. Unlike the LLM caches
+this key does not use the normalized fingerprint: the analyzers also read the
+raw text (the Python 2 checks and the line metrics run regexes over it,
+comments included), so code that only differs in comments or layout can
+produce different results. The analyzers run on worker threads, so the cache
+is guarded by a lock.
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+analysis_cache_hits = metrics.counter("static_analysis_cache_hits_total", "Static analysis results served from cache")
+analysis_cache_misses = metrics.counter("static_analysis_cache_misses_total", "Static analysis cache misses")
+
+
+class StaticAnalysisCache:
+    """Bounded LRU of static analysis results."""
+
+    def __init__(self, max_entries: int):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of results kept, 0 disables caching
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, kind: str, code: str, language: str, filename: Optional[str] = None) -> str:
+        """Build the cache key of an analysis.
+
+        Args:
+            kind: Analysis name, e.g. "analyze"
+            code: Source code
+            language: Language name (CodeLanguage value)
+            filename: Original filename
+
+        Returns:
+            Cache key
+        """
+        digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        return f"{kind}:{language}:{filename or ''}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result; returns a copy the caller may modify, or None on a miss."""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                analysis_cache_misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        analysis_cache_hits.inc()
+        return copy.deepcopy(result)
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result, evicting the least recently used ones beyond the limit."""
+        if self.max_entries <= 0 or "error" in result:
+            return
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics."""
+        return {"entries": len(self._entries), "max_entries": self.max_entries}
+
+
+# Global static analysis cache
+static_analysis_cache = StaticAnalysisCache(settings.static_analysis_cache_max_entries)
+
+def get_static_analysis_cache() -> StaticAnalysisCache:
+    """Get the global static analysis cache.
+
+    Returns:
+        StaticAnalysisCache instance
+    """
+    return static_analysis_cache
@@ -0,0 +1,240 @@
+"""Per-provider circuit breakers and retry with backoff for LLM calls.
+
+A breaker opens after repeated failures against a provider/host so that
+callers fail over (or fall back) immediately instead of each waiting for the
+full request timeout. After a recovery period a limited number of probe
+calls are let through (half-open); a success closes the breaker, a failure
+re-opens it for exponentially longer.
+"""
+
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, Type, TypeVar
+
+import httpx
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.services.admission import LLMOverloadedError
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+breaker_state = metrics.gauge("llm_circuit_state", "Circuit breaker state (0=closed, 1=half_open, 2=open)")
+breaker_rejections = metrics.counter("llm_circuit_rejected_total", "Calls short-circuited by an open breaker")
+breaker_transitions = metrics.counter("llm_circuit_transitions_total", "Circuit breaker state transitions")
+retries_total = metrics.counter("llm_retries_total", "Retried LLM calls")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited by an open breaker."""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Circuit for {name} is open, next probe in {retry_in:.1f}s")
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for a single provider or host."""
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float,
+                 max_recovery_timeout: float, half_open_max_calls: int = 1):
+        """Initialize the breaker.
+
+        Args:
+            name: Provider/host identifier
+            failure_threshold: Consecutive failures that open the breaker
+            recovery_timeout: Initial seconds to stay open before probing
+            max_recovery_timeout: Upper bound for the backed-off open period
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        self.recovery_timeout = recovery_timeout
+        self.probes_in_flight = 0
+        self.last_error: Optional[str] = None
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuit {self.name}: {self.state} -> {state}")
+        breaker_transitions.inc(name=self.name, to=state)
+        self.state = state
+        breaker_state.set({CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[state], name=self.name)
+
+    def _acquire(self) -> None:
+        if self.state == OPEN:
+            remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+            if remaining > 0:
+                breaker_rejections.inc(name=self.name)
+                raise CircuitOpenError(self.name, remaining)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_max_calls:
+                breaker_rejections.inc(name=self.name)
+                raise CircuitOpenError(self.name, self.recovery_timeout)
+            self.probes_in_flight += 1
+
+    def _release(self) -> None:
+        if self.probes_in_flight:
+            self.probes_in_flight -= 1
+
+    def _on_success(self) -> None:
+        self._release()
+        self.failures = 0
+        self.open_count = 0
+        self.recovery_timeout = self.base_recovery_timeout
+        self._transition(CLOSED)
+
+    def _on_failure(self, error: BaseException) -> None:
+        self._release()
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            # Each consecutive re-open doubles the time before the next probe
+            self.recovery_timeout = min(
+                self.max_recovery_timeout,
+                self.base_recovery_timeout * (2 ** self.open_count)
+            )
+            self.open_count += 1
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    @contextmanager
+    def protect(self, ignore: Tuple[Type[BaseException], ...] = ()) -> Iterator[None]:
+        """Guard a call with the breaker.
+
+        Args:
+            ignore: Exception types that neither count as failure nor success
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        self._acquire()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # The caller went away; that says nothing about provider health
+            self._release()
+            raise
+        except ignore:
+            self._release()
+            raise
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        else:
+            self._on_success()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a JSON-friendly view of the breaker."""
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.opened_at + self.recovery_timeout - time.monotonic()), 1)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "recovery_timeout_seconds": self.recovery_timeout,
+            "next_probe_in_seconds": retry_in,
+            "last_error": self.last_error,
+        }
+
+
+class CircuitBreakerRegistry:
+    """Holds one breaker per provider/host pair."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str, host: str = "") -> CircuitBreaker:
+        """Get the breaker for a provider/host, creating it on first use."""
+        name = f"{provider}@{host}" if host else provider
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=settings.llm_breaker_failure_threshold,
+                recovery_timeout=settings.llm_breaker_recovery_timeout,
+                max_recovery_timeout=settings.llm_breaker_max_recovery_timeout
+            )
+            self._breakers[name] = breaker
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return state for every breaker."""
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient and cheap enough to retry.
+
+    Connection failures and overload/5xx statuses are retried. Read
+    timeouts are not: they have already cost a full request timeout.
+    """
+    if isinstance(error, (CircuitOpenError, LLMOverloadedError)):
+        return False
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code in RETRYABLE_STATUS
+
+async def retry_with_backoff(fn: Callable[[], Awaitable[T]], retries: int,
+                             base_delay: float, max_delay: float, name: str = "") -> T:
+    """Call ``fn`` with exponential backoff and full jitter on transient errors.
+
+    Args:
+        fn: Zero-argument coroutine factory
+        retries: Retries after the first attempt
+        base_delay: Backoff base in seconds
+        max_delay: Maximum backoff in seconds
+        name: Label for logs and metrics
+
+    Returns:
+        Result of the first successful attempt
+    """
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            attempt += 1
+            retries_total.inc(name=name)
+            error_msg = str(e).replace('{', '{{').replace('}', '}}')
+            logger.info(f"Retrying {name} in {delay:.2f}s (attempt {attempt}/{retries}): {error_msg}")
+            await asyncio.sleep(delay)
+
+
+# Global breaker registry shared by every LLM service
+circuit_breakers = CircuitBreakerRegistry()
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """Get the global circuit breaker registry.
+
+    Returns:
+        CircuitBreakerRegistry instance
+    """
+    return circuit_breakers
@@ -7,6 +7,7 @@ from pathlib import Path
 
 from app.utils.logger import get_logger
 from app.models.schemas import CodeLanguage
+from app.services.analysis_cache import get_static_analysis_cache
 
 logger = get_logger(__name__)
 
@@ -22,6 +23,7 @@ class CodeAnalyzer:
             CodeLanguage.CPP: self._parse_cpp,
             CodeLanguage.C: self._parse_c,
         }
+        self.cache = get_static_analysis_cache()
     
     async def analyze(self, code: str, language: CodeLanguage, 
                      filename: Optional[str] = None, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -37,6 +39,12 @@ class CodeAnalyzer:
             Analysis results
         """
         
+        cache_key = self.cache.key("analyze", code, language.value, filename)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Analysis of {language.value} code served from cache")
+            return cached
+        
         logger.info(f"Analyzing {language.value} code")
         
         try:
@@ -58,6 +66,7 @@ class CodeAnalyzer:
             }
             
             logger.info(f"Analysis completed for {language.value} code")
+            self.cache.set(cache_key, analysis_result)
             return analysis_result
             
         except Exception as e:
@@ -86,6 +95,12 @@ class CodeAnalyzer:
             Python 2 specific analysis results
         """
         
+        cache_key = self.cache.key("python2", code, CodeLanguage.PYTHON.value, filename)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("Python 2 analysis served from cache")
+            return cached
+        
         logger.info("Analyzing Python 2 code for migration issues")
         
         try:
@@ -104,6 +119,7 @@ class CodeAnalyzer:
             }
             
             logger.info("Python 2 analysis completed")
+            self.cache.set(cache_key, analysis_result)
             return analysis_result
             
         except Exception as e:
@@ -119,6 +135,64 @@ class CodeAnalyzer:
                 "error": str(e)
             }
     
+    def split_into_chunks(self, code: str, language: CodeLanguage, max_chars: int) -> List[Dict[str, Any]]:
+        """Split source code into chunks along top-level definitions.
+        
+        Python is split at top-level function/class boundaries from the AST
+        (classes too large for one chunk are split between their methods).
+        Other languages, and Python that does not parse, are split at blank
+        lines followed by an unindented line. Consecutive pieces are packed
+        together up to ``max_chars``; a single piece larger than that is cut
+        by lines.
+        
+        Args:
+            code: Source code to split
+            language: Programming language
+            max_chars: Target maximum size of a chunk in characters
+            
+        Returns:
+            Chunks with index, start_line, end_line, names and code
+        """
+        
+        lines = code.splitlines(keepends=True)
+        tree = self._parse_python(code).get("ast") if language == CodeLanguage.PYTHON else None
+        
+        if tree is not None and tree.body:
+            segments = self._ast_segments(tree.body, lines, 1, len(lines), max_chars)
+        else:
+            segments = self._blank_line_segments(lines)
+        
+        # Cut pieces that are too large on their own, then pack small neighbours
+        pieces = []
+        for start, end, names in segments:
+            if self._segment_size(lines, start, end) <= max_chars:
+                pieces.append((start, end, names))
+                continue
+            piece_start = start
+            size = 0
+            for lineno in range(start, end + 1):
+                line_size = len(lines[lineno - 1])
+                if size and size + line_size > max_chars:
+                    pieces.append((piece_start, lineno - 1, names))
+                    piece_start, size = lineno, 0
+                size += line_size
+            pieces.append((piece_start, end, names))
+        
+        chunks: List[Dict[str, Any]] = []
+        for start, end, names in pieces:
+            if chunks and self._segment_size(lines, chunks[-1]["start_line"], end) <= max_chars:
+                chunks[-1]["end_line"] = end
+                chunks[-1]["names"].extend(n for n in names if n not in chunks[-1]["names"])
+            else:
+                chunks.append({"start_line": start, "end_line": end, "names": list(names)})
+        
+        for index, chunk in enumerate(chunks):
+            chunk["index"] = index
+            chunk["code"] = "".join(lines[chunk["start_line"] - 1:chunk["end_line"]])
+        
+        logger.info(f"Split {len(lines)} lines of {language.value} code into {len(chunks)} chunks")
+        return chunks
+    
     def _parse_python(self, code: str, filename: Optional[str] = None) -> Dict[str, Any]:
         """Parse Python code using AST.
         
@@ -571,4 +645,47 @@ class CodeAnalyzer:
             # Return basic result even if parsing fails
             pass
         
-        return result
\ No newline at end of file
+        return result
+    
+    def _segment_size(self, lines: List[str], start: int, end: int) -> int:
+        """Return the size in characters of lines start..end (1-based, inclusive)."""
+        return sum(len(line) for line in lines[start - 1:end])
+    
+    def _ast_segments(self, body: List[ast.stmt], lines: List[str], start: int, end: int,
+                      max_chars: int, prefix: str = "") -> List[tuple]:
+        """Map a list of statements to (start_line, end_line, names) segments.
+        
+        Comments and blank lines between statements are attached to the
+        statement that follows them, so the segments cover start..end.
+        """
+        segments = []
+        for i, node in enumerate(body):
+            node_end = end if i == len(body) - 1 else node.end_lineno
+            name = getattr(node, "name", None) if isinstance(
+                node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) else None
+            names = [prefix + name] if name else []
+            
+            if isinstance(node, ast.ClassDef) and len(node.body) > 1 \
+                    and self._segment_size(lines, start, node_end) > max_chars:
+                # The class header travels with its first member
+                segments.extend(self._ast_segments(
+                    node.body, lines, start, node_end, max_chars, prefix=f"{node.name}."
+                ))
+            else:
+                segments.append((start, node_end, names))
+            start = node_end + 1
+        return segments
+    
+    def _blank_line_segments(self, lines: List[str]) -> List[tuple]:
+        """Split lines at blank lines followed by unindented code."""
+        segments = []
+        start = 1
+        for lineno in range(2, len(lines) + 1):
+            line = lines[lineno - 1]
+            previous = lines[lineno - 2]
+            if not previous.strip() and line.strip() and not line[0].isspace():
+                segments.append((start, lineno - 1, []))
+                start = lineno
+        if lines:
+            segments.append((start, len(lines), []))
+        return segments
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""Generation profiles: output cap, context size and sampling per prompt.
+
+Each prompt has a profile with its output token cap (``num_predict``) and
+sampling settings. Short-answer tasks such as validations get a small cap,
+so a rambling model cannot hold an admission slot for the model's default
+length. Tasks whose results are cached and reused are deterministic
+(temperature 0), so the same code gets the same answer; test suggestions
+keep some variety. Profiles can be overridden per prompt with
+``LLM_NUM_PREDICT_<PROMPT>``, ``LLM_TEMPERATURE_<PROMPT>`` and
+``LLM_TOP_P_<PROMPT>``.
+
+Ollama reloads the model whenever ``num_ctx`` changes, which throws away
+the warm-up and the cached prompt prefix. All generations therefore use one
+context size (Ollama ``num_ctx``), large enough for the largest prompt
+budget plus output cap of any profile, rounded up to a power of two between
+``LLM_CONTEXT_MIN`` and ``LLM_CONTEXT_MAX``; only prompts that would not fit
+(e.g. micro-batches) get a larger one. With ``LLM_CONTEXT_PER_REQUEST`` the
+size is instead chosen per generation from the measured prompt length plus
+the output cap, which saves KV cache memory at the cost of reloads.
+
+Generations that stop because they reached their cap are counted per
+prompt: such output is usually cut off mid-JSON and the cap too small.
+"""
+
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.utils.prompt_builder import ApproxTokenCounter
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+profile_generations = metrics.counter("llm_profile_generations_total", "Completed generations by prompt profile")
+cap_hits = metrics.counter(
+    "llm_generation_cap_hits_total",
+    "Generations stopped by their output token cap (num_predict) by prompt profile"
+)
+
+# The approximate tokenizer can undercount; leave headroom so the prompt is never cut
+CONTEXT_MARGIN = 1.2
+
+_approx_counter = ApproxTokenCounter()
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Output cap and sampling settings of a prompt."""
+
+    num_predict: int
+    temperature: float
+    top_p: float = 0.9
+
+
+# Profile of each prompt, keyed by prompt name
+GENERATION_PROFILES: Dict[str, GenerationProfile] = {
+    # Analyses and validations are cached and reused: deterministic, short structured answers
+    "business_logic": GenerationProfile(num_predict=768, temperature=0.0),
+    "chunk_summary": GenerationProfile(num_predict=512, temperature=0.0),
+    "chunk_reduce": GenerationProfile(num_predict=768, temperature=0.0),
+    "python2_migration": GenerationProfile(num_predict=768, temperature=0.0),
+    "conversion_validation": GenerationProfile(num_predict=384, temperature=0.0),
+    "python3_validation": GenerationProfile(num_predict=512, temperature=0.0),
+    "modernization": GenerationProfile(num_predict=768, temperature=0.0),
+    # Test ideas benefit from some variety and carry code, so they are longer
+    "additional_tests": GenerationProfile(num_predict=1536, temperature=0.4),
+    "shadow_scenarios": GenerationProfile(num_predict=1024, temperature=0.4),
+    "test_improvement": GenerationProfile(num_predict=1536, temperature=0.4),
+    # llm_service_v2 prompts
+    "code_analysis": GenerationProfile(num_predict=1024, temperature=0.0),
+    "code_improvement": GenerationProfile(num_predict=2048, temperature=0.2),
+    "test_generation": GenerationProfile(num_predict=2048, temperature=0.4),
+    "code_conversion": GenerationProfile(num_predict=2048, temperature=0.0),
+}
+
+# Profile of prompts without one of their own
+DEFAULT_PROFILE = GenerationProfile(num_predict=1024, temperature=0.3)
+
+def generation_profile(name: Optional[str]) -> GenerationProfile:
+    """Get the profile of a prompt, with configured overrides applied.
+
+    Args:
+        name: Prompt name, e.g. "conversion_validation"
+
+    Returns:
+        GenerationProfile instance
+    """
+    profile = GENERATION_PROFILES.get(name, DEFAULT_PROFILE) if name else DEFAULT_PROFILE
+    overrides = settings.generation_overrides(name) if name else {}
+    return dataclasses.replace(profile, **overrides) if overrides else profile
+
+def combined_num_predict(names: List[str]) -> int:
+    """Output cap of one generation answering several prompts' tasks."""
+    return sum(generation_profile(name).num_predict for name in names)
+
+def _round_context(needed: int, smallest: int) -> int:
+    """Smallest power-of-two multiple of ``smallest`` holding ``needed`` tokens, capped at LLM_CONTEXT_MAX."""
+    size = max(1, smallest)
+    while size < needed and size < settings.llm_context_max:
+        size *= 2
+    return min(size, settings.llm_context_max)
+
+def default_context_size() -> Optional[int]:
+    """Context window shared by all generations (and the warm-up).
+
+    Returns:
+        Power of two between LLM_CONTEXT_MIN and LLM_CONTEXT_MAX holding the
+        largest prompt budget plus output cap of any profile, or None if the
+        context size is left to the server (LLM_CONTEXT_MAX=0)
+    """
+    if settings.llm_context_max <= 0:
+        return None
+    needed = max(
+        int(settings.prompt_token_budget(name) * CONTEXT_MARGIN) + generation_profile(name).num_predict
+        for name in GENERATION_PROFILES
+    )
+    return _round_context(needed, settings.llm_context_min)
+
+def context_size(prompt_tokens: int, num_predict: int) -> Optional[int]:
+    """Context window for a prompt and its output.
+
+    Args:
+        prompt_tokens: Prompt length in tokens
+        num_predict: Output token cap
+
+    Returns:
+        The shared context size, larger only if the prompt would not fit;
+        with LLM_CONTEXT_PER_REQUEST the smallest power of two from
+        LLM_CONTEXT_MIN that fits. None if the context size is left to the
+        server (LLM_CONTEXT_MAX=0)
+    """
+    if settings.llm_context_max <= 0:
+        return None
+    needed = int(prompt_tokens * CONTEXT_MARGIN) + num_predict
+    if settings.llm_context_per_request:
+        return _round_context(needed, settings.llm_context_min)
+    return _round_context(needed, default_context_size())
+
+def generation_options(prompt: str, num_predict: Optional[int] = None) -> Dict[str, Any]:
+    """Ollama options for a prompt according to its profile.
+
+    Args:
+        prompt: Prompt built by PromptBuilder (its name selects the profile), or any plain string
+        num_predict: Output cap replacing the profile's, e.g. for combined prompts
+
+    Returns:
+        Options with temperature, top_p, num_predict and num_ctx
+    """
+    profile = generation_profile(getattr(prompt, "name", None))
+    num_predict = num_predict or profile.num_predict
+    options: Dict[str, Any] = {
+        "temperature": profile.temperature,
+        "top_p": profile.top_p,
+        "num_predict": num_predict,
+    }
+    tokens = getattr(prompt, "tokens", None) or _approx_counter.count(prompt)
+    num_ctx = context_size(tokens, num_predict)
+    if num_ctx:
+        options["num_ctx"] = num_ctx
+    return options
+
+def record_completion(prompt: str, limit: Optional[int], completion_tokens: int,
+                      done_reason: Optional[str] = None) -> bool:
+    """Count a finished generation and whether it stopped at its output cap.
+
+    Args:
+        prompt: Prompt of the generation
+        limit: Output token cap it ran with
+        completion_tokens: Tokens generated
+        done_reason: Stop reason reported by the server ("length" at the cap), if any
+
+    Returns:
+        Whether the cap was hit
+    """
+    name = getattr(prompt, "name", None) or "unnamed"
+    profile_generations.inc(profile=name)
+    hit = done_reason == "length" or bool(limit and completion_tokens >= limit)
+    if hit:
+        cap_hits.inc(profile=name)
+        logger.warning(
+            f"Generation for {name} stopped at its {limit} token cap; "
+            f"raise LLM_NUM_PREDICT_{name.upper()} if its answers are cut off"
+        )
+    return hit
@@ -0,0 +1,492 @@
+"""Durable asynchronous jobs for long-running analyses and conversions.
+
+A POST with ``?async=true`` stores the request as a job and returns its ID at
+once; a bounded pool of workers runs the jobs and persists their results,
+which the regular GET routes (``/analyze/{id}``, ``/convert/{id}``) serve.
+Jobs are JSON files in ``JOB_STORE_DIR``, shared by all uvicorn workers of a
+host. Before a job runs, its worker creates an exclusive claim file, so a job
+is executed at most once even when several processes pick up the same queued
+job after a restart. Submissions repeating an ``Idempotency-Key`` return the
+existing job instead of creating a new one. Finished jobs are deleted, with
+their claim files, ``JOB_RETENTION_DAYS`` after they were last written.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from app.models.schemas import JobInfo, JobStatus
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.utils.pipeline import stage_observer
+from app.services.similar_code import current_retrievals
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+jobs_submitted = metrics.counter("jobs_submitted_total", "Asynchronous jobs submitted by kind")
+jobs_finished = metrics.counter("jobs_finished_total", "Asynchronous jobs finished by kind and status")
+jobs_queued = metrics.gauge("jobs_queued", "Jobs waiting for a worker in this process")
+jobs_purged = metrics.counter("jobs_purged_total", "Job files deleted after the retention period")
+job_seconds = metrics.histogram("job_seconds", "Asynchronous job execution time by kind")
+
+# Runs a job: (job_id, payload) in, JSON-serializable result out
+JobRunner = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# Namespace for job IDs derived from idempotency keys
+_IDEMPOTENCY_NAMESPACE = uuid.UUID("5b0c7f2e-58d4-4f43-9a53-2b1f0e6a7c11")
+
+# Grace period after JOB_TIMEOUT before a claimed job whose worker died is reported failed
+_ABANDON_GRACE = 60.0
+
+# Seconds between deletions of jobs past JOB_RETENTION_DAYS
+_PURGE_INTERVAL = 3600.0
+
+_FINISHED = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value)
+
+
+class JobQueueFullError(Exception):
+    """Raised when no more jobs can be queued."""
+
+    def __init__(self, queued: int, retry_after: int):
+        self.queued = queued
+        self.retry_after = retry_after
+        super().__init__(f"Job queue is full ({queued} jobs waiting), retry after {retry_after}s")
+
+
+class JobStore:
+    """Job records as JSON files, written atomically."""
+
+    def __init__(self, directory: str):
+        """Initialize the store; the directory is created on the first write.
+
+        Args:
+            directory: Directory holding one ``<job_id>.json`` file per job
+        """
+        self.directory = Path(directory)
+        self._created = False
+
+    def _path(self, job_id: str, suffix: str = ".json") -> Optional[Path]:
+        """Path of a job file, None for IDs that are not UUIDs (e.g. from a URL)."""
+        try:
+            job_id = str(uuid.UUID(job_id))
+        except ValueError:
+            return None
+        return self.directory / f"{job_id}{suffix}"
+
+    def _write_tmp(self, job_id: str, data: str) -> Path:
+        if not self._created:
+            # Created on the first write, so importing the module leaves no directory behind
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._created = True
+        tmp = self.directory / f".{job_id}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(data, encoding="utf-8")
+        return tmp
+
+    def create(self, record: Dict[str, Any]) -> bool:
+        """Write a new job record.
+
+        Returns:
+            False if a job with this ID already exists
+        """
+        path = self._path(record["job_id"])
+        tmp = self._write_tmp(record["job_id"], json.dumps(record))
+        try:
+            # Hard-linking fails if the target exists, so concurrent creators cannot overwrite each other
+            os.link(tmp, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def write(self, job_id: str, data: str) -> None:
+        """Replace a job record with serialized data."""
+        tmp = self._write_tmp(job_id, data)
+        os.replace(tmp, self._path(job_id))
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Read a job record, None if it does not exist."""
+        path = self._path(job_id)
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def claim(self, job_id: str) -> bool:
+        """Claim a job for execution; only the first caller ever succeeds."""
+        try:
+            fd = os.open(self._path(job_id, ".claim"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as claim:
+            claim.write(str(os.getpid()))
+        return True
+
+    def claimed_at(self, job_id: str) -> Optional[float]:
+        """Time a job was claimed (epoch seconds), None if it is unclaimed."""
+        try:
+            return self._path(job_id, ".claim").stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def purge(self, cutoff: float) -> int:
+        """Delete jobs last written before a cutoff, with their claim files.
+
+        Finished jobs are deleted, and so are claimed jobs that never
+        finished (their worker died); unclaimed queued jobs are kept for a
+        worker to run. Only files older than the cutoff are read.
+
+        Args:
+            cutoff: Epoch seconds; older jobs are deleted
+
+        Returns:
+            Number of deleted jobs
+        """
+        deleted = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            claim = path.with_suffix(".claim")
+            if record.get("status") in _FINISHED or claim.exists():
+                path.unlink(missing_ok=True)
+                claim.unlink(missing_ok=True)
+                deleted += 1
+        # Claim files of deleted jobs, and temporary files of interrupted writes
+        for path in [*self.directory.glob("*.claim"), *self.directory.glob(".*.tmp")]:
+            try:
+                if path.stat().st_mtime < cutoff and not path.with_suffix(".json").exists():
+                    path.unlink(missing_ok=True)
+            except OSError:
+                continue
+        return deleted
+
+    def queued(self) -> List[Dict[str, Any]]:
+        """Unclaimed queued jobs, oldest first; claimed (e.g. finished) jobs are not read."""
+        records = []
+        for path in self.directory.glob("*.json"):
+            if path.with_suffix(".claim").exists():
+                continue
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if record.get("status") == JobStatus.QUEUED.value:
+                records.append(record)
+        return sorted(records, key=lambda record: record["created_at"])
+
+
+class JobQueue:
+    """Bounded worker pool executing persisted jobs."""
+
+    def __init__(self, store: JobStore, workers: int, max_queued: int, timeout: float, retention_days: float = 0):
+        """Initialize the queue; workers are started by ``start``.
+
+        Args:
+            store: Persistent job store
+            workers: Jobs executed concurrently by this process
+            max_queued: Jobs waiting for a worker before submissions are rejected
+            timeout: Seconds a job may run before it is cancelled and failed
+            retention_days: Age after which finished jobs are deleted, 0 keeps them forever
+        """
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.retention_days = retention_days
+        self._runners: Dict[str, Tuple[JobRunner, Sequence[str], str]] = {}
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    def register(self, kind: str, runner: JobRunner, result_path: str, stages: Sequence[str] = ()) -> None:
+        """Register the runner of a job kind.
+
+        Args:
+            kind: Job type, e.g. "analyze"
+            runner: Coroutine function executing the job
+            result_path: URL of the result, with a ``{job_id}`` placeholder
+            stages: Pipeline stages the runner records, used to estimate progress
+        """
+        self._runners[kind] = (runner, tuple(stages), result_path)
+
+    def result_url(self, record: Dict[str, Any]) -> str:
+        """URL serving the result of a job."""
+        return self._runners[record["kind"]][2].format(job_id=record["job_id"])
+
+    async def start(self) -> None:
+        """Start the workers, pick up jobs left queued by a previous run and start purging old jobs."""
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.retention_days > 0:
+            self._tasks.append(asyncio.create_task(self._purge_loop()))
+
+        pending = await asyncio.to_thread(self.store.queued)
+        for record in pending:
+            self._queue.put_nowait(record["job_id"])
+        jobs_queued.set(self._queue.qsize())
+        if pending:
+            logger.info(f"Resuming {len(pending)} queued jobs")
+
+    async def stop(self) -> None:
+        """Stop the workers; claimed jobs that did not finish are failed by ``get`` later."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Persist and enqueue a job.
+
+        Args:
+            kind: Registered job type
+            payload: JSON-serializable job input
+            idempotency_key: Client key; resubmissions with the same key return the first job
+
+        Returns:
+            The job record (the existing one for a repeated idempotency key)
+
+        Raises:
+            JobQueueFullError: If max_queued jobs are already waiting
+        """
+        if kind not in self._runners:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+
+        if idempotency_key:
+            job_id = str(uuid.uuid5(_IDEMPOTENCY_NAMESPACE, f"{kind}:{idempotency_key}"))
+            existing = await asyncio.to_thread(self.store.load, job_id)
+            if existing:
+                return existing
+        else:
+            job_id = str(uuid.uuid4())
+
+        if self._queue.qsize() >= self.max_queued:
+            # Rough wait: one average job per worker ahead of the caller
+            retry_after = max(1, int(self._queue.qsize() / self.workers))
+            raise JobQueueFullError(self._queue.qsize(), retry_after)
+
+        record = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": JobStatus.QUEUED.value,
+            "progress": 0.0,
+            "stage": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "payload": payload,
+            "result": None,
+        }
+        if not await asyncio.to_thread(self.store.create, record):
+            # Same idempotency key submitted concurrently
+            return await asyncio.to_thread(self.store.load, job_id)
+
+        self._queue.put_nowait(job_id)
+        jobs_submitted.inc(kind=kind)
+        jobs_queued.set(self._queue.qsize())
+        logger.info(f"Queued {kind} job {job_id}")
+        return record
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a job, failing claimed jobs whose worker has gone away.
+
+        A job is abandoned when it is still running, or still queued
+        although a worker claimed it, JOB_TIMEOUT (plus a grace period)
+        after it started or was claimed.
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            The job record, or None if unknown
+        """
+        record = await asyncio.to_thread(self.store.load, job_id)
+        if record is None or record["status"] in _FINISHED:
+            return record
+
+        if record["status"] == JobStatus.RUNNING.value and record["started_at"]:
+            since = datetime.fromisoformat(record["started_at"])
+        else:
+            claimed_at = await asyncio.to_thread(self.store.claimed_at, job_id)
+            since = datetime.utcfromtimestamp(claimed_at) if claimed_at is not None else None
+        if since is not None and datetime.utcnow() - since > timedelta(seconds=self.timeout + _ABANDON_GRACE):
+            record.update(
+                status=JobStatus.FAILED.value,
+                error="Job was abandoned by its worker",
+                finished_at=datetime.utcnow().isoformat()
+            )
+            await asyncio.to_thread(self.store.write, job_id, json.dumps(record))
+        return record
+
+    async def _purge_loop(self) -> None:
+        while True:
+            try:
+                deleted = await asyncio.to_thread(self.store.purge, time.time() - self.retention_days * 86400)
+                if deleted:
+                    jobs_purged.inc(deleted)
+                    logger.info(f"Deleted {deleted} jobs older than {self.retention_days:g} days")
+            except Exception as e:
+                # Escape curly braces in error message to avoid loguru format issues
+                error_msg = str(e).replace('{', '{{').replace('}', '}}')
+                logger.warning(f"Job purge failed: {error_msg}")
+            await asyncio.sleep(_PURGE_INTERVAL)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            jobs_queued.set(self._queue.qsize())
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                # Escape curly braces in error message to avoid loguru format issues
+                error_msg = str(e).replace('{', '{{').replace('}', '}}')
+                logger.error(f"Job {job_id} could not be run: {error_msg}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        """Claim and execute a job, persisting its progress and result."""
+        if not await asyncio.to_thread(self.store.claim, job_id):
+            logger.debug(f"Job {job_id} was already claimed")
+            return
+        record = await asyncio.to_thread(self.store.load, job_id)
+        if record is None or record["status"] != JobStatus.QUEUED.value:
+            return
+
+        kind = record["kind"]
+        runner, stages, _ = self._runners[kind]
+        lock = asyncio.Lock()
+
+        async def save() -> None:
+            # Serialize on the event loop so progress updates never see a half-updated record
+            async with lock:
+                await asyncio.to_thread(self.store.write, job_id, json.dumps(record))
+
+        done: List[str] = []
+
+        def on_stage(stage: str, seconds: float) -> None:
+            done.append(stage)
+            record["stage"] = stage
+            record["progress"] = round(0.1 + 0.8 * min(1.0, len(done) / max(1, len(stages))), 2)
+            asyncio.ensure_future(save())
+
+        record.update(status=JobStatus.RUNNING.value, started_at=datetime.utcnow().isoformat(), progress=0.1)
+        await save()
+        logger.info(f"Running {kind} job {job_id}")
+
+        start = time.monotonic()
+        token = stage_observer.set(on_stage)
+        retrievals = current_retrievals.set([])
+        try:
+            result = await asyncio.wait_for(runner(job_id, record["payload"]), self.timeout)
+            record.update(status=JobStatus.SUCCEEDED.value, progress=1.0, result=result)
+        except asyncio.TimeoutError:
+            record.update(status=JobStatus.FAILED.value, error=f"Job timed out after {self.timeout:.0f}s")
+        except Exception as e:
+            record.update(status=JobStatus.FAILED.value, error=str(getattr(e, "detail", e)))
+        finally:
+            stage_observer.reset(token)
+            current_retrievals.reset(retrievals)
+
+        elapsed = time.monotonic() - start
+        record["finished_at"] = datetime.utcnow().isoformat()
+        await save()
+        job_seconds.observe(elapsed, kind=kind)
+        jobs_finished.inc(kind=kind, status=record["status"])
+        if record["status"] == JobStatus.SUCCEEDED.value:
+            logger.info(f"{kind} job {job_id} succeeded in {elapsed:.2f}s")
+        else:
+            # Escape curly braces in error message to avoid loguru format issues
+            error_msg = record["error"].replace('{', '{{').replace('}', '}}')
+            logger.warning(f"{kind} job {job_id} failed after {elapsed:.2f}s: {error_msg}")
+
+    def info(self, record: Dict[str, Any]) -> JobInfo:
+        """Public status of a job."""
+        return JobInfo(
+            job_id=record["job_id"],
+            kind=record["kind"],
+            status=record["status"],
+            progress=record["progress"],
+            stage=record["stage"],
+            error=record["error"],
+            result_url=self.result_url(record),
+            created_at=record["created_at"],
+            started_at=record["started_at"],
+            finished_at=record["finished_at"],
+        )
+
+    async def accept(self, kind: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> JSONResponse:
+        """Submit a job on behalf of an endpoint and answer 202 with its status.
+
+        Args:
+            kind: Registered job type
+            payload: JSON-serializable job input
+            idempotency_key: Value of the Idempotency-Key header
+
+        Returns:
+            202 response pointing at the result (Location header)
+
+        Raises:
+            HTTPException: 429 with Retry-After if the queue is full
+        """
+        try:
+            record = await self.submit(kind, payload, idempotency_key)
+        except JobQueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        info = self.info(record)
+        return JSONResponse(
+            status_code=202,
+            content=info.model_dump(mode="json"),
+            headers={"Location": info.result_url}
+        )
+
+    def status_response(self, record: Dict[str, Any]) -> JSONResponse:
+        """Job status for a result that is not available (yet): 202 while pending, 500 if failed."""
+        status_code = 500 if record["status"] == JobStatus.FAILED.value else 202
+        return JSONResponse(status_code=status_code, content=self.info(record).model_dump(mode="json"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue statistics for health checks."""
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "store": str(self.store.directory),
+            "retention_days": self.retention_days,
+        }
+
+
+# Global job queue
+job_queue = JobQueue(
+    store=JobStore(settings.job_store_dir),
+    workers=settings.job_workers,
+    max_queued=settings.job_max_queued,
+    timeout=settings.job_timeout,
+    retention_days=settings.job_retention_days
+)
+
+def get_job_queue() -> JobQueue:
+    """Get the global job queue.
+
+    Returns:
+        JobQueue instance
+    """
+    return job_queue
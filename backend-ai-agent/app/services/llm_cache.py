@@ -0,0 +1,231 @@
+"""Content-addressed cache for LLM responses.
+
+Responses are keyed by (provider, model, prompt hash, generation options), so
+resubmitting the same file - task retries, autosave, batch re-runs - is served
+without another generation. Entries live in an in-memory LRU with TTL and a
+byte budget, backed by an optional on-disk tier that survives restarts.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+cache_hits = metrics.counter("llm_cache_hits_total", "LLM response cache hits by tier")
+cache_misses = metrics.counter("llm_cache_misses_total", "LLM response cache misses")
+cache_evictions = metrics.counter("llm_cache_evictions_total", "LLM response cache evictions by reason")
+cache_entries = metrics.gauge("llm_cache_entries", "Entries held in the in-memory LLM cache")
+cache_bytes = metrics.gauge("llm_cache_bytes", "Bytes held in the in-memory LLM cache")
+
+def make_cache_key(provider: str, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Build a content-addressed cache key.
+
+    Args:
+        provider: LLM provider name
+        model: Model name
+        prompt: Full prompt text
+        options: Generation options that influence the output
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    material = json.dumps(
+        {"provider": provider, "model": model, "prompt": prompt_hash, "options": options or {}},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier (memory LRU + optional disk) cache for LLM responses."""
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int,
+                 disk_dir: Optional[str] = None, disk_max_bytes: int = 0):
+        """Initialize the cache.
+
+        Args:
+            ttl: Time-to-live in seconds for both tiers
+            max_entries: Maximum number of in-memory entries
+            max_bytes: Maximum total size of in-memory values in bytes
+            disk_dir: Directory for the persistent tier, None disables it
+            disk_max_bytes: Size budget for the disk tier, 0 for unlimited
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._disk_writes = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Look up a cached value.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        value = self._memory_get(key)
+        if value is not None:
+            cache_hits.inc(tier="memory")
+            return value
+
+        if self.disk_dir:
+            stored = await asyncio.to_thread(self._disk_get, key)
+            if stored is not None:
+                created, value = stored
+                # Promote into memory, keeping the original creation time
+                self._memory_set(key, value, created)
+                cache_hits.inc(tier="disk")
+                return value
+
+        cache_misses.inc()
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store a value in every enabled tier.
+
+        Args:
+            key: Cache key from make_cache_key
+            value: JSON-serializable value
+        """
+        now = time.time()
+        self._memory_set(key, value, now)
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._disk_set, key, value, now)
+            except Exception as e:
+                error_msg = str(e).replace('{', '{{').replace('}', '}}')
+                logger.warning(f"LLM cache disk write failed: {error_msg}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        hits_memory = cache_hits.value(tier="memory")
+        hits_disk = cache_hits.value(tier="disk")
+        misses = cache_misses.value()
+        lookups = hits_memory + hits_disk + misses
+        return {
+            "entries": len(self._memory),
+            "bytes": self._bytes,
+            "hits_memory": int(hits_memory),
+            "hits_disk": int(hits_disk),
+            "misses": int(misses),
+            "hit_ratio": round((hits_memory + hits_disk) / lookups, 4) if lookups else 0.0,
+            "disk_enabled": self.disk_dir is not None,
+        }
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        created, size, value = entry
+        if time.time() - created > self.ttl:
+            self._memory_pop(key)
+            cache_evictions.inc(reason="expired")
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: Any, created: float) -> None:
+        size = len(json.dumps(value, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_pop(key)
+        self._memory[key] = (created, size, value)
+        self._bytes += size
+        while len(self._memory) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._memory_pop(oldest)
+            cache_evictions.inc(reason="size")
+        self._update_gauges()
+
+    def _memory_pop(self, key: str) -> None:
+        _, size, _ = self._memory.pop(key)
+        self._bytes -= size
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        cache_entries.set(len(self._memory))
+        cache_bytes.set(self._bytes)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Any]]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - record.get("created", 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            cache_evictions.inc(reason="expired")
+            return None
+        return record["created"], record["value"]
+
+    def _disk_set(self, key: str, value: Any, created: float) -> None:
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": created, "value": value}, f, default=str)
+        # Atomic rename so concurrent readers never see a partial file
+        os.replace(tmp_path, path)
+
+        self._disk_writes += 1
+        if self.disk_max_bytes and self._disk_writes % 100 == 0:
+            self._disk_prune()
+
+    def _disk_prune(self) -> None:
+        """Delete the oldest files until the disk tier fits its budget."""
+        files = []
+        total = 0
+        for path in self.disk_dir.glob("*/*.json"):
+            stat = path.stat()
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            cache_evictions.inc(reason="disk_size")
+
+
+# Global cache instance shared by every LLM service
+llm_cache = LLMResponseCache(
+    ttl=settings.llm_cache_ttl,
+    max_entries=settings.llm_cache_max_entries,
+    max_bytes=settings.llm_cache_max_bytes,
+    disk_dir=settings.llm_cache_disk_dir or None,
+    disk_max_bytes=settings.llm_cache_disk_max_bytes
+)
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get the global LLM response cache.
+
+    Returns:
+        LLMResponseCache instance
+    """
+    return llm_cache
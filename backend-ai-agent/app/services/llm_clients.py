@@ -0,0 +1,179 @@
+"""Pooled, lifespan-managed HTTP clients for LLM providers."""
+
+from typing import Any, Dict, Optional
+import httpx
+
+from app.utils.logger import get_logger
+from app.utils.llm_config import LLMConfig, get_llm_config
+
+logger = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Providers reached over HTTPS that negotiate HTTP/2. Ollama is plain HTTP on
+# localhost, where HTTP/1.1 keep-alive is all we need.
+HTTP2_PROVIDERS = {"openai", "anthropic", "deepseek", "kimi"}
+
+
+class ProviderHTTPError(Exception):
+    """Non-success HTTP response from a provider, keeping the status for retry decisions."""
+
+    def __init__(self, message: str, status_code: int):
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class LLMClientRegistry:
+    """Per-provider registry of keep-alive connection pools.
+
+    One client is kept per provider for the lifetime of the process so that
+    consecutive prompts reuse TCP/TLS connections instead of handshaking again.
+    """
+
+    def __init__(self, config: Optional[LLMConfig] = None):
+        """Initialize the registry.
+
+        Args:
+            config: LLM configuration, defaults to the global config
+        """
+        self.config = config or get_llm_config()
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+        self._sdk_clients: Dict[str, Any] = {}
+
+    def _limits(self) -> httpx.Limits:
+        """Build connection pool limits from the configuration."""
+        return httpx.Limits(
+            max_connections=self.config.pool_max_connections,
+            max_keepalive_connections=self.config.pool_max_keepalive,
+            keepalive_expiry=self.config.pool_keepalive_expiry
+        )
+
+    def _client_kwargs(self, provider: str) -> Dict[str, Any]:
+        """Build the pooling options shared by every client of a provider.
+
+        Args:
+            provider: Provider name
+
+        Returns:
+            Keyword arguments for an httpx-compatible async client
+        """
+        return {
+            "timeout": httpx.Timeout(self.config.timeout, connect=self.config.connect_timeout),
+            "limits": self._limits(),
+            "http2": self.config.http2 and HTTP2_AVAILABLE and provider in HTTP2_PROVIDERS,
+        }
+
+    def base_url(self, provider: str) -> str:
+        """Return the base URL for an httpx-backed provider, or "" for SDK providers."""
+        return {
+            "ollama": self.config.ollama_host,
+            "deepseek": self.config.deepseek_base_url,
+            "kimi": self.config.kimi_base_url,
+        }.get(provider, "")
+
+    def http_client(self, provider: str) -> httpx.AsyncClient:
+        """Get the pooled httpx client for a provider, creating it on first use.
+
+        Args:
+            provider: Provider name (ollama, deepseek, kimi)
+
+        Returns:
+            Shared async HTTP client
+        """
+        client = self._http_clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(base_url=self.base_url(provider), **self._client_kwargs(provider))
+            self._http_clients[provider] = client
+            logger.debug(f"Created pooled HTTP client for {provider}")
+        return client
+
+    def _sdk_http_client(self, provider: str, factory) -> Any:
+        """Create the pooled transport for an SDK-backed provider.
+
+        The SDKs ship their own httpx client subclass, so the pool is built with
+        their factory and tracked here only so shutdown can close it.
+        """
+        client = factory(**self._client_kwargs(provider))
+        self._http_clients[provider] = client
+        return client
+
+    def openai_client(self):
+        """Get the shared AsyncOpenAI client."""
+        client = self._sdk_clients.get("openai")
+        if client is None:
+            import openai
+
+            client = openai.AsyncOpenAI(
+                api_key=self.config.openai_api_key,
+                base_url=self.config.openai_base_url,
+                http_client=self._sdk_http_client("openai", openai.DefaultAsyncHttpxClient),
+                max_retries=0
+            )
+            self._sdk_clients["openai"] = client
+        return client
+
+    def anthropic_client(self):
+        """Get the shared AsyncAnthropic client."""
+        client = self._sdk_clients.get("anthropic")
+        if client is None:
+            import anthropic
+
+            client = anthropic.AsyncAnthropic(
+                api_key=self.config.anthropic_api_key,
+                http_client=self._sdk_http_client("anthropic", anthropic.DefaultAsyncHttpxClient),
+                max_retries=0
+            )
+            self._sdk_clients["anthropic"] = client
+        return client
+
+    def configured_providers(self) -> list:
+        """Return the providers that have enough configuration to be used."""
+        providers = [self.config.provider]
+        keys = {
+            "openai": self.config.openai_api_key,
+            "anthropic": self.config.anthropic_api_key,
+            "deepseek": self.config.deepseek_api_key,
+            "kimi": self.config.kimi_api_key,
+        }
+        providers.extend(name for name, key in keys.items() if key and name not in providers)
+        return providers
+
+    async def startup(self) -> None:
+        """Open connection pools for every configured provider."""
+        for provider in self.configured_providers():
+            if provider == "openai":
+                self.openai_client()
+            elif provider == "anthropic":
+                self.anthropic_client()
+            else:
+                self.http_client(provider)
+        logger.info(f"LLM client pools ready: {', '.join(self._http_clients)} "
+                    f"(max_connections={self.config.pool_max_connections}, http2={self.config.http2 and HTTP2_AVAILABLE})")
+
+    async def shutdown(self) -> None:
+        """Close every pooled client."""
+        for provider, client in list(self._http_clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                error_msg = str(e).replace('{', '{{').replace('}', '}}')
+                logger.warning(f"Failed to close {provider} client: {error_msg}")
+        self._http_clients.clear()
+        self._sdk_clients.clear()
+        logger.info("LLM client pools closed")
+
+
+# Global registry instance
+client_registry = LLMClientRegistry()
+
+def get_client_registry() -> LLMClientRegistry:
+    """Get the global LLM client registry.
+
+    Returns:
+        LLMClientRegistry instance
+    """
+    return client_registry
@@ -1,12 +1,43 @@
 """LLM service for AI-powered code analysis and generation."""
 
+import asyncio
 import json
-from typing import Dict, Any, List, Optional
-from ollama import Client as OllamaClient
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple, Union
+import httpx
+from ollama import AsyncClient as OllamaAsyncClient
 
 from app.utils.logger import get_logger
 from app.utils.config_basic import get_settings
 from app.models.schemas import CodeLanguage, ConversionType
+from app.utils.json_stream import (
+    IncrementalJSONParser,
+    SchemaMismatchError,
+    StreamingSchemaValidator,
+    parse_json_output,
+    schema_divergences
+)
+from app.services.llm_cache import get_llm_cache, make_cache_key
+from app.services.generation_profiles import (
+    combined_num_predict, context_size, generation_options, record_completion
+)
+from app.services.singleflight import get_llm_singleflight
+from app.services.micro_batch import get_llm_batcher
+from app.services.similar_code import SimilarMatch, get_similar_code_store, record_retrieval
+from app.services.admission import LLMOverloadedError, get_admission_controller
+from app.services.circuit_breaker import get_circuit_breakers, retry_with_backoff
+from app.services.code_analyzer import CodeAnalyzer
+from app.utils.prompt_builder import Prompt, PromptBuilder, cache_identity, split_prompt
+from app.services.llm_tasks import (
+    COMBINED_TASKS,
+    RESPONSE_SCHEMAS,
+    batch_item_ids,
+    batch_schema,
+    combined_schema
+)
+from app.services.model_warmup import get_model_warmer
+from app.services.prompt_cache import get_prefix_tracker, record_prompt_cache
+from app.services.llm_telemetry import LLMCallTelemetry, ProviderCallCounter
+from app.utils.deadline import within_deadline
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -16,9 +47,471 @@ class LLMService:
     
     def __init__(self):
         """Initialize the LLM service."""
-        self.client = OllamaClient(host=settings.ollama_host)
+        # The async client keeps the event loop free while Ollama generates,
+        # so a single worker can have many generations in flight at once.
+        # A short connect timeout makes an unreachable server fail fast
+        self.client = OllamaAsyncClient(
+            host=settings.ollama_host,
+            timeout=httpx.Timeout(settings.ollama_timeout, connect=5.0)
+        )
         self.model = settings.ollama_model
+        self.cache = get_llm_cache() if settings.llm_cache_enabled else None
+        self.inflight = get_llm_singleflight() if settings.llm_singleflight_enabled else None
+        self.batcher = get_llm_batcher() if settings.llm_micro_batch else None
+        self.similar = get_similar_code_store()
+        self.admission = get_admission_controller()
+        self.breaker = get_circuit_breakers().get("ollama", settings.ollama_host)
+        self.code_analyzer = CodeAnalyzer()
+        self.prompts = PromptBuilder()
+        self.warmer = get_model_warmer()
+        self.prefixes = get_prefix_tracker()
+    
+    def _format(self, schema: Optional[Dict[str, Any]]) -> Union[str, Dict[str, Any]]:
+        """Ollama ``format``: the response schema with structured output enabled, else plain JSON mode."""
+        return schema if schema and settings.llm_structured_output else "json"
+    
+    async def _generate(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                        schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run a single JSON-mode generation against Ollama.
+        
+        Identical prompts with identical options are served from the
+        response cache, and concurrent identical prompts share one
+        in-flight generation instead of each starting their own. Prompts
+        are compared by their cache identity, so code differing only in
+        what CACHE_KEY_STRICTNESS ignores counts as identical. A stored
+        result of the same task for similar (not identical) code is never
+        returned as is: it is added to the prompt as a reference the model
+        must check against the new code. With micro-batching enabled, small
+        prompts of the same task are packed with others arriving at the
+        same time into one generation.
+        
+        When the caller sent a deadline, the generation is skipped if it
+        is not expected to finish in the remaining budget and cut off when
+        the budget runs out.
+        
+        Args:
+            prompt: Prompt to send to the model
+            options: Ollama generation options, by default those of the
+                prompt's generation profile
+            schema: JSON schema the response must follow
+            
+        Returns:
+            Ollama generate response (at least the 'response' field)
+            
+        Raises:
+            DeadlineExceededError: The request deadline left no time for the generation
+        """
+        options = options or generation_options(prompt)
+        cache_key = make_cache_key("ollama", self.model, cache_identity(prompt), {"format": self._format(schema), **options})
+        recalled, reference = await self._recall(cache_key, prompt, options, schema)
+        if recalled is not None:
+            return recalled
+        
+        sent = self._with_reference(prompt, reference) if reference else prompt
+        generate = lambda: self._generate_uncached(cache_key, prompt, options, schema, sent)
+        if self.batcher and not reference and self._batchable(prompt, schema):
+            generate = lambda: self._generate_batched(cache_key, prompt, options, schema)
+        call = self.inflight.do(cache_key, generate) if self.inflight else generate()
+        # Skipped, or cut off, when it does not fit in the caller's deadline
+        return await within_deadline(
+            getattr(prompt, "name", None) or "llm",
+            call,
+            self.admission.limiter("ollama").expected_seconds()
+        )
+    
+    async def _generate_uncached(self, cache_key: Optional[str], prompt: str, options: Dict[str, Any],
+                                 schema: Optional[Dict[str, Any]] = None, sent: Optional[str] = None) -> Dict[str, Any]:
+        """Call Ollama and populate the response cache.
+        
+        Args:
+            cache_key: Content-addressed key of the request, None to skip caching
+            prompt: Prompt of the request, under which the result is stored
+            options: Ollama generation options
+            schema: JSON schema the response must follow
+            sent: Prompt actually sent, e.g. with a reference result added; defaults to ``prompt``
+            
+        Returns:
+            Raw Ollama generate response
+        """
+        # Output that diverges from the schema is the model's fault, not the server's
+        with self.breaker.protect(ignore=(LLMOverloadedError, SchemaMismatchError)):
+            response = await retry_with_backoff(
+                lambda: self._call_ollama(sent or prompt, options, schema),
+                retries=settings.llm_retry_count,
+                base_delay=settings.llm_retry_base_delay,
+                max_delay=settings.llm_retry_max_delay,
+                name="ollama"
+            )
+        
+        if cache_key:
+            # Only well-formed output is worth replaying
+            try:
+                json.loads(response['response'])
+                await self._remember(cache_key, prompt, options, schema, response['response'])
+            except (ValueError, KeyError):
+                pass
+        return response
+    
+    def _task_key(self, prompt: str, options: Dict[str, Any], schema: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Identity of the task a prompt performs: its static prefix, model and options."""
+        prefix, _ = split_prompt(prompt)
+        if not prefix:
+            return None
+        return make_cache_key("ollama", self.model, prefix, {"format": self._format(schema), **options})
+    
+    async def _recall(self, cache_key: str, prompt: str, options: Dict[str, Any],
+                      schema: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[SimilarMatch]]:
+        """Find a previous result for the same code, or a reference result for similar code.
+        
+        An exact cache hit, or a stored result of a request with the same
+        cache key (same task and code fingerprint), is reused. A stored
+        result for merely similar code may be wrong for the new code (a
+        flipped condition barely changes the similarity), so it is only
+        returned as a reference for the prompt.
+        
+        Returns:
+            Tuple of (response with the 'response' text or None, reference or None)
+        """
+        if self.cache:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return {"response": cached, "cached": True}, None
+        
+        task = self._task_key(prompt, options, schema)
+        if self.similar and task:
+            match = await self.similar.lookup(task, split_prompt(prompt)[1])
+            if match is not None and match.id == cache_key:
+                record_retrieval(match.similarity, reused=True)
+                return {"response": match.response, "retrieved": True,
+                        "similarity": match.similarity, "retrieval_seconds": match.seconds}, None
+            return None, match
+        return None, None
+    
+    def _with_reference(self, prompt: str, reference: SimilarMatch) -> str:
+        """Add the stored result for similar code to a prompt as a worked example.
+        
+        The reference goes between the static prefix and the code, so the
+        prefix stays cacheable.
+        """
+        record_retrieval(reference.similarity, reused=False)
+        prefix, body = split_prompt(prompt)
+        example = (
+            f"For reference, this was the answer for similar code (similarity {reference.similarity:.2f}):\n"
+            f"{reference.response}\n"
+            "The code below is different. Check every statement against the code below and "
+            "do not repeat anything that does not hold for it.\n\n"
+        )
+        tokens = getattr(prompt, "tokens", None)
+        return Prompt(
+            prefix, example + body,
+            identity=cache_identity(prompt),
+            name=getattr(prompt, "name", None),
+            tokens=tokens + self.prompts.counter.count(example) if tokens else None
+        )
+    
+    async def _remember(self, cache_key: str, prompt: str, options: Dict[str, Any],
+                        schema: Optional[Dict[str, Any]], text: str) -> None:
+        """Store a well-formed result in the response cache and the similar-code store."""
+        if self.cache:
+            await self.cache.set(cache_key, text)
+        task = self._task_key(prompt, options, schema)
+        if self.similar and task:
+            await self.similar.store(cache_key, task, split_prompt(prompt)[1], text)
+    
+    def _batchable(self, prompt: str, schema: Optional[Dict[str, Any]]) -> bool:
+        """Whether a prompt can be micro-batched: a task prompt with a schema and a small body."""
+        prefix, body = split_prompt(prompt)
+        return bool(prefix and schema) and self.batcher.accepts(self.prompts.counter.count(body))
+    
+    async def _generate_batched(self, cache_key: str, prompt: str, options: Dict[str, Any],
+                                schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a prompt as one item of a micro-batch.
+        
+        Prompts are compatible when their static prefix (the task), options
+        and schema match. An item the batch answer leaves out is generated
+        on its own.
+        
+        Args:
+            cache_key: Content-addressed key of the single-prompt request
+            prompt: Prompt to send to the model
+            options: Ollama generation options
+            schema: JSON schema the response must follow
+            
+        Returns:
+            Ollama generate response (at least the 'response' field)
+        """
+        prefix, body = split_prompt(prompt)
+        batch_key = make_cache_key("ollama-batch", self.model, prefix, {"schema": schema, **options})
+        result = await self.batcher.submit(
+            batch_key, body, self.prompts.counter.count(body),
+            lambda bodies: self._call_batch(prefix, bodies, options, schema)
+        )
+        if result is None:
+            return await self._generate_uncached(cache_key, prompt, options, schema)
+        
+        response = {"response": json.dumps(result), "batched": True}
+        await self._remember(cache_key, prompt, options, schema, response['response'])
+        return response
+    
+    async def _call_batch(self, prefix: str, bodies: List[str], options: Dict[str, Any],
+                          schema: Dict[str, Any]) -> List[Optional[Dict[str, Any]]]:
+        """Run one generation for a micro-batch and split the answer per item.
+        
+        Args:
+            prefix: Static prompt prefix shared by the items
+            bodies: Per-item prompt bodies
+            options: Ollama generation options
+            schema: Response schema of a single item
+            
+        Returns:
+            Result per item, None where the batch answer has none
+        """
+        if len(bodies) == 1:
+            # Nothing to share - let the item run as a normal generation
+            return [None]
+        
+        ids = batch_item_ids(len(bodies))
+        prompt = self._build_batch_prompt(prefix, ids, bodies)
+        if options.get("num_predict"):
+            # Room for every item's answer, in a context sized for the whole batch
+            num_predict = options["num_predict"] * len(bodies)
+            options = {**options, "num_predict": num_predict}
+            num_ctx = context_size(self.prompts.counter.count(prompt), num_predict)
+            if num_ctx:
+                options["num_ctx"] = num_ctx
+        try:
+            response = await self._generate_uncached(None, prompt, options, batch_schema(schema, ids))
+            answer = parse_json_output(response['response'])
+        except LLMOverloadedError:
+            raise
+        except Exception as e:
+            # Escape curly braces in error message to avoid loguru format issues
+            error_msg = str(e).replace('{', '{{').replace('}', '}}')
+            logger.warning(f"Batched generation of {len(bodies)} items failed: {error_msg}")
+            return [None] * len(bodies)
+        
+        logger.info(f"Answered {len(bodies)} batched prompts in one generation")
+        return [answer.get(item_id) if isinstance(answer.get(item_id), dict) else None for item_id in ids]
+        
+    async def _call_ollama(self, prompt: str, options: Dict[str, Any],
+                           schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send one generation to Ollama while holding an admission slot.
+        
+        The response is streamed even though the caller wants it whole, so
+        with structured output the output can be validated as it arrives
+        and the generation aborted as soon as it diverges from the schema.
+        
+        Args:
+            prompt: Prompt to send to the model
+            options: Ollama generation options
+            schema: JSON schema the response must follow
+            
+        Returns:
+            Ollama generate response: the statistics of the final chunk and
+            the complete 'response' text
+            
+        Raises:
+            SchemaMismatchError: The output diverged from the schema
+        """
+        parser = IncrementalJSONParser()
+        validator = self._validator(schema)
+        final: Dict[str, Any] = {}
+        async with self.admission.limiter("ollama").slot() as queued:
+            self.warmer.touch()
+            telemetry = LLMCallTelemetry("ollama", self.model, queued)
+            stream = await self.client.generate(
+                model=self.model,
+                format=self._format(schema),
+                options=options,
+                stream=True,
+                keep_alive=settings.ollama_keep_alive,
+                **self._prompt_fields(prompt)
+            )
+            generated = 0
+            try:
+                async for chunk in stream:
+                    if chunk.get('response'):
+                        telemetry.first_token()
+                        generated += 1
+                    self._check_chunk(parser, validator, chunk.get('response', ''))
+                    if chunk.get('done'):
+                        final = dict(chunk)
+            except asyncio.CancelledError:
+                # The caller went away (e.g. the client disconnected)
+                telemetry.cancel(generated, options.get("num_predict"))
+                raise
+            finally:
+                # Closing the stream early drops the connection, which stops the generation
+                await stream.aclose()
+        telemetry.finish_ollama(final)
+        record_completion(prompt, options.get("num_predict"), final.get("eval_count") or 0, final.get("done_reason"))
+        self._record_prompt_cache(prompt, final)
+        final['response'] = parser.buffer
+        return final
+    
+    def _validator(self, schema: Optional[Dict[str, Any]]) -> Optional[StreamingSchemaValidator]:
+        """Validator aborting generations that diverge from the schema, when the schema is sent.
+        
+        In plain JSON mode the model is not held to the schema: an extra key
+        or a differently typed field is normal there and still parsed (and
+        repaired) at the end, so the output is not validated while streaming.
+        """
+        return StreamingSchemaValidator(schema) if schema and settings.llm_structured_output else None
+    
+    def _check_chunk(self, parser: IncrementalJSONParser, validator: Optional[StreamingSchemaValidator],
+                     text: str) -> List[Tuple[str, Any]]:
+        """Feed streamed output to the parser and validate it against the schema.
+        
+        Returns:
+            Top-level fields completed by this chunk
+            
+        Raises:
+            SchemaMismatchError: The output diverged from the schema
+        """
+        if not text:
+            return []
+        fields = parser.feed(text)
+        if validator:
+            try:
+                validator.check_text(parser.buffer)
+                for key, value in fields:
+                    validator.check_field(key, value)
+            except SchemaMismatchError as e:
+                schema_divergences.inc(provider="ollama")
+                # Escape curly braces in error message to avoid loguru format issues
+                error_msg = str(e).replace('{', '{{').replace('}', '}}')
+                logger.warning(f"Aborting generation after {len(parser.buffer)} chars, output diverged from the schema: {error_msg}")
+                raise
+        return fields
+    
+    def _prompt_fields(self, prompt: str) -> Dict[str, str]:
+        """Split a prompt into Ollama's system and prompt fields.
+        
+        The static prefix goes into ``system`` so it leads the templated
+        prompt on every call of the same kind; Ollama then reuses the KV
+        cache for it and only prefills the code.
+        """
+        prefix, body = split_prompt(prompt)
+        if not settings.prompt_prefix_cache or not prefix:
+            return {"prompt": prompt}
+        return {"system": prefix.strip(), "prompt": body}
+    
+    def _record_prompt_cache(self, prompt: str, response: Dict[str, Any]) -> None:
+        """Record prompt tokens and the estimated prefix cache hit of a call."""
+        prefix, _ = split_prompt(prompt)
+        cached = self.prefixes.observe(self.model, prefix) if settings.prompt_prefix_cache else 0
+        # prompt_eval_count may exclude reused tokens, so never report less than the prompt size
+        prompt_tokens = max(response.get('prompt_eval_count') or 0, self.prompts.counter.count(prompt))
+        record_prompt_cache("ollama", self.model, prompt_tokens, min(cached, prompt_tokens), estimated=True)
+    
+    async def _stream_json(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                           schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a JSON-mode generation, emitting fields as they complete.
+        
+        Args:
+            prompt: Prompt to send to the model
+            options: Ollama generation options, by default those of the
+                prompt's generation profile
+            schema: JSON schema the response must follow
+            
+        Yields:
+            Events of type "token" (raw text delta), "field" (a completed
+            top-level field) and finally "result" (the whole decoded object)
+            
+        Raises:
+            SchemaMismatchError: The output diverged from the schema; the
+                generation is aborted
+        """
+        options = options or generation_options(prompt)
+        parser = IncrementalJSONParser()
+        validator = self._validator(schema)
+        cache_key = make_cache_key("ollama", self.model, cache_identity(prompt), {"format": self._format(schema), **options})
+        
+        recalled, reference = await self._recall(cache_key, prompt, options, schema)
+        if recalled is not None:
+            for key, value in parser.feed(recalled['response']):
+                yield {"type": "field", "field": key, "value": value}
+            yield {"type": "result", "value": parser.result(), "cached": True}
+            return
+        sent = self._with_reference(prompt, reference) if reference else prompt
         
+        with self.breaker.protect(ignore=(LLMOverloadedError, SchemaMismatchError)):
+            async with self.admission.limiter("ollama").slot() as queued:
+                self.warmer.touch()
+                telemetry = LLMCallTelemetry("ollama", self.model, queued)
+                stream = await self.client.generate(
+                    model=self.model,
+                    format=self._format(schema),
+                    options=options,
+                    stream=True,
+                    keep_alive=settings.ollama_keep_alive,
+                    **self._prompt_fields(sent)
+                )
+                generated = 0
+                try:
+                    async for chunk in stream:
+                        text = chunk.get('response', '')
+                        fields = self._check_chunk(parser, validator, text)
+                        if text:
+                            telemetry.first_token()
+                            generated += 1
+                            yield {"type": "token", "text": text}
+                        for key, value in fields:
+                            yield {"type": "field", "field": key, "value": value}
+                        if chunk.get('done'):
+                            telemetry.finish_ollama(chunk)
+                            record_completion(sent, options.get("num_predict"),
+                                              chunk.get("eval_count") or 0, chunk.get("done_reason"))
+                            self._record_prompt_cache(sent, chunk)
+                except (asyncio.CancelledError, GeneratorExit):
+                    # The consumer went away (e.g. the SSE client disconnected)
+                    if not parser.complete:
+                        telemetry.cancel(generated, options.get("num_predict"))
+                    raise
+                finally:
+                    await stream.aclose()
+        
+        result = parser.result()
+        if parser.complete and result:
+            await self._remember(cache_key, prompt, options, schema, parser.buffer)
+        yield {"type": "result", "value": result}
+    
+    def stream_business_logic(self, code: str, language: CodeLanguage) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of analyze_business_logic.
+        
+        Code too large for one prompt is analyzed chunk by chunk; only the
+        merged fields are streamed, once the reduce step has finished.
+        """
+        if len(code) > settings.llm_chunk_max_chars:
+            return self._stream_chunked_business_logic(code, language)
+        return self._stream_json(
+            self._build_business_logic_prompt(code, language),
+            schema=RESPONSE_SCHEMAS["business_logic"]
+        )
+    
+    def stream_conversion_validation(self, original_code: str, converted_code: str,
+                                     conversion_type: ConversionType, language: CodeLanguage) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of validate_conversion."""
+        return self._stream_json(
+            self._build_conversion_validation_prompt(original_code, converted_code, conversion_type, language),
+            schema=RESPONSE_SCHEMAS["conversion_validation"]
+        )
+    
+    def stream_python3_validation(self, original_code: str, converted_code: str) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of validate_python3_conversion."""
+        return self._stream_json(
+            self._build_python3_validation_prompt(original_code, converted_code),
+            schema=RESPONSE_SCHEMAS["python3_validation"]
+        )
+    
+    def stream_additional_tests(self, code: str, language: CodeLanguage,
+                                generated_tests: str, test_framework: str) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of suggest_additional_tests."""
+        return self._stream_json(
+            self._build_additional_tests_prompt(code, language, generated_tests, test_framework),
+            schema=RESPONSE_SCHEMAS["additional_tests"]
+        )
+    
     async def analyze_business_logic(self, code: str, language: CodeLanguage, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze business logic in the code using LLM.
         
@@ -31,45 +524,24 @@ class LLMService:
             Business logic analysis results
         """
         
-        prompt = f"""
-        Analyze the following {language.value} code for business logic and functionality.
-        
-        Code:
-        ```{language.value}
-        {code}
-        ```
-        
-        Please provide:
-        1. A summary of the business logic and purpose
-        2. Key functions and their roles
-        3. Data flow and processing steps
-        4. Potential business rules or constraints
+        if len(code) > settings.llm_chunk_max_chars:
+            return await self._analyze_business_logic_chunked(code, language)
         
-        Format your response as JSON with the following structure:
-        {{
-            "business_logic_summary": "Brief summary of what this code does",
-            "key_functions": ["list of important functions and their purposes"],
-            "data_flow": "Description of how data flows through the code",
-            "business_rules": ["list of business rules or constraints"],
-            "recommendations": ["list of improvement recommendations"]
-        }}
-        """
+        prompt = self._build_business_logic_prompt(code, language)
         
         try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.3,
-                    "top_p": 0.9
-                }
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["business_logic"]
             )
             
-            result = json.loads(response['response'])
+            result = parse_json_output(response['response'])
             logger.info(f"Business logic analysis completed for {language.value} code")
             return result
             
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -82,6 +554,122 @@ class LLMService:
                 "recommendations": []
             }
     
+    async def _stream_chunked_business_logic(self, code: str, language: CodeLanguage) -> AsyncIterator[Dict[str, Any]]:
+        """Emit the chunked analysis result as field and result events."""
+        result = await self._analyze_business_logic_chunked(code, language)
+        for key, value in result.items():
+            yield {"type": "field", "field": key, "value": value}
+        yield {"type": "result", "value": result}
+    
+    async def _analyze_business_logic_chunked(self, code: str, language: CodeLanguage) -> Dict[str, Any]:
+        """Map-reduce business logic analysis for code larger than one prompt.
+        
+        The code is split along top-level definitions, each chunk is
+        summarised concurrently (at most ``llm_chunk_concurrency`` at a time)
+        and the partial results are merged by a final reduce prompt. Chunk
+        prompts go through the response cache, so editing one function of a
+        large file only re-summarises the chunk that changed.
+        
+        Args:
+            code: Source code to analyze
+            language: Programming language
+            
+        Returns:
+            Business logic analysis results
+        """
+        chunks = self.code_analyzer.split_into_chunks(code, language, settings.llm_chunk_max_chars)
+        logger.info(f"Analyzing {language.value} code in {len(chunks)} chunks")
+        
+        semaphore = asyncio.Semaphore(settings.llm_chunk_concurrency)
+        
+        async def summarize(chunk: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self._summarize_chunk(chunk, len(chunks), language)
+        
+        tasks = [asyncio.create_task(summarize(chunk)) for chunk in chunks]
+        try:
+            partials = await asyncio.gather(*tasks)
+        except BaseException:
+            # An overloaded provider fails the whole analysis; stop the other chunks
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        summaries = [partial for partial in partials if partial is not None]
+        if not summaries:
+            return {
+                "business_logic_summary": "Analysis failed",
+                "key_functions": [],
+                "data_flow": "",
+                "business_rules": [],
+                "recommendations": []
+            }
+        
+        result = self._merge_chunk_summaries(summaries)
+        if len(summaries) > 1:
+            result.update(await self._reduce_chunk_summaries(summaries, language))
+        result["chunks_analyzed"] = len(summaries)
+        result["chunks_total"] = len(chunks)
+        return result
+    
+    async def _summarize_chunk(self, chunk: Dict[str, Any], total: int, language: CodeLanguage) -> Optional[Dict[str, Any]]:
+        """Map step: analyze a single chunk, returning None if it fails."""
+        try:
+            response = await self._generate(
+                self._build_chunk_summary_prompt(chunk, total, language),
+                schema=RESPONSE_SCHEMAS["chunk_summary"]
+            )
+            partial = parse_json_output(response['response'])
+            partial["lines"] = f"{chunk['start_line']}-{chunk['end_line']}"
+            return partial
+        except LLMOverloadedError:
+            raise
+        except Exception as e:
+            # Escape curly braces in error message to avoid loguru format issues
+            error_msg = str(e).replace('{', '{{').replace('}', '}}')
+            logger.warning(f"Chunk {chunk['index'] + 1}/{total} analysis failed: {error_msg}")
+            return None
+    
+    async def _reduce_chunk_summaries(self, summaries: List[Dict[str, Any]], language: CodeLanguage) -> Dict[str, Any]:
+        """Reduce step: ask the model to merge the per-chunk summaries.
+        
+        Returns only the fields the model produced, so the caller can keep
+        the mechanically merged values for anything missing.
+        """
+        try:
+            response = await self._generate(
+                self._build_chunk_reduce_prompt(summaries, language),
+                schema=RESPONSE_SCHEMAS["chunk_reduce"]
+            )
+            reduced = parse_json_output(response['response'])
+        except LLMOverloadedError:
+            raise
+        except Exception as e:
+            # Escape curly braces in error message to avoid loguru format issues
+            error_msg = str(e).replace('{', '{{').replace('}', '}}')
+            logger.warning(f"Chunk summary reduce failed, using merged summaries: {error_msg}")
+            return {}
+        
+        fields = ("business_logic_summary", "data_flow", "business_rules", "recommendations")
+        return {key: reduced[key] for key in fields if reduced.get(key)}
+    
+    def _merge_chunk_summaries(self, summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine per-chunk results without the model, de-duplicating list fields."""
+        merged: Dict[str, Any] = {
+            "business_logic_summary": "\n".join(
+                f"Lines {s['lines']}: {s.get('business_logic_summary', '')}" for s in summaries
+            ),
+            "data_flow": "\n".join(s.get("data_flow", "") for s in summaries if s.get("data_flow")),
+        }
+        for key in ("key_functions", "business_rules", "recommendations"):
+            items: List[Any] = []
+            for summary in summaries:
+                for item in summary.get(key) or []:
+                    if item not in items:
+                        items.append(item)
+            merged[key] = items
+        return merged
+    
     async def analyze_python2_migration(self, code: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze Python 2 code for migration to Python 3.
         
@@ -93,45 +681,21 @@ class LLMService:
             Python 2 to 3 migration analysis
         """
         
-        prompt = f"""
-        Analyze the following Python 2 code for migration to Python 3.
-        
-        Code:
-        ```python
-        {code}
-        ```
-        
-        Please provide:
-        1. A summary of the business logic
-        2. Python 2 specific issues that need migration
-        3. Migration complexity assessment
-        4. Specific recommendations for Python 3 migration
-        
-        Format your response as JSON with the following structure:
-        {{
-            "business_logic_summary": "Brief summary of what this code does",
-            "python2_issues": ["list of Python 2 specific issues"],
-            "migration_complexity": "low|medium|high",
-            "migration_recommendations": ["list of specific migration recommendations"],
-            "critical_changes": ["list of critical changes needed"]
-        }}
-        """
+        prompt = self._build_python2_migration_prompt(code)
         
         try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.3,
-                    "top_p": 0.9
-                }
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["python2_migration"]
             )
             
-            result = json.loads(response['response'])
+            result = parse_json_output(response['response'])
             logger.info("Python 2 migration analysis completed")
             return result
             
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -158,50 +722,21 @@ class LLMService:
             Validation results
         """
         
-        prompt = f"""
-        Validate the following code conversion from {conversion_type.value}.
-        
-        Original {language.value} code:
-        ```{language.value}
-        {original_code}
-        ```
-        
-        Converted {language.value} code:
-        ```{language.value}
-        {converted_code}
-        ```
-        
-        Please analyze and provide:
-        1. Validation of functional equivalence
-        2. Any potential issues or regressions
-        3. Compatibility notes
-        4. Test suggestions to verify the conversion
-        
-        Format your response as JSON with the following structure:
-        {{
-            "validation_status": "valid|warnings|errors",
-            "warnings": ["list of warnings"],
-            "errors": ["list of errors"],
-            "compatibility_notes": ["list of compatibility notes"],
-            "test_suggestions": ["list of test suggestions"]
-        }}
-        """
+        prompt = self._build_conversion_validation_prompt(original_code, converted_code, conversion_type, language)
         
         try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.3,
-                    "top_p": 0.9
-                }
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["conversion_validation"]
             )
             
-            result = json.loads(response['response'])
+            result = parse_json_output(response['response'])
             logger.info(f"Conversion validation completed for {conversion_type.value}")
             return result
             
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -225,51 +760,21 @@ class LLMService:
             Python 3 conversion validation results
         """
         
-        prompt = f"""
-        Validate this Python 2 to Python 3 conversion.
-        
-        Original Python 2 code:
-        ```python
-        {original_code}
-        ```
-        
-        Converted Python 3 code:
-        ```python
-        {converted_code}
-        ```
-        
-        Please analyze:
-        1. Correctness of Python 2 to 3 syntax changes
-        2. Proper handling of Python 2 specific features
-        3. Modern Python 3 best practices
-        4. Potential runtime issues
-        
-        Format your response as JSON with the following structure:
-        {{
-            "validation_status": "valid|warnings|errors",
-            "python3_compliance": "excellent|good|needs_improvement",
-            "warnings": ["list of warnings"],
-            "errors": ["list of errors"],
-            "compatibility_notes": ["list of Python 3 compatibility notes"],
-            "improvement_suggestions": ["list of improvement suggestions"]
-        }}
-        """
+        prompt = self._build_python3_validation_prompt(original_code, converted_code)
         
         try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.3,
-                    "top_p": 0.9
-                }
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["python3_validation"]
             )
             
-            result = json.loads(response['response'])
+            result = parse_json_output(response['response'])
             logger.info("Python 3 conversion validation completed")
             return result
             
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -294,45 +799,21 @@ class LLMService:
             Modernization suggestions
         """
         
-        prompt = f"""
-        Suggest modernizations for the following {language.value} code.
-        
-        Code:
-        ```{language.value}
-        {code}
-        ```
-        
-        Please suggest:
-        1. Modern syntax improvements
-        2. Updated libraries or frameworks
-        3. Better coding practices
-        4. Performance improvements
-        
-        Format your response as JSON with the following structure:
-        {{
-            "suggested_changes": ["list of suggested changes"],
-            "warnings": ["list of warnings"],
-            "errors": [],
-            "compatibility_notes": ["list of compatibility notes"],
-            "test_suggestions": ["list of test suggestions"]
-        }}
-        """
+        prompt = self._build_modernization_prompt(code, language)
         
         try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.4,
-                    "top_p": 0.9
-                }
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["modernization"]
             )
             
-            result = json.loads(response['response'])
+            result = parse_json_output(response['response'])
             logger.info(f"Modernization suggestions generated for {language.value}")
             return result
             
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -359,52 +840,21 @@ class LLMService:
             Additional test suggestions
         """
         
-        prompt = f"""
-        Suggest additional test cases for the following {language.value} code.
-        
-        Original code:
-        ```{language.value}
-        {code}
-        ```
-        
-        Already generated tests ({test_framework}):
-        ```{language.value}
-        {generated_tests}
-        ```
-        
-        Please suggest:
-        1. Additional edge cases
-        2. Error handling tests
-        3. Integration tests
-        4. Performance tests (if applicable)
-        
-        Format your response as JSON with the following structure:
-        {{
-            "additional_test_cases": [
-                {{
-                    "name": "test_name",
-                    "description": "What this test covers",
-                    "implementation": "test implementation code"
-                }}
-            ]
-        }}
-        """
+        prompt = self._build_additional_tests_prompt(code, language, generated_tests, test_framework)
         
         try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.4,
-                    "top_p": 0.9
-                }
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["additional_tests"]
             )
             
-            result = json.loads(response['response'])
+            result = parse_json_output(response['response'])
             logger.info(f"Additional test suggestions generated for {language.value}")
             return result
             
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -424,51 +874,21 @@ class LLMService:
             Shadow test scenarios
         """
         
-        prompt = f"""
-        Suggest shadow test scenarios for the following {language.value} code.
-        
-        Shadow tests are used to compare the behavior of original code and converted code
-        to ensure functional equivalence.
-        
-        Code:
-        ```{language.value}
-        {code}
-        ```
-        
-        Please suggest:
-        1. Input scenarios that test key functionality
-        2. Edge cases that might reveal conversion issues
-        3. Performance comparison scenarios
-        4. Integration scenarios
-        
-        Format your response as JSON with the following structure:
-        {{
-            "shadow_scenarios": [
-                {{
-                    "name": "scenario_name",
-                    "description": "What this scenario tests",
-                    "input_data": "sample input data",
-                    "expected_behavior": "expected behavior description"
-                }}
-            ]
-        }}
-        """
+        prompt = self._build_shadow_scenarios_prompt(code, language)
         
         try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.4,
-                    "top_p": 0.9
-                }
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["shadow_scenarios"]
             )
             
-            result = json.loads(response['response'])
+            result = parse_json_output(response['response'])
             logger.info(f"Shadow test scenarios generated for {language.value}")
             return result
             
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
         except Exception as e:
             # Escape curly braces in error message to avoid loguru format issues
             error_msg = str(e).replace('{', '{{').replace('}', '}}')
@@ -477,6 +897,67 @@ class LLMService:
                 "shadow_scenarios": []
             }
     
+    async def analyze_combined(self, code: str, tasks: List[str],
+                               converted_code: Optional[str] = None) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Answer several tasks about the same Python 2 code with one generation.
+        
+        The code is sent once and the model returns one JSON object with a
+        key per task (see ``COMBINED_TASKS``). Tasks missing from, or
+        malformed in, the combined answer are retried with their individual
+        prompt, so the result always has every requested task.
+        
+        Args:
+            code: Original Python 2 source code
+            tasks: Task names from COMBINED_TASKS
+            converted_code: Converted Python 3 code, required by python3_validation
+            
+        Returns:
+            Tuple of (task name to result, number of generations sent to the
+            model; answers from the cache or a concurrent identical request
+            are not counted)
+        """
+        
+        with ProviderCallCounter() as counter:
+            results = await self._analyze_combined(code, tasks, converted_code)
+        return results, counter.calls
+    
+    async def _analyze_combined(self, code: str, tasks: List[str],
+                                converted_code: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        prompt = self._build_combined_prompt(code, tasks, converted_code)
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        try:
+            response = await self._generate(
+                prompt,
+                options=generation_options(prompt, combined_num_predict(tasks)),
+                schema=combined_schema(tasks)
+            )
+            
+            combined = parse_json_output(response['response'])
+            results = {task: combined[task] for task in tasks if isinstance(combined.get(task), dict)}
+            logger.info(f"Combined analysis answered {len(results)}/{len(tasks)} tasks in one generation")
+            
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
+        except Exception as e:
+            # Escape curly braces in error message to avoid loguru format issues
+            error_msg = str(e).replace('{', '{{').replace('}', '}}')
+            logger.error(f"Combined analysis failed: {error_msg}")
+        
+        missing = [task for task in tasks if task not in results]
+        if missing:
+            logger.warning(f"Running separate generations for tasks missing from the combined answer: {missing}")
+            single = {
+                "python2_migration": lambda: self.analyze_python2_migration(code),
+                "python3_validation": lambda: self.validate_python3_conversion(code, converted_code or ""),
+                "shadow_scenarios": lambda: self.suggest_shadow_test_scenarios(code, CodeLanguage.PYTHON),
+            }
+            answers = await asyncio.gather(*(single[task]() for task in missing))
+            results.update(zip(missing, answers))
+        
+        return results
+    
     async def improve_python_tests(self, code: str, generated_tests: str, test_framework: str) -> Dict[str, Any]:
         """Improve Python tests using LLM.
         
@@ -489,18 +970,389 @@ class LLMService:
             Improved test suggestions
         """
         
-        prompt = f"""
-        Improve the following Python tests for better coverage and quality.
+        prompt = self._build_test_improvement_prompt(code, generated_tests, test_framework)
         
-        Original code:
+        try:
+            response = await self._generate(
+                prompt,
+                schema=RESPONSE_SCHEMAS["test_improvement"]
+            )
+            
+            result = parse_json_output(response['response'])
+            logger.info(f"Python test improvements generated for {test_framework}")
+            return result
+            
+        except LLMOverloadedError:
+            # Let admission rejections reach the API layer as 429/503
+            raise
+        except Exception as e:
+            # Escape curly braces in error message to avoid loguru format issues
+            error_msg = str(e).replace('{', '{{').replace('}', '}}')
+            logger.error(f"Python test improvements failed: {error_msg}")
+            return {
+                "improved_test_cases": []
+            }
+    
+    def _build_business_logic_prompt(self, code: str, language: CodeLanguage) -> str:
+        """Build the business logic analysis prompt."""
+        return self.prompts.build(
+            "business_logic",
+            instructions="""
+        Analyze {language.value} code for business logic and functionality.
+        
+        Please provide:
+        1. A summary of the business logic and purpose
+        2. Key functions and their roles
+        3. Data flow and processing steps
+        4. Potential business rules or constraints
+        
+        Format your response as JSON with the following structure:
+        {{
+            "business_logic_summary": "Brief summary of what this code does",
+            "key_functions": ["list of important functions and their purposes"],
+            "data_flow": "Description of how data flows through the code",
+            "business_rules": ["list of business rules or constraints"],
+            "recommendations": ["list of improvement recommendations"]
+        }}
+        """,
+            template="""
+        Code:
+        ```{language.value}
+        {code}
+        ```
+        """,
+            sources={"code": code}, source_language=language.value, language=language
+        )
+    
+    def _build_chunk_summary_prompt(self, chunk: Dict[str, Any], total: int, language: CodeLanguage) -> str:
+        """Build the map-step prompt for one chunk of a larger file."""
+        return self.prompts.build(
+            "chunk_summary",
+            instructions="""
+        The {language.value} code below is one part of a larger file. Analyze only this part
+        for business logic and functionality; other parts are analyzed separately.
+        
+        Format your response as JSON with the following structure:
+        {{
+            "business_logic_summary": "Brief summary of what this part of the code does",
+            "key_functions": ["list of important functions in this part and their purposes"],
+            "data_flow": "Description of how data flows through this part",
+            "business_rules": ["list of business rules or constraints"],
+            "recommendations": ["list of improvement recommendations"]
+        }}
+        """,
+            template="""
+        Part {part} of {total} (lines {start_line}-{end_line}):
+        ```{language.value}
+        {code}
+        ```
+        """,
+            sources={"code": chunk["code"]}, source_language=language.value,
+            language=language, part=chunk["index"] + 1, total=total,
+            start_line=chunk["start_line"], end_line=chunk["end_line"]
+        )
+    
+    def _build_chunk_reduce_prompt(self, summaries: List[Dict[str, Any]], language: CodeLanguage) -> str:
+        """Build the reduce-step prompt merging per-chunk summaries."""
+        partials = json.dumps([
+            {
+                "lines": s.get("lines"),
+                "summary": s.get("business_logic_summary", ""),
+                "data_flow": s.get("data_flow", ""),
+                "business_rules": s.get("business_rules", []),
+                "recommendations": s.get("recommendations", []),
+            }
+            for s in summaries
+        ], ensure_ascii=False, indent=2)
+        return self.prompts.build(
+            "chunk_reduce",
+            instructions="""
+        A large {language.value} file was analyzed in parts. Combine the partial analyses
+        below into one analysis of the whole file. Merge duplicates and describe how the
+        parts work together.
+        
+        Format your response as JSON with the following structure:
+        {{
+            "business_logic_summary": "Brief summary of what the whole file does",
+            "data_flow": "Description of how data flows through the file",
+            "business_rules": ["list of business rules or constraints"],
+            "recommendations": ["list of the most important improvement recommendations"]
+        }}
+        """,
+            template="""
+        Partial analyses of the {parts} parts:
+        {partials}
+        """,
+            sources={}, language=language, parts=len(summaries), partials=partials
+        )
+    
+    def _build_combined_prompt(self, code: str, tasks: List[str], converted_code: Optional[str]) -> str:
+        """Build one prompt covering several tasks on the same code."""
+        template = """
+        Original Python 2 code:
         ```python
         {code}
         ```
+        """
+        sources = {"code": code}
+        if any(COMBINED_TASKS[task].get("needs_converted_code") for task in tasks):
+            template += """
+        Converted Python 3 code:
+        ```python
+        {converted_code}
+        ```
+        """
+            sources["converted_code"] = converted_code or ""
+        task_instructions = "\n".join(
+            f"- {task}: {COMBINED_TASKS[task]['instruction']}" for task in tasks
+        )
+        return self.prompts.build(
+            "combined",
+            instructions="""
+        Perform the following tasks on the Python 2 code below in a single response.
         
-        Generated tests ({test_framework}):
+        Tasks:
+        {task_instructions}
+        
+        Respond with a single JSON object that has one key per task and matches this JSON schema:
+        {schema}
+        """,
+            template=template,
+            sources=sources, source_language="python",
+            task_instructions=task_instructions,
+            schema=json.dumps(combined_schema(tasks))
+        )
+    
+    def _build_batch_prompt(self, prefix: str, ids: List[str], bodies: List[str]) -> Prompt:
+        """Build one prompt applying a task's instructions to several inputs."""
+        instructions = prefix + """
+
+Apply the instructions above to each of the inputs below, which are marked with "### <item ID>" headings.
+Respond with a single JSON object that has one key per item ID; each value is the JSON response for that input.
+"""
+        items = "\n".join(f"### {item_id}\n{body.strip()}\n" for item_id, body in zip(ids, bodies))
+        return Prompt(instructions, items)
+    
+    def _build_python2_migration_prompt(self, code: str) -> str:
+        """Build the Python 2 migration analysis prompt."""
+        return self.prompts.build(
+            "python2_migration",
+            instructions="""
+        Analyze Python 2 code for migration to Python 3.
+        
+        Please provide:
+        1. A summary of the business logic
+        2. Python 2 specific issues that need migration
+        3. Migration complexity assessment
+        4. Specific recommendations for Python 3 migration
+        
+        Format your response as JSON with the following structure:
+        {{
+            "business_logic_summary": "Brief summary of what this code does",
+            "python2_issues": ["list of Python 2 specific issues"],
+            "migration_complexity": "low|medium|high",
+            "migration_recommendations": ["list of specific migration recommendations"],
+            "critical_changes": ["list of critical changes needed"]
+        }}
+        """,
+            template="""
+        Code:
+        ```python
+        {code}
+        ```
+        """,
+            sources={"code": code}, source_language="python"
+        )
+    
+    def _build_conversion_validation_prompt(self, original_code: str, converted_code: str, conversion_type: ConversionType, language: CodeLanguage) -> str:
+        """Build the conversion validation prompt."""
+        return self.prompts.build(
+            "conversion_validation",
+            instructions="""
+        Validate a code conversion from {conversion_type.value}.
+        
+        Please analyze and provide:
+        1. Validation of functional equivalence
+        2. Any potential issues or regressions
+        3. Compatibility notes
+        4. Test suggestions to verify the conversion
+        
+        Format your response as JSON with the following structure:
+        {{
+            "validation_status": "valid|warnings|errors",
+            "warnings": ["list of warnings"],
+            "errors": ["list of errors"],
+            "compatibility_notes": ["list of compatibility notes"],
+            "test_suggestions": ["list of test suggestions"]
+        }}
+        """,
+            template="""
+        Original {language.value} code:
+        ```{language.value}
+        {original_code}
+        ```
+        
+        Converted {language.value} code:
+        ```{language.value}
+        {converted_code}
+        ```
+        """,
+            sources={"original_code": original_code, "converted_code": converted_code},
+            source_language=language.value, language=language, conversion_type=conversion_type
+        )
+    
+    def _build_python3_validation_prompt(self, original_code: str, converted_code: str) -> str:
+        """Build the Python 2 to 3 conversion validation prompt."""
+        return self.prompts.build(
+            "python3_validation",
+            instructions="""
+        Validate a Python 2 to Python 3 conversion.
+        
+        Please analyze:
+        1. Correctness of Python 2 to 3 syntax changes
+        2. Proper handling of Python 2 specific features
+        3. Modern Python 3 best practices
+        4. Potential runtime issues
+        
+        Format your response as JSON with the following structure:
+        {{
+            "validation_status": "valid|warnings|errors",
+            "python3_compliance": "excellent|good|needs_improvement",
+            "warnings": ["list of warnings"],
+            "errors": ["list of errors"],
+            "compatibility_notes": ["list of Python 3 compatibility notes"],
+            "improvement_suggestions": ["list of improvement suggestions"]
+        }}
+        """,
+            template="""
+        Original Python 2 code:
         ```python
+        {original_code}
+        ```
+        
+        Converted Python 3 code:
+        ```python
+        {converted_code}
+        ```
+        """,
+            sources={"original_code": original_code, "converted_code": converted_code},
+            source_language="python"
+        )
+    
+    def _build_modernization_prompt(self, code: str, language: CodeLanguage) -> str:
+        """Build the modernization suggestions prompt."""
+        return self.prompts.build(
+            "modernization",
+            instructions="""
+        Suggest modernizations for {language.value} code.
+        
+        Please suggest:
+        1. Modern syntax improvements
+        2. Updated libraries or frameworks
+        3. Better coding practices
+        4. Performance improvements
+        
+        Format your response as JSON with the following structure:
+        {{
+            "suggested_changes": ["list of suggested changes"],
+            "warnings": ["list of warnings"],
+            "errors": [],
+            "compatibility_notes": ["list of compatibility notes"],
+            "test_suggestions": ["list of test suggestions"]
+        }}
+        """,
+            template="""
+        Code:
+        ```{language.value}
+        {code}
+        ```
+        """,
+            sources={"code": code}, source_language=language.value, language=language
+        )
+    
+    def _build_additional_tests_prompt(self, code: str, language: CodeLanguage, generated_tests: str, test_framework: str) -> str:
+        """Build the additional test suggestions prompt."""
+        return self.prompts.build(
+            "additional_tests",
+            instructions="""
+        Suggest additional test cases for {language.value} code that already has
+        generated {test_framework} tests.
+        
+        Please suggest:
+        1. Additional edge cases
+        2. Error handling tests
+        3. Integration tests
+        4. Performance tests (if applicable)
+        
+        Format your response as JSON with the following structure:
+        {{
+            "additional_test_cases": [
+                {{
+                    "name": "test_name",
+                    "description": "What this test covers",
+                    "implementation": "test implementation code"
+                }}
+            ]
+        }}
+        """,
+            template="""
+        Original code:
+        ```{language.value}
+        {code}
+        ```
+        
+        Already generated tests ({test_framework}):
+        ```{language.value}
         {generated_tests}
         ```
+        """,
+            sources={"code": code, "generated_tests": generated_tests},
+            source_language=language.value, language=language, test_framework=test_framework
+        )
+    
+    def _build_shadow_scenarios_prompt(self, code: str, language: CodeLanguage) -> str:
+        """Build the shadow test scenarios prompt."""
+        return self.prompts.build(
+            "shadow_scenarios",
+            instructions="""
+        Suggest shadow test scenarios for {language.value} code.
+        
+        Shadow tests are used to compare the behavior of original code and converted code
+        to ensure functional equivalence.
+        
+        Please suggest:
+        1. Input scenarios that test key functionality
+        2. Edge cases that might reveal conversion issues
+        3. Performance comparison scenarios
+        4. Integration scenarios
+        
+        Format your response as JSON with the following structure:
+        {{
+            "shadow_scenarios": [
+                {{
+                    "name": "scenario_name",
+                    "description": "What this scenario tests",
+                    "input_data": "sample input data",
+                    "expected_behavior": "expected behavior description"
+                }}
+            ]
+        }}
+        """,
+            template="""
+        Code:
+        ```{language.value}
+        {code}
+        ```
+        """,
+            sources={"code": code}, source_language=language.value, language=language
+        )
+    
+    def _build_test_improvement_prompt(self, code: str, generated_tests: str, test_framework: str) -> str:
+        """Build the Python test improvement prompt."""
+        return self.prompts.build(
+            "test_improvement",
+            instructions="""
+        Improve generated Python tests for better coverage and quality.
         
         Please suggest improvements for:
         1. Better test organization
@@ -519,27 +1371,18 @@ class LLMService:
                 }}
             ]
         }}
-        """
+        """,
+            template="""
+        Original code:
+        ```python
+        {code}
+        ```
         
-        try:
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                format="json",
-                options={
-                    "temperature": 0.3,
-                    "top_p": 0.9
-                }
-            )
-            
-            result = json.loads(response['response'])
-            logger.info(f"Python test improvements generated for {test_framework}")
-            return result
-            
-        except Exception as e:
-            # Escape curly braces in error message to avoid loguru format issues
-            error_msg = str(e).replace('{', '{{').replace('}', '}}')
-            logger.error(f"Python test improvements failed: {error_msg}")
-            return {
-                "improved_test_cases": []
-            }
\ No newline at end of file
+        Generated tests ({test_framework}):
+        ```python
+        {generated_tests}
+        ```
+        """,
+            sources={"code": code, "generated_tests": generated_tests},
+            source_language="python", test_framework=test_framework
+        )
\ No newline at end of file
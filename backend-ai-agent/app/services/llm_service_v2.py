@@ -1,29 +1,61 @@
 """改进的LLM服务，支持多种提供商"""
 
 import asyncio
-import json
 import logging
-from typing import Dict, Any, Optional, List
-import httpx
-import openai
-from anthropic import Anthropic
-from app.utils.llm_config import get_llm_config, get_available_providers
+from typing import Dict, Any, Optional, List, Tuple
+from app.utils.llm_config import get_llm_config, get_available_providers, supports_json_schema
+from app.services.llm_clients import ProviderHTTPError, get_client_registry
+from app.services.llm_cache import get_llm_cache, make_cache_key
+from app.services.singleflight import get_llm_singleflight
+from app.services.admission import LLMOverloadedError, get_admission_controller
+from app.services.provider_health import get_provider_health
+from app.services.circuit_breaker import get_circuit_breakers, retry_with_backoff
+from app.services.prompt_cache import get_prefix_tracker, record_prompt_cache, usage_tokens
+from app.services.llm_telemetry import LLMCallTelemetry
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.utils.prompt_builder import Prompt, split_prompt
+from app.utils.json_stream import parse_json_output, schema_errors
+from app.services.llm_tasks import RESPONSE_SCHEMAS
+from app.services.generation_profiles import (
+    GENERATION_PROFILES, GenerationProfile, context_size, generation_profile, record_completion
+)
 
 logger = logging.getLogger(__name__)
 
+failovers = get_metrics().counter("llm_failover_total", "Calls that failed over to the next provider")
+hedges = get_metrics().counter("llm_hedge_total", "Hedged requests by outcome")
+
 class LLMService:
     """改进的LLM服务，支持多种提供商"""
     
     def __init__(self):
         self.config = get_llm_config()
         self.providers = get_available_providers()
+        # 连接池由 main.lifespan 创建和关闭，这里只借用
+        self.clients = get_client_registry()
+        self.cache = get_llm_cache() if get_settings().llm_cache_enabled else None
+        self.inflight = get_llm_singleflight() if get_settings().llm_singleflight_enabled else None
+        self.admission = get_admission_controller()
+        self.health = get_provider_health()
+        self.breakers = get_circuit_breakers()
+        self.prefixes = get_prefix_tracker()
+        self._provider_calls = {
+            "ollama": self._call_ollama,
+            "openai": self._call_openai,
+            "anthropic": self._call_anthropic,
+            "deepseek": self._call_deepseek,
+            "kimi": self._call_kimi,
+        }
         
     async def analyze_code(self, code: str, language: str, analysis_type: str = "general") -> Dict[str, Any]:
         """分析代码"""
         try:
             prompt = self._build_analysis_prompt(code, language, analysis_type)
-            response = await self._call_llm(prompt)
+            response = await self._call_llm(prompt, RESPONSE_SCHEMAS["code_analysis"])
             return self._parse_analysis_response(response, analysis_type)
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"代码分析失败: {e}")
             return self._get_fallback_analysis(code, language, analysis_type)
@@ -32,8 +64,10 @@ class LLMService:
         """建议改进"""
         try:
             prompt = self._build_improvement_prompt(code, language, issues)
-            response = await self._call_llm(prompt)
+            response = await self._call_llm(prompt, RESPONSE_SCHEMAS["code_improvement"])
             return self._parse_improvement_response(response)
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"改进建议失败: {e}")
             return self._get_fallback_improvements(code, language, issues)
@@ -42,8 +76,10 @@ class LLMService:
         """生成测试"""
         try:
             prompt = self._build_test_prompt(code, language, framework)
-            response = await self._call_llm(prompt)
+            response = await self._call_llm(prompt, RESPONSE_SCHEMAS["test_generation"])
             return self._parse_test_response(response, framework)
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"测试生成失败: {e}")
             return self._get_fallback_tests(code, language, framework)
@@ -52,150 +88,346 @@ class LLMService:
         """转换代码"""
         try:
             prompt = self._build_conversion_prompt(code, from_version, to_version, conversion_type)
-            response = await self._call_llm(prompt)
+            response = await self._call_llm(prompt, RESPONSE_SCHEMAS["code_conversion"])
             return self._parse_conversion_response(response, conversion_type)
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"代码转换失败: {e}")
             return self._get_fallback_conversion(code, from_version, to_version, conversion_type)
     
-    async def _call_llm(self, prompt: str) -> str:
-        """调用LLM API"""
-        if self.config.provider == "ollama":
-            return await self._call_ollama(prompt)
-        elif self.config.provider == "openai":
-            return await self._call_openai(prompt)
-        elif self.config.provider == "anthropic":
-            return await self._call_anthropic(prompt)
-        elif self.config.provider == "deepseek":
-            return await self._call_deepseek(prompt)
-        elif self.config.provider == "kimi":
-            return await self._call_kimi(prompt)
-        else:
-            raise ValueError(f"不支持的LLM提供商: {self.config.provider}")
-    
-    async def _call_ollama(self, prompt: str) -> str:
+    def _cache_key(self, provider: str, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        """某个提供商对该请求的响应缓存键"""
+        model = getattr(self.config, f"{provider}_model", "")
+        profile = self._profile(prompt)
+        options = {"temperature": profile.temperature, "max_tokens": profile.num_predict}
+        if schema and get_settings().llm_structured_output:
+            options["schema"] = schema
+        return make_cache_key(provider, model, prompt, options)
+    
+    async def _call_llm(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        """调用LLM API，相同的请求直接命中主提供商的响应缓存；schema 为期望的响应 JSON 结构"""
+        cache_key = self._cache_key(self.config.provider, prompt, schema)
+        if self.cache:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # 相同的并发请求共享同一个生成任务
+        if self.inflight:
+            return await self.inflight.do(cache_key, lambda: self._dispatch_and_cache(cache_key, prompt, schema))
+        return await self._dispatch_and_cache(cache_key, prompt, schema)
+    
+    async def _dispatch_and_cache(self, cache_key: str, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        """调用提供商并写入响应缓存
+        
+        缓存键属于实际返回响应的提供商：故障转移或对冲请求由备用提供商给出的响应
+        不会存到主提供商的键下，之后也不会被当作主提供商的响应返回。
+        """
+        provider, response = await self._route(prompt, schema)
+        if self.cache and response:
+            if provider != self.config.provider:
+                cache_key = self._cache_key(provider, prompt, schema)
+            await self.cache.set(cache_key, response)
+        return response
+    
+    def _provider_chain(self) -> List[str]:
+        """返回按健康状况排序的提供商链，主提供商在前"""
+        chain = [p.strip() for p in self.config.provider_chain.split(",") if p.strip()]
+        if self.config.provider not in chain:
+            chain.insert(0, self.config.provider)
+        return self.health.order(chain)
+    
+    async def _route(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """沿提供商链依次尝试，可选对主提供商进行对冲请求；返回 (响应的提供商, 响应)"""
+        chain = self._provider_chain()
+        if self.config.hedge_enabled and len(chain) > 1:
+            return await self._call_hedged(chain, prompt, schema)
+        return await self._call_chain(chain, prompt, schema)
+    
+    async def _call_chain(self, chain: List[str], prompt: str,
+                          schema: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """按顺序故障转移，返回 (响应的提供商, 响应)；所有提供商都失败时抛出最后一个错误"""
+        last_error: Optional[BaseException] = None
+        for provider in chain:
+            try:
+                return provider, await self._call_provider(provider, prompt, schema)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"提供商 {provider} 调用失败，尝试下一个: {e}")
+                if provider != chain[-1]:
+                    failovers.inc(provider=provider)
+        raise last_error or ValueError("没有可用的LLM提供商")
+    
+    async def _call_hedged(self, chain: List[str], prompt: str,
+                           schema: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """对冲请求：主提供商超过延迟百分位仍未返回时，并行请求备用提供商，取先完成者；返回 (响应的提供商, 响应)"""
+        primary, secondary = chain[0], chain[1]
+        delay = self.health.hedge_delay(
+            primary,
+            percentile=self.config.hedge_percentile,
+            default=self.config.hedge_default_delay,
+            minimum=self.config.hedge_min_delay,
+            maximum=self.config.hedge_max_delay
+        )
+        primary_task = asyncio.create_task(self._call_provider(primary, prompt, schema))
+        tasks = {primary_task}
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                last_error = primary_task.exception()
+                if last_error is None:
+                    return primary, primary_task.result()
+            else:
+                hedged = True
+                hedges.inc(outcome="fired")
+                logger.info(f"{primary} 在 {delay:.2f}s 内未返回，对冲请求 {secondary}")
+                tasks.add(asyncio.create_task(self._call_provider(secondary, prompt, schema)))
+                while tasks:
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        last_error = task.exception()
+                        if last_error is None:
+                            hedges.inc(outcome="won_primary" if task is primary_task else "won_secondary")
+                            return (primary if task is primary_task else secondary), task.result()
+        finally:
+            # 取消输掉的请求，释放模型和连接
+            for task in tasks:
+                task.cancel()
+        
+        # 主提供商在对冲前就失败，或主备都失败：继续尝试链上剩余的提供商
+        remaining = chain[2:] if hedged else chain[1:]
+        if not remaining:
+            raise last_error
+        failovers.inc(provider=primary)
+        return await self._call_chain(remaining, prompt, schema)
+    
+    async def _call_provider(self, provider: str, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        """调用单个提供商：熔断保护、退避重试，并记录健康状况和延迟"""
+        call = self._provider_calls.get(provider)
+        if call is None:
+            raise ValueError(f"不支持的LLM提供商: {provider}")
+        
+        health = self.health.get(provider)
+        breaker = self.breakers.get(provider, self.clients.base_url(provider))
+        settings = get_settings()
+        # 熔断打开时直接抛出 CircuitOpenError，调用方立即转移到下一个提供商
+        with breaker.protect(ignore=(LLMOverloadedError,)):
+            try:
+                response = await retry_with_backoff(
+                    lambda: self._call_admitted(provider, call, prompt, schema),
+                    retries=self.config.retry_count,
+                    base_delay=settings.llm_retry_base_delay,
+                    max_delay=settings.llm_retry_max_delay,
+                    name=provider
+                )
+            except LLMOverloadedError:
+                raise
+            except Exception as e:
+                health.record_failure(e)
+                raise
+        return response
+    
+    async def _call_admitted(self, provider: str, call, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+        """在准入槽位内执行一次提供商调用，记录不含排队时间的延迟、token 用量和吞吐量"""
+        if not get_settings().llm_structured_output:
+            schema = None
+        model = getattr(self.config, f"{provider}_model", "")
+        async with self.admission.limiter(provider).slot() as queued:
+            telemetry = LLMCallTelemetry(provider, model, queued)
+            response, usage = await call(prompt, schema)
+        self.health.get(provider).record_success(telemetry.elapsed())
+        self._record_usage(provider, model, prompt, usage, telemetry)
+        return response
+    
+    async def _call_ollama(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[str, Any]:
         """调用Ollama API"""
-        url = f"{self.config.ollama_host}/api/generate"
+        client = self.clients.http_client("ollama")
+        prefix, body = self._split_prompt(prompt)
+        # 静态前缀作为 system 放在最前面，Ollama 复用其 KV 缓存，只需预填充代码部分
+        fields = {"system": prefix, "prompt": body} if prefix else {"prompt": body}
+        if schema:
+            # 结构化输出：按 JSON schema 约束解码
+            fields["format"] = schema
+        response = await client.post("/api/generate", json={
+            "model": self.config.ollama_model,
+            **fields,
+            "stream": False,
+            "keep_alive": get_settings().ollama_keep_alive,
+            "options": self._ollama_options(prompt)
+        })
+        
+        if response.status_code != 200:
+            raise ProviderHTTPError(f"Ollama API错误: {response.status_code}", response.status_code)
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            response = await client.post(url, json={
-                "model": self.config.ollama_model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": self.config.temperature,
-                    "num_predict": self.config.max_tokens
-                }
-            })
-            
-            if response.status_code != 200:
-                raise Exception(f"Ollama API错误: {response.status_code}")
-            
-            result = response.json()
-            return result.get("response", "")
-    
-    async def _call_openai(self, prompt: str) -> str:
+        result = response.json()
+        return result.get("response", ""), result
+    
+    async def _call_openai(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[str, Any]:
         """调用OpenAI API"""
+        profile = self._profile(prompt)
         if not self.config.openai_api_key:
             raise ValueError("OpenAI API密钥未配置")
         
-        client = openai.AsyncOpenAI(
-            api_key=self.config.openai_api_key,
-            base_url=self.config.openai_base_url
-        )
+        client = self.clients.openai_client()
         
+        # OpenAI 对超过 1024 token 的相同前缀自动缓存
         response = await client.chat.completions.create(
             model=self.config.openai_model,
-            messages=[
-                {"role": "system", "content": "你是一个专业的代码分析和转换助手。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens
+            messages=self._chat_messages("你是一个专业的代码分析和转换助手。", prompt),
+            temperature=profile.temperature,
+            max_tokens=profile.num_predict,
+            **self._response_format("openai", schema)
         )
         
-        return response.choices[0].message.content or ""
+        return response.choices[0].message.content or "", response.usage
     
-    async def _call_anthropic(self, prompt: str) -> str:
+    async def _call_anthropic(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[str, Any]:
         """调用Anthropic API"""
+        profile = self._profile(prompt)
         if not self.config.anthropic_api_key:
             raise ValueError("Anthropic API密钥未配置")
         
-        client = Anthropic(api_key=self.config.anthropic_api_key)
+        client = self.clients.anthropic_client()
+        
+        prefix, body = self._split_prompt(prompt)
+        extra: Dict[str, Any] = {}
+        if prefix:
+            # 静态前缀放入带 cache_control 的 system 块，后续调用直接读取缓存
+            extra["system"] = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
         
         response = await client.messages.create(
             model=self.config.anthropic_model,
-            max_tokens=self.config.max_tokens,
-            temperature=self.config.temperature,
+            max_tokens=profile.num_predict,
+            temperature=profile.temperature,
             messages=[
-                {"role": "user", "content": prompt}
-            ]
+                {"role": "user", "content": body}
+            ],
+            **extra
         )
         
-        return response.content[0].text if response.content else ""
+        return response.content[0].text if response.content else "", response.usage
     
-    async def _call_deepseek(self, prompt: str) -> str:
+    async def _call_deepseek(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[str, Any]:
         """调用DeepSeek API"""
+        profile = self._profile(prompt)
         if not self.config.deepseek_api_key:
             raise ValueError("DeepSeek API密钥未配置")
         
-        url = f"{self.config.deepseek_base_url}/chat/completions"
+        client = self.clients.http_client("deepseek")
+        response = await client.post("/chat/completions", json={
+            "model": self.config.deepseek_model,
+            "messages": self._chat_messages("你是一个专业的代码分析和转换助手。", prompt),
+            "temperature": profile.temperature,
+            "max_tokens": profile.num_predict,
+            **self._response_format("deepseek", schema)
+        }, headers={
+            "Authorization": f"Bearer {self.config.deepseek_api_key}",
+            "Content-Type": "application/json"
+        })
+        
+        if response.status_code != 200:
+            raise ProviderHTTPError(f"DeepSeek API错误: {response.status_code}", response.status_code)
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            response = await client.post(url, json={
-                "model": self.config.deepseek_model,
-                "messages": [
-                    {"role": "system", "content": "你是一个专业的代码分析和转换助手。"},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": self.config.temperature,
-                "max_tokens": self.config.max_tokens
-            }, headers={
-                "Authorization": f"Bearer {self.config.deepseek_api_key}",
-                "Content-Type": "application/json"
-            })
-            
-            if response.status_code != 200:
-                raise Exception(f"DeepSeek API错误: {response.status_code}")
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"] if result.get("choices") else ""
-    
-    async def _call_kimi(self, prompt: str) -> str:
+        result = response.json()
+        content = result["choices"][0]["message"]["content"] if result.get("choices") else ""
+        return content, result.get("usage")
+    
+    async def _call_kimi(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[str, Any]:
         """调用Kimi (Moonshot) API"""
+        profile = self._profile(prompt)
         if not self.config.kimi_api_key:
             raise ValueError("Kimi API密钥未配置")
         
-        url = f"{self.config.kimi_base_url}/chat/completions"
+        client = self.clients.http_client("kimi")
+        response = await client.post("/chat/completions", json={
+            "model": self.config.kimi_model,
+            "messages": self._chat_messages("你是一个专业的代码分析和转换助手。请用中文或英文回复，根据用户输入的语言。", prompt),
+            "temperature": profile.temperature,
+            "max_tokens": profile.num_predict,
+            **self._response_format("kimi", schema)
+        }, headers={
+            "Authorization": f"Bearer {self.config.kimi_api_key}",
+            "Content-Type": "application/json"
+        })
+        
+        if response.status_code != 200:
+            raise ProviderHTTPError(f"Kimi API错误: {response.status_code}", response.status_code)
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            response = await client.post(url, json={
-                "model": self.config.kimi_model,
-                "messages": [
-                    {"role": "system", "content": "你是一个专业的代码分析和转换助手。请用中文或英文回复，根据用户输入的语言。"},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": self.config.temperature,
-                "max_tokens": self.config.max_tokens
-            }, headers={
-                "Authorization": f"Bearer {self.config.kimi_api_key}",
-                "Content-Type": "application/json"
-            })
-            
-            if response.status_code != 200:
-                raise Exception(f"Kimi API错误: {response.status_code}")
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"] if result.get("choices") else ""
+        result = response.json()
+        content = result["choices"][0]["message"]["content"] if result.get("choices") else ""
+        return content, result.get("usage")
     
-    def _build_analysis_prompt(self, code: str, language: str, analysis_type: str) -> str:
-        """构建分析提示词"""
-        base_prompt = f"""请分析以下{language}代码，提供详细的分析报告：
+    def _profile(self, prompt: str) -> GenerationProfile:
+        """提示词的生成配置（输出上限、温度）；没有专属配置的提示词使用全局 max_tokens 和 temperature"""
+        name = getattr(prompt, "name", None)
+        if name in GENERATION_PROFILES:
+            return generation_profile(name)
+        return GenerationProfile(num_predict=self.config.max_tokens, temperature=self.config.temperature)
+    
+    def _ollama_options(self, prompt: str) -> Dict[str, Any]:
+        """Ollama 生成参数：按提示词长度和输出上限选择上下文大小 (num_ctx)"""
+        profile = self._profile(prompt)
+        options: Dict[str, Any] = {"temperature": profile.temperature, "num_predict": profile.num_predict}
+        num_ctx = context_size(self.prefixes.counter.count(prompt), profile.num_predict)
+        if num_ctx:
+            options["num_ctx"] = num_ctx
+        return options
+    
+    def _split_prompt(self, prompt: str) -> Tuple[str, str]:
+        """拆分出提示词的静态前缀；关闭前缀缓存时整个提示词作为正文"""
+        prefix, body = split_prompt(prompt)
+        if not get_settings().prompt_prefix_cache or not prefix:
+            return "", str(prompt)
+        return prefix.strip(), body
+    
+    def _chat_messages(self, role: str, prompt: str) -> List[Dict[str, str]]:
+        """构建聊天消息：角色说明和静态前缀组成 system 消息，放在最前面以命中提供商的前缀缓存"""
+        prefix, body = self._split_prompt(prompt)
+        system = f"{role}\n\n{prefix}" if prefix else role
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": body}
+        ]
+    
+    def _response_format(self, provider: str, schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """OpenAI 兼容接口的 response_format 参数
 
-代码：
-```{language}
-{code}
-```
+        只有较新的 OpenAI 模型支持按 JSON schema 约束（gpt-3.5-turbo、gpt-4 等会返回 400），
+        其他模型以及 DeepSeek 和 Kimi 使用 JSON 模式
+        """
+        if not schema:
+            return {}
+        if provider == "openai" and supports_json_schema(self.config.openai_model):
+            return {"response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "response", "schema": schema}
+            }}
+        return {"response_format": {"type": "json_object"}}
+    
+    def _record_usage(self, provider: str, model: str, prompt: str, usage: Any, telemetry: LLMCallTelemetry) -> None:
+        """记录本次调用的耗时、吞吐量、提示词 token 数和缓存命中 token 数"""
+        limit = self._profile(prompt).num_predict
+        if provider == "ollama":
+            # Ollama 返回服务端各阶段耗时(纳秒)，但不返回缓存命中数，按最近发送过的前缀估算
+            usage = usage or {}
+            telemetry.finish_ollama(usage)
+            record_completion(prompt, limit, usage.get("eval_count") or 0, usage.get("done_reason"))
+            prefix, _ = self._split_prompt(prompt)
+            cached = self.prefixes.observe(model, prefix)
+            prompt_tokens = max(usage.get("prompt_eval_count") or 0, self.prefixes.counter.count(prompt))
+            record_prompt_cache(provider, model, prompt_tokens, min(cached, prompt_tokens), estimated=True)
+            return
+        recorded = telemetry.finish_usage(usage)
+        record_completion(prompt, limit, recorded["completion_tokens"])
+        prompt_tokens, cached_tokens = usage_tokens(usage)
+        record_prompt_cache(provider, model, prompt_tokens, cached_tokens)
+    
+    def _build_analysis_prompt(self, code: str, language: str, analysis_type: str) -> str:
+        """构建分析提示词（固定说明在前、代码在后，便于命中前缀缓存）"""
+        prefix = f"""请分析以下{language}代码，提供详细的分析报告。
 
 请提供以下分析：
 1. 代码质量评估
@@ -213,37 +445,38 @@ class LLMService:
 """
         
         if analysis_type == "python2_migration":
-            base_prompt += "\n特别注意Python 2到Python 3的迁移问题。"
+            prefix += "\n特别注意Python 2到Python 3的迁移问题。\n"
         
-        return base_prompt
-    
-    def _build_improvement_prompt(self, code: str, language: str, issues: List[str]) -> str:
-        """构建改进提示词"""
-        return f"""请改进以下{language}代码，解决指定的问题：
-
-代码：
+        return Prompt(prefix + "\n", f"""代码：
 ```{language}
 {code}
 ```
-
-需要解决的问题：
-{chr(10).join(f"- {issue}" for issue in issues)}
+""", name="code_analysis")
+    
+    def _build_improvement_prompt(self, code: str, language: str, issues: List[str]) -> str:
+        """构建改进提示词"""
+        prefix = f"""请改进以下{language}代码，解决指定的问题。
 
 请提供：
 1. 改进后的代码
 2. 改进说明
 3. 性能影响评估
 
-请以JSON格式返回结果。"""
-    
-    def _build_test_prompt(self, code: str, language: str, framework: str) -> str:
-        """构建测试生成提示词"""
-        return f"""请为以下{language}代码生成完整的单元测试：
+请以JSON格式返回结果。
+
+"""
+        return Prompt(prefix, f"""需要解决的问题：
+{chr(10).join(f"- {issue}" for issue in issues)}
 
 代码：
 ```{language}
 {code}
 ```
+""", name="code_improvement")
+    
+    def _build_test_prompt(self, code: str, language: str, framework: str) -> str:
+        """构建测试生成提示词"""
+        prefix = f"""请为以下{language}代码生成完整的单元测试。
 
 测试框架：{framework}
 
@@ -256,16 +489,18 @@ class LLMService:
 请以JSON格式返回结果，包含：
 - test_code: 生成的测试代码
 - test_cases: 测试用例说明
-- coverage_estimate: 覆盖率估计 (0-100)"""
-    
-    def _build_conversion_prompt(self, code: str, from_version: str, to_version: str, conversion_type: str) -> str:
-        """构建转换提示词"""
-        return f"""请将以下代码从{from_version}转换到{to_version}：
+- coverage_estimate: 覆盖率估计 (0-100)
 
-代码：
-```
+"""
+        return Prompt(prefix, f"""代码：
+```{language}
 {code}
 ```
+""", name="test_generation")
+    
+    def _build_conversion_prompt(self, code: str, from_version: str, to_version: str, conversion_type: str) -> str:
+        """构建转换提示词"""
+        prefix = f"""请将以下代码从{from_version}转换到{to_version}。
 
 转换类型：{conversion_type}
 
@@ -279,46 +514,49 @@ class LLMService:
 - converted_code: 转换后的代码
 - changes: 变更说明
 - warnings: 注意事项
-- testing_notes: 测试建议"""
+- testing_notes: 测试建议
+
+"""
+        return Prompt(prefix, f"""代码：
+```
+{code}
+```
+""", name="code_conversion")
+    
+    def _parse_json(self, response: str, schema_name: str) -> Optional[Dict[str, Any]]:
+        """解析响应中的JSON对象：忽略前后的说明文字和代码块标记，修复被截断的JSON，并按 schema 校验"""
+        try:
+            result = parse_json_output(response)
+        except ValueError as e:
+            logger.warning(f"LLM响应不是有效的JSON，使用回退结果: {e}")
+            return None
+        problems = schema_errors(result, RESPONSE_SCHEMAS[schema_name])
+        if problems:
+            logger.warning(f"LLM响应与 {schema_name} schema 不一致: {'; '.join(problems[:5])}")
+        return result
     
     def _parse_analysis_response(self, response: str, analysis_type: str) -> Dict[str, Any]:
         """解析分析响应"""
-        try:
-            # 尝试解析JSON响应
-            if "{" in response and "}" in response:
-                start = response.find("{")
-                end = response.rfind("}") + 1
-                json_str = response[start:end]
-                return json.loads(json_str)
-        except:
-            pass
+        result = self._parse_json(response, "code_analysis")
+        if result is not None:
+            return result
         
         # 回退到默认解析
         return self._get_fallback_analysis("", "", analysis_type)
     
     def _parse_improvement_response(self, response: str) -> Dict[str, Any]:
         """解析改进响应"""
-        try:
-            if "{" in response and "}" in response:
-                start = response.find("{")
-                end = response.rfind("}") + 1
-                json_str = response[start:end]
-                return json.loads(json_str)
-        except:
-            pass
+        result = self._parse_json(response, "code_improvement")
+        if result is not None:
+            return result
         
         return {"improved_code": response, "explanation": "AI生成的改进代码"}
     
     def _parse_test_response(self, response: str, framework: str) -> Dict[str, Any]:
         """解析测试响应"""
-        try:
-            if "{" in response and "}" in response:
-                start = response.find("{")
-                end = response.rfind("}") + 1
-                json_str = response[start:end]
-                return json.loads(json_str)
-        except:
-            pass
+        result = self._parse_json(response, "test_generation")
+        if result is not None:
+            return result
         
         return {
             "test_code": response,
@@ -328,14 +566,9 @@ class LLMService:
     
     def _parse_conversion_response(self, response: str, conversion_type: str) -> Dict[str, Any]:
         """解析转换响应"""
-        try:
-            if "{" in response and "}" in response:
-                start = response.find("{")
-                end = response.rfind("}") + 1
-                json_str = response[start:end]
-                return json.loads(json_str)
-        except:
-            pass
+        result = self._parse_json(response, "code_conversion")
+        if result is not None:
+            return result
         
         return {
             "converted_code": response,
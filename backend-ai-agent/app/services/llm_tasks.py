@@ -0,0 +1,183 @@
+"""Response schemas of the LLM prompts and task definitions for combined prompts.
+
+Every prompt has a JSON schema for its response. It is sent to the provider
+to constrain generation (Ollama ``format``, OpenAI ``response_format``) and
+used to validate the output while it streams.
+
+Each combined task has an instruction and the schema of its result. Several
+tasks can be answered by a single generation: the source code is sent (and
+prefilled) once and the model returns one object with a key per task.
+
+Micro-batched prompts are the reverse: one task applied to several small
+inputs, answered as one object with a key per item ID.
+"""
+
+from typing import Any, Dict, List
+
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+COMBINED_TASKS: Dict[str, Dict[str, Any]] = {
+    "python2_migration": {
+        "instruction": (
+            "Analyze the original Python 2 code for migration to Python 3: summarize its business "
+            "logic, list Python 2 specific issues, assess the migration complexity and give specific "
+            "migration recommendations and the critical changes needed."
+        ),
+        "schema": {
+            "type": "object",
+            "properties": {
+                "business_logic_summary": {"type": "string"},
+                "python2_issues": STRING_LIST,
+                "migration_complexity": {"type": "string", "enum": ["low", "medium", "high"]},
+                "migration_recommendations": STRING_LIST,
+                "critical_changes": STRING_LIST,
+            },
+            "required": ["business_logic_summary", "python2_issues", "migration_complexity",
+                         "migration_recommendations", "critical_changes"],
+        },
+    },
+    "python3_validation": {
+        "instruction": (
+            "Validate the conversion from the original Python 2 code to the converted Python 3 code: "
+            "check the correctness of the syntax changes, the handling of Python 2 specific features, "
+            "modern Python 3 practices and potential runtime issues."
+        ),
+        "schema": {
+            "type": "object",
+            "properties": {
+                "validation_status": {"type": "string", "enum": ["valid", "warnings", "errors"]},
+                "python3_compliance": {"type": "string", "enum": ["excellent", "good", "needs_improvement"]},
+                "warnings": STRING_LIST,
+                "errors": STRING_LIST,
+                "compatibility_notes": STRING_LIST,
+                "improvement_suggestions": STRING_LIST,
+            },
+            "required": ["validation_status", "python3_compliance", "warnings", "errors",
+                         "compatibility_notes", "improvement_suggestions"],
+        },
+        "needs_converted_code": True,
+    },
+    "shadow_scenarios": {
+        "instruction": (
+            "Suggest shadow test scenarios that compare the behavior of the original and converted "
+            "code: inputs covering key functionality, edge cases likely to reveal conversion issues, "
+            "performance comparisons and integration scenarios."
+        ),
+        "schema": {
+            "type": "object",
+            "properties": {
+                "shadow_scenarios": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "description": {"type": "string"},
+                            "input_data": {"type": "string"},
+                            "expected_behavior": {"type": "string"},
+                        },
+                        "required": ["name", "description", "input_data", "expected_behavior"],
+                    },
+                },
+            },
+            "required": ["shadow_scenarios"],
+        },
+    },
+}
+
+def _object(required: List[str], **properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema of an object whose listed properties are required."""
+    return {"type": "object", "properties": properties, "required": required}
+
+STRING = {"type": "string"}
+TEST_CASES = {
+    "type": "array",
+    "items": _object(["name", "description", "implementation"],
+                     name=STRING, description=STRING, implementation=STRING),
+}
+BUSINESS_LOGIC = _object(
+    ["business_logic_summary", "key_functions", "data_flow", "business_rules", "recommendations"],
+    business_logic_summary=STRING, key_functions=STRING_LIST, data_flow=STRING,
+    business_rules=STRING_LIST, recommendations=STRING_LIST,
+)
+
+# Response schema of each prompt, keyed by prompt name
+RESPONSE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "business_logic": BUSINESS_LOGIC,
+    "chunk_summary": BUSINESS_LOGIC,
+    "chunk_reduce": _object(
+        ["business_logic_summary", "data_flow", "business_rules", "recommendations"],
+        business_logic_summary=STRING, data_flow=STRING,
+        business_rules=STRING_LIST, recommendations=STRING_LIST,
+    ),
+    "python2_migration": COMBINED_TASKS["python2_migration"]["schema"],
+    "conversion_validation": _object(
+        ["validation_status", "warnings", "errors", "compatibility_notes", "test_suggestions"],
+        validation_status={"type": "string", "enum": ["valid", "warnings", "errors"]},
+        warnings=STRING_LIST, errors=STRING_LIST,
+        compatibility_notes=STRING_LIST, test_suggestions=STRING_LIST,
+    ),
+    "python3_validation": COMBINED_TASKS["python3_validation"]["schema"],
+    "modernization": _object(
+        ["suggested_changes", "warnings", "errors", "compatibility_notes", "test_suggestions"],
+        suggested_changes=STRING_LIST, warnings=STRING_LIST, errors=STRING_LIST,
+        compatibility_notes=STRING_LIST, test_suggestions=STRING_LIST,
+    ),
+    "additional_tests": _object(["additional_test_cases"], additional_test_cases=TEST_CASES),
+    "shadow_scenarios": COMBINED_TASKS["shadow_scenarios"]["schema"],
+    "test_improvement": _object(["improved_test_cases"], improved_test_cases=TEST_CASES),
+    # llm_service_v2 prompts
+    "code_analysis": _object(
+        ["quality_score", "issues", "recommendations", "complexity_score", "security_issues"],
+        quality_score={"type": "number"},
+        issues={"type": "array", "items": _object(["description", "severity"], description=STRING, severity=STRING)},
+        recommendations=STRING_LIST, complexity_score={"type": "number"}, security_issues=STRING_LIST,
+    ),
+    "code_improvement": _object(
+        ["improved_code", "explanation"],
+        improved_code=STRING, explanation=STRING, performance_impact=STRING,
+    ),
+    "test_generation": _object(
+        ["test_code", "test_cases", "coverage_estimate"],
+        test_code=STRING, test_cases=STRING_LIST, coverage_estimate={"type": "number"},
+    ),
+    "code_conversion": _object(
+        ["converted_code", "changes", "warnings", "testing_notes"],
+        converted_code=STRING, changes=STRING_LIST, warnings=STRING_LIST, testing_notes=STRING_LIST,
+    ),
+}
+
+def combined_schema(tasks: List[str]) -> Dict[str, Any]:
+    """Build the JSON schema of a combined response.
+
+    Args:
+        tasks: Task names from COMBINED_TASKS
+
+    Returns:
+        Schema of an object with one property per task
+    """
+    return {
+        "type": "object",
+        "properties": {task: COMBINED_TASKS[task]["schema"] for task in tasks},
+        "required": list(tasks),
+    }
+
+def batch_item_ids(count: int) -> List[str]:
+    """IDs of the items of a micro-batched prompt, in order."""
+    return [f"item_{index + 1}" for index in range(count)]
+
+def batch_schema(item_schema: Dict[str, Any], ids: List[str]) -> Dict[str, Any]:
+    """Build the JSON schema of a micro-batched response.
+
+    Args:
+        item_schema: Response schema of a single item
+        ids: Item IDs from batch_item_ids
+
+    Returns:
+        Schema of an object with one property per item
+    """
+    return {
+        "type": "object",
+        "properties": {item_id: item_schema for item_id in ids},
+        "required": list(ids),
+    }
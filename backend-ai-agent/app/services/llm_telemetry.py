@@ -0,0 +1,251 @@
+"""Per-call LLM telemetry for capacity planning.
+
+Every generation records its queue time, time to first token, prefill and
+generation durations, token counts and throughput as histograms labelled by
+endpoint, provider and model. Ollama reports the server-side durations
+(``load_duration``, ``prompt_eval_duration``, ``eval_duration``, in
+nanoseconds); for hosted providers only token usage is reported, so their
+throughput is derived from the client-side latency.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.routing import Match
+
+from app.utils.logger import get_logger
+from app.utils.metrics import get_metrics
+from app.services.prompt_cache import usage_tokens
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+# Route of the request that triggered the current LLM call
+current_endpoint: ContextVar[str] = ContextVar("llm_endpoint", default="internal")
+
+
+class ProviderCallCounter:
+    """Count the LLM calls sent to a provider within a block.
+
+    Calls answered from the cache, or by joining another caller's identical
+    generation, never reach a provider and are not counted. Subtasks started
+    inside the block (e.g. by ``asyncio.gather``) count towards it.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self._token = None
+
+    def __enter__(self) -> "ProviderCallCounter":
+        self._token = _call_counter.set(self)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        _call_counter.reset(self._token)
+
+
+_call_counter: ContextVar[Optional[ProviderCallCounter]] = ContextVar("llm_call_counter", default=None)
+
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 200, 500, 1000, 2500, 5000)
+
+queue_seconds = metrics.histogram("llm_queue_seconds", "Time an LLM call waited for an admission slot")
+ttft_seconds = metrics.histogram("llm_time_to_first_token_seconds", "Time from sending a generation to its first token")
+load_seconds = metrics.histogram("llm_load_seconds", "Time the server spent loading the model for a call")
+prefill_seconds = metrics.histogram("llm_prefill_seconds", "Time spent evaluating the prompt")
+generation_seconds = metrics.histogram("llm_generation_seconds", "Time spent generating output tokens")
+call_seconds = metrics.histogram("llm_call_seconds", "End-to-end duration of an LLM call, excluding queue time")
+prompt_tokens = metrics.histogram("llm_call_prompt_tokens", "Prompt tokens per LLM call", buckets=TOKEN_BUCKETS)
+completion_tokens = metrics.histogram("llm_call_completion_tokens", "Generated tokens per LLM call", buckets=TOKEN_BUCKETS)
+prefill_rate = metrics.histogram("llm_prefill_tokens_per_second", "Prompt evaluation throughput", buckets=RATE_BUCKETS)
+generation_rate = metrics.histogram("llm_generation_tokens_per_second", "Output generation throughput", buckets=RATE_BUCKETS)
+generations_cancelled = metrics.counter(
+    "llm_generations_cancelled_total",
+    "Generations aborted because their caller went away (e.g. the client disconnected)"
+)
+tokens_saved = metrics.counter(
+    "llm_tokens_saved_total",
+    "Estimated output tokens not generated thanks to aborted generations"
+)
+
+# Running average of completion tokens per endpoint, to estimate what an aborted generation would have produced
+_typical_completion: Dict[str, float] = {}
+_TYPICAL_WEIGHT = 0.1
+
+def endpoint_label(request: Request) -> str:
+    """Return the route template of a request (``/api/v1/analyze``), keeping label cardinality bounded.
+
+    Args:
+        request: Incoming request
+
+    Returns:
+        Route path template, or "unmatched"
+    """
+    for route in request.app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+def _field(data: Any, key: str) -> Any:
+    """Read a field from a dict or an SDK response object."""
+    if data is None:
+        return None
+    if isinstance(data, dict):
+        return data.get(key)
+    return getattr(data, key, None)
+
+
+class LLMCallTelemetry:
+    """Collects the timings and token counts of one LLM call.
+
+    Create it once the admission slot is held, call ``first_token`` when
+    streamed output starts arriving and one of the ``finish`` methods when
+    the call completes.
+    """
+
+    def __init__(self, provider: str, model: str, queue_seconds: float = 0.0):
+        """Start timing a call.
+
+        Args:
+            provider: Provider name
+            model: Model name
+            queue_seconds: Time spent waiting for the admission slot
+        """
+        self.provider = provider
+        self.model = model
+        self.endpoint = current_endpoint.get()
+        counter = _call_counter.get()
+        if counter is not None:
+            counter.calls += 1
+        self.queue_seconds = queue_seconds
+        self.ttft: Optional[float] = None
+        self._start = time.monotonic()
+
+    def elapsed(self) -> float:
+        """Seconds since the call was sent."""
+        return time.monotonic() - self._start
+
+    def first_token(self) -> None:
+        """Mark the arrival of the first output token (streaming calls)."""
+        if self.ttft is None:
+            self.ttft = self.elapsed()
+
+    def finish_ollama(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a call from the statistics of Ollama's final response chunk.
+
+        Args:
+            response: Final (``done``) chunk or non-streaming generate response
+
+        Returns:
+            The recorded values
+        """
+        def seconds(key: str) -> Optional[float]:
+            value = response.get(key)
+            return value / 1e9 if value else None
+
+        return self.finish(
+            prompt=response.get("prompt_eval_count") or 0,
+            completion=response.get("eval_count") or 0,
+            load=seconds("load_duration"),
+            prefill=seconds("prompt_eval_duration"),
+            generation=seconds("eval_duration"),
+        )
+
+    def finish_usage(self, usage: Any) -> Dict[str, Any]:
+        """Record a call from the usage data of an OpenAI-compatible or Anthropic response.
+
+        Args:
+            usage: ``usage`` field of the response, as a dict or SDK object
+
+        Returns:
+            The recorded values
+        """
+        prompt, _ = usage_tokens(usage)
+        completion = _field(usage, "completion_tokens")
+        if completion is None:
+            completion = _field(usage, "output_tokens")
+        return self.finish(prompt=prompt, completion=completion or 0)
+
+    def finish(self, prompt: int, completion: int, load: Optional[float] = None,
+               prefill: Optional[float] = None, generation: Optional[float] = None) -> Dict[str, Any]:
+        """Record the call.
+
+        Args:
+            prompt: Prompt tokens
+            completion: Generated tokens
+            load: Server-side model load time, if reported
+            prefill: Server-side prompt evaluation time, if reported
+            generation: Server-side generation time, if reported
+
+        Returns:
+            The recorded values
+        """
+        total = self.elapsed()
+        if self.ttft is None and prefill is not None:
+            # Non-streaming Ollama call: the first token follows loading and prefill
+            self.ttft = (load or 0.0) + prefill
+        if generation is None:
+            generation = total - self.ttft if self.ttft is not None else total
+
+        labels = {"endpoint": self.endpoint, "provider": self.provider, "model": self.model}
+        if completion:
+            typical = _typical_completion.get(self.endpoint, completion)
+            _typical_completion[self.endpoint] = typical + _TYPICAL_WEIGHT * (completion - typical)
+        queue_seconds.observe(self.queue_seconds, **labels)
+        call_seconds.observe(total, **labels)
+        prompt_tokens.observe(prompt, **labels)
+        completion_tokens.observe(completion, **labels)
+        if self.ttft is not None:
+            ttft_seconds.observe(self.ttft, **labels)
+        if load is not None:
+            load_seconds.observe(load, **labels)
+        if prefill:
+            prefill_seconds.observe(prefill, **labels)
+            prefill_rate.observe(prompt / prefill, **labels)
+        if generation > 0 and completion:
+            generation_seconds.observe(generation, **labels)
+            generation_rate.observe(completion / generation, **labels)
+
+        stats = {
+            "endpoint": self.endpoint,
+            "queue_seconds": round(self.queue_seconds, 3),
+            "ttft_seconds": round(self.ttft, 3) if self.ttft is not None else None,
+            "total_seconds": round(total, 3),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "tokens_per_second": round(completion / generation, 1) if generation > 0 and completion else None,
+        }
+        logger.debug(
+            f"LLM call {self.provider}/{self.model} for {self.endpoint}: queued {self.queue_seconds:.3f}s, "
+            f"ttft {stats['ttft_seconds']}s, total {total:.3f}s, {prompt} prompt + {completion} completion tokens, "
+            f"{stats['tokens_per_second']} tokens/s"
+        )
+        return stats
+
+    def cancel(self, generated: int, limit: Optional[int] = None) -> int:
+        """Record a generation aborted because its caller went away.
+
+        Args:
+            generated: Tokens generated before the abort
+            limit: Output token limit of the call (``num_predict``), if any
+
+        Returns:
+            Estimated tokens saved: the typical completion length of the
+            endpoint (or the limit, before any call has completed) minus
+            what was already generated
+        """
+        expected = _typical_completion.get(self.endpoint, limit or 0)
+        if limit:
+            expected = min(expected, limit)
+        saved = max(0, int(expected) - generated)
+        labels = {"endpoint": self.endpoint, "provider": self.provider, "model": self.model}
+        generations_cancelled.inc(**labels)
+        tokens_saved.inc(saved, **labels)
+        logger.info(
+            f"LLM call {self.provider}/{self.model} for {self.endpoint} aborted after {self.elapsed():.3f}s "
+            f"and {generated} tokens, about {saved} tokens saved"
+        )
+        return saved
@@ -0,0 +1,152 @@
+"""Micro-batching of small, compatible LLM requests.
+
+Requests that share a batch key (same task prompt, model, options and
+response schema) and arrive within a short window are collected into one
+batch, up to a size and token budget, and answered by a single generation.
+Each caller awaits its own item; the caller that supplies the batch runner
+decides how items are packed into one prompt and split back out.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+batch_sizes = metrics.histogram(
+    "llm_batch_size",
+    "Items answered per batched generation (sum/count is the batching ratio)",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32)
+)
+batch_fallbacks = metrics.counter(
+    "llm_batch_fallback_total",
+    "Batched items missing from the batch answer and generated on their own"
+)
+
+# Runs one batch: item bodies in, per-item results (None if unanswered) out
+BatchRunner = Callable[[List[str]], Awaitable[List[Optional[Any]]]]
+
+
+class _Batch:
+    """Items collected for one generation."""
+
+    __slots__ = ("run", "bodies", "futures", "tokens", "timer")
+
+    def __init__(self, run: BatchRunner):
+        self.run = run
+        self.bodies: List[str] = []
+        self.futures: List["asyncio.Future[Optional[Any]]"] = []
+        self.tokens = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Collects compatible requests into batches flushed by time, size or token budget."""
+
+    def __init__(self, window: float, max_size: int, max_tokens: int, name: str = "llm"):
+        """Initialize the batcher.
+
+        Args:
+            window: Seconds a batch stays open after its first item
+            max_size: Items after which a batch is flushed immediately
+            max_tokens: Token budget of the item bodies in one batch
+            name: Label used for metrics and logs
+        """
+        self.window = window
+        self.max_size = max(1, max_size)
+        self.max_tokens = max_tokens
+        self.name = name
+        self._open: Dict[str, _Batch] = {}
+        self._running: Set["asyncio.Task[None]"] = set()
+
+    def accepts(self, tokens: int) -> bool:
+        """Whether an item is small enough to be worth batching (at most half the budget)."""
+        return self.max_size > 1 and tokens <= self.max_tokens // 2
+
+    async def submit(self, key: str, body: str, tokens: int, run: BatchRunner) -> Optional[Any]:
+        """Add an item to the open batch for ``key`` and wait for its result.
+
+        Args:
+            key: Batch compatibility key
+            body: Per-item part of the prompt
+            tokens: Token count of ``body``
+            run: Runner used if this item opens a new batch
+
+        Returns:
+            The item's result, or None if the batch did not answer it
+
+        Raises:
+            Exception: Whatever the batch runner raised
+        """
+        batch = self._open.get(key)
+        if batch is not None and batch.tokens + tokens > self.max_tokens:
+            self._flush(key, batch)
+            batch = None
+        if batch is None:
+            batch = _Batch(run)
+            self._open[key] = batch
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, key, batch)
+
+        future: "asyncio.Future[Optional[Any]]" = asyncio.get_running_loop().create_future()
+        batch.bodies.append(body)
+        batch.futures.append(future)
+        batch.tokens += tokens
+        if len(batch.bodies) >= self.max_size:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: str, batch: _Batch) -> None:
+        """Close a batch and start its generation."""
+        if self._open.get(key) is not batch:
+            return
+        del self._open[key]
+        if batch.timer:
+            batch.timer.cancel()
+        batch_sizes.observe(len(batch.bodies), batcher=self.name)
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _Batch) -> None:
+        """Run a batch and hand each waiter its result."""
+        try:
+            results = await batch.run(batch.bodies)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        missing = 0
+        for future, result in zip(batch.futures, results):
+            if result is None and len(batch.bodies) > 1:
+                missing += 1
+            if not future.done():
+                # Waiters that were cancelled meanwhile simply drop their result
+                future.set_result(result)
+        if missing:
+            batch_fallbacks.inc(missing, batcher=self.name)
+            logger.warning(f"Batch of {len(batch.bodies)} left {missing} items unanswered")
+        else:
+            logger.debug(f"Batch of {len(batch.bodies)} items ({batch.tokens} tokens) answered in one generation")
+
+
+# Global micro-batcher for LLM calls
+llm_batcher = MicroBatcher(
+    window=settings.llm_batch_window_ms / 1000.0,
+    max_size=settings.llm_batch_max_size,
+    max_tokens=settings.llm_batch_max_tokens
+)
+
+def get_llm_batcher() -> MicroBatcher:
+    """Get the global micro-batcher for LLM calls.
+
+    Returns:
+        MicroBatcher instance
+    """
+    return llm_batcher
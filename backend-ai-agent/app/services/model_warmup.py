@@ -0,0 +1,158 @@
+"""Model warm-up, keep-alive pings and readiness state for Ollama.
+
+Ollama loads a model on its first request and unloads it after the
+``keep_alive`` period, so the first request after a deploy or an idle period
+pays the full load time. At startup the warmer loads the configured model
+with a one-token generation, then pings it whenever it has been idle for
+``OLLAMA_KEEPALIVE_PING_INTERVAL`` seconds so it stays resident. Readiness
+is reported as soon as the first warm-up succeeds.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from ollama import AsyncClient as OllamaAsyncClient
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.services.generation_profiles import default_context_size
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+model_ready = metrics.gauge("llm_model_ready", "Whether the configured model has been warmed up (1) or not (0)")
+warmup_seconds = metrics.gauge("llm_model_warmup_seconds", "Duration of the last successful model warm-up")
+keepalive_pings = metrics.counter("llm_model_keepalive_pings_total", "Keep-alive pings sent to the model server")
+
+
+class ModelWarmer:
+    """Loads the Ollama model at startup and keeps it resident while idle."""
+
+    def __init__(self):
+        self.model = settings.ollama_model
+        self.state = "pending"
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.ready_at: Optional[float] = None
+        self.warmup_duration: Optional[float] = None
+        self.last_activity = time.monotonic()
+        self.last_ping: Optional[float] = None
+        self._client: Optional[OllamaAsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether traffic can be routed to this instance."""
+        return self.state == "ready" or not settings.ollama_warmup_enabled
+
+    def touch(self) -> None:
+        """Record model activity; pings are only sent after an idle interval."""
+        self.last_activity = time.monotonic()
+
+    async def start(self) -> None:
+        """Start warm-up and keep-alive pings in the background."""
+        if not settings.ollama_warmup_enabled:
+            logger.info("Model warm-up disabled")
+            return
+        self._client = OllamaAsyncClient(
+            host=settings.ollama_host,
+            timeout=httpx.Timeout(settings.ollama_timeout, connect=5.0)
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _load(self) -> None:
+        """Send a one-token generation that loads the model and sets keep_alive."""
+        options: Dict[str, Any] = {"num_predict": 1}
+        num_ctx = default_context_size()
+        if num_ctx:
+            # Load with the context size generations use, so the first one does not reload the model
+            options["num_ctx"] = num_ctx
+        await self._client.generate(
+            model=self.model,
+            prompt="ping",
+            options=options,
+            keep_alive=settings.ollama_keep_alive
+        )
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while self.state != "ready":
+            self.state = "warming"
+            self.attempts += 1
+            start = time.monotonic()
+            try:
+                await self._load()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                # Escape curly braces in error message to avoid loguru format issues
+                error_msg = str(e).replace('{', '{{').replace('}', '}}')
+                logger.warning(f"Warm-up of {self.model} failed (attempt {self.attempts}), retrying in {delay:.0f}s: {error_msg}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            self.warmup_duration = time.monotonic() - start
+            self.ready_at = time.time()
+            self.state = "ready"
+            self.touch()
+            model_ready.set(1, model=self.model)
+            warmup_seconds.set(self.warmup_duration, model=self.model)
+            logger.info(f"Model {self.model} warmed up in {self.warmup_duration:.1f}s")
+
+        interval = settings.ollama_keepalive_ping_interval
+        if interval <= 0:
+            return
+        while True:
+            idle = time.monotonic() - self.last_activity
+            if idle < interval:
+                await asyncio.sleep(interval - idle)
+                continue
+            try:
+                await self._load()
+                self.last_ping = time.time()
+                keepalive_pings.inc(model=self.model)
+                logger.debug(f"Sent keep-alive ping to {self.model}")
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                # Escape curly braces in error message to avoid loguru format issues
+                error_msg = str(e).replace('{', '{{').replace('}', '}}')
+                logger.warning(f"Keep-alive ping to {self.model} failed: {error_msg}")
+            self.touch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a JSON-friendly view of the warm-up state."""
+        return {
+            "ready": self.ready,
+            "state": self.state if settings.ollama_warmup_enabled else "disabled",
+            "model": self.model,
+            "attempts": self.attempts,
+            "warmup_seconds": round(self.warmup_duration, 3) if self.warmup_duration is not None else None,
+            "keep_alive": settings.ollama_keep_alive,
+            "last_ping": self.last_ping,
+            "last_error": self.last_error,
+        }
+
+
+# Global model warmer
+model_warmer = ModelWarmer()
+
+def get_model_warmer() -> ModelWarmer:
+    """Get the global model warmer.
+
+    Returns:
+        ModelWarmer instance
+    """
+    return model_warmer
@@ -0,0 +1,151 @@
+"""Prompt prefix caching support and cached-token accounting.
+
+Providers can skip prefilling a prompt prefix they have recently processed:
+Anthropic caches blocks marked with ``cache_control``, OpenAI, DeepSeek and
+Moonshot cache long prefixes automatically, and Ollama keeps the KV cache of
+the previous prompt and reuses its longest common prefix. Hosted providers
+report the cached token count in their usage data; Ollama does not, so its
+count is estimated from the static prefixes recently sent to each model.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.utils.prompt_builder import TokenCounter, get_token_counter
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+prompt_input_tokens = metrics.counter("llm_prompt_input_tokens_total", "Prompt tokens sent to LLM providers")
+prompt_cached_tokens = metrics.counter(
+    "llm_prompt_cached_tokens_total",
+    "Prompt tokens served from the provider's prefix cache (source=reported|estimated)"
+)
+
+def _get(data: Any, key: str) -> Any:
+    """Read a field from a dict or an SDK response object."""
+    if data is None:
+        return None
+    if isinstance(data, dict):
+        return data.get(key)
+    return getattr(data, key, None)
+
+def usage_tokens(usage: Any) -> Tuple[int, Optional[int]]:
+    """Extract (prompt tokens, cached prompt tokens) from provider usage data.
+
+    Understands the usage formats of OpenAI (``prompt_tokens_details``),
+    DeepSeek (``prompt_cache_hit_tokens``), Moonshot (``cached_tokens``) and
+    Anthropic (``cache_read_input_tokens``, where ``input_tokens`` excludes
+    cache reads and writes).
+
+    Args:
+        usage: ``usage`` field of a response, as a dict or SDK object
+
+    Returns:
+        Tuple of (total prompt tokens, cached tokens or None if not reported)
+    """
+    if usage is None:
+        return 0, None
+
+    cache_read = _get(usage, "cache_read_input_tokens")
+    if cache_read is not None or _get(usage, "input_tokens") is not None:
+        # Anthropic
+        cache_read = cache_read or 0
+        total = (_get(usage, "input_tokens") or 0) + cache_read + (_get(usage, "cache_creation_input_tokens") or 0)
+        return total, cache_read
+
+    total = _get(usage, "prompt_tokens") or 0
+    cached = _get(_get(usage, "prompt_tokens_details"), "cached_tokens")
+    if cached is None:
+        cached = _get(usage, "prompt_cache_hit_tokens")
+    if cached is None:
+        cached = _get(usage, "cached_tokens")
+    return total, cached
+
+
+class PrefixTracker:
+    """Remembers which static prompt prefixes each model has recently processed.
+
+    Used to estimate prefix cache hits for servers that do not report them.
+    A prefix counts as cached if it was sent to the same model within the
+    TTL and at most ``slots`` distinct prefixes ago, matching a server that
+    keeps the KV cache of its last few prompts.
+    """
+
+    def __init__(self, ttl: float, slots: int, counter: Optional[TokenCounter] = None):
+        """Initialize the tracker.
+
+        Args:
+            ttl: Seconds a prefix is assumed to stay cached
+            slots: Number of distinct prefixes a model keeps cached
+            counter: Token counter for prefix sizes
+        """
+        self.ttl = ttl
+        self.slots = max(1, slots)
+        self.counter = counter or get_token_counter(settings.prompt_tokenizer)
+        self._seen: Dict[str, "OrderedDict[str, float]"] = {}
+
+    def observe(self, model: str, prefix: str) -> int:
+        """Record a prefix being sent and estimate how much of it was cached.
+
+        Args:
+            model: Model (or provider/model) the prompt is sent to
+            prefix: Static prefix of the prompt
+
+        Returns:
+            Estimated number of cached prefix tokens (0 on a miss)
+        """
+        if not prefix:
+            return 0
+        digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        seen = self._seen.setdefault(model, OrderedDict())
+        now = time.monotonic()
+        hit = digest in seen and now - seen[digest] <= self.ttl
+        seen[digest] = now
+        seen.move_to_end(digest)
+        while len(seen) > self.slots:
+            seen.popitem(last=False)
+        return self.counter.count(prefix) if hit else 0
+
+
+def record_prompt_cache(provider: str, model: str, prompt_tokens: int, cached_tokens: Optional[int],
+                        estimated: bool = False) -> None:
+    """Record the prompt and cached token counts of one call.
+
+    Args:
+        provider: Provider name
+        model: Model name
+        prompt_tokens: Prompt tokens of the call
+        cached_tokens: Tokens served from the prefix cache, None if unknown
+        estimated: Whether ``cached_tokens`` is an estimate
+    """
+    prompt_input_tokens.inc(prompt_tokens, provider=provider)
+    if cached_tokens is None:
+        logger.debug(f"LLM call {provider}/{model}: {prompt_tokens} prompt tokens, cached tokens not reported")
+        return
+    prompt_cached_tokens.inc(cached_tokens, provider=provider, source="estimated" if estimated else "reported")
+    logger.info(
+        f"LLM call {provider}/{model}: {prompt_tokens} prompt tokens, "
+        f"{'~' if estimated else ''}{cached_tokens} cached"
+    )
+
+
+# Global prefix tracker
+prefix_tracker = PrefixTracker(
+    ttl=settings.prompt_prefix_cache_ttl,
+    slots=settings.llm_admission_limits("ollama")[0]
+)
+
+def get_prefix_tracker() -> PrefixTracker:
+    """Get the global prefix tracker.
+
+    Returns:
+        PrefixTracker instance
+    """
+    return prefix_tracker
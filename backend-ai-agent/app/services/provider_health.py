@@ -0,0 +1,152 @@
+"""Per-provider health and latency tracking for LLM failover and hedging."""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.utils.llm_config import get_llm_config
+from app.utils.metrics import get_metrics
+
+metrics = get_metrics()
+
+provider_latency = metrics.histogram("llm_provider_latency_seconds", "Latency of successful provider calls")
+provider_requests = metrics.counter("llm_provider_requests_total", "Provider calls by outcome")
+
+
+class ProviderHealth:
+    """Smoothed latency and error rate of a single provider."""
+
+    def __init__(self, name: str, alpha: float, window: int = 200):
+        """Initialize the tracker.
+
+        Args:
+            name: Provider name
+            alpha: EWMA smoothing factor (higher reacts faster)
+            window: Number of recent latencies kept for percentiles
+        """
+        self.name = name
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record_success(self, latency: float) -> None:
+        """Record a successful call and its latency in seconds."""
+        self.latency_ewma = latency if self.latency_ewma is None else (
+            self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+        )
+        self.error_ewma = (1 - self.alpha) * self.error_ewma
+        self.consecutive_failures = 0
+        self.successes += 1
+        self.last_success_at = time.time()
+        self._latencies.append(latency)
+        provider_latency.observe(latency, provider=self.name)
+        provider_requests.inc(provider=self.name, outcome="success")
+
+    def record_failure(self, error: BaseException) -> None:
+        """Record a failed call."""
+        self.error_ewma = self.alpha + (1 - self.alpha) * self.error_ewma
+        self.consecutive_failures += 1
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        provider_requests.inc(provider=self.name, outcome="failure")
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the provider is currently considered usable first."""
+        return self.consecutive_failures < 3 and self.error_ewma < 0.5
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile of recent latencies, or None without samples."""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def sample_count(self) -> int:
+        """Return the number of latency samples held."""
+        return len(self._latencies)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a JSON-friendly view of the tracker."""
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            "healthy": self.healthy,
+            "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "latency_p50_seconds": round(p50, 3) if p50 is not None else None,
+            "latency_p95_seconds": round(p95, 3) if p95 is not None else None,
+            "error_rate_ewma": round(self.error_ewma, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class ProviderHealthTracker:
+    """Holds health state for every provider and orders failover chains."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._providers: Dict[str, ProviderHealth] = {}
+
+    def get(self, provider: str) -> ProviderHealth:
+        """Get the health tracker for a provider, creating it on first use."""
+        health = self._providers.get(provider)
+        if health is None:
+            health = ProviderHealth(provider, self.alpha)
+            self._providers[provider] = health
+        return health
+
+    def order(self, chain: List[str]) -> List[str]:
+        """Order a provider chain, keeping configured priority among healthy providers.
+
+        Unhealthy providers are moved to the end rather than dropped, so they
+        are still tried as a last resort and can recover.
+        """
+        healthy = [p for p in chain if self.get(p).healthy]
+        unhealthy = [p for p in chain if not self.get(p).healthy]
+        return healthy + unhealthy
+
+    def hedge_delay(self, provider: str, percentile: float, default: float,
+                    minimum: float, maximum: float, min_samples: int = 10) -> float:
+        """Compute how long to wait for a provider before hedging.
+
+        Args:
+            provider: Primary provider
+            percentile: Latency percentile to wait for (e.g. 0.9)
+            default: Delay used until enough samples are collected
+            minimum: Lower bound of the delay
+            maximum: Upper bound of the delay
+            min_samples: Samples required before trusting the percentile
+
+        Returns:
+            Delay in seconds
+        """
+        health = self.get(provider)
+        if health.sample_count() < min_samples:
+            return default
+        return max(minimum, min(maximum, health.percentile(percentile)))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return health state for every known provider."""
+        return {name: health.stats() for name, health in self._providers.items()}
+
+
+# Global health tracker shared by every LLM service
+provider_health = ProviderHealthTracker(alpha=get_llm_config().health_ewma_alpha)
+
+def get_provider_health() -> ProviderHealthTracker:
+    """Get the global provider health tracker.
+
+    Returns:
+        ProviderHealthTracker instance
+    """
+    return provider_health
@@ -0,0 +1,324 @@
+"""Embedded persistent store of analysis, conversion and test generation results.
+
+Results are kept in a local SQLite database, so no external service is
+needed. The database runs in WAL mode, where readers never block the single
+writer and several uvicorn workers can write concurrently (waiting on
+SQLite's busy timeout). Each result is stored as zlib-compressed JSON,
+indexed by its request ID (the analysis_id, conversion_id or test_id), the
+hash of the operation and complete request and the creation time. An
+``?async=true`` submission of a request answered in the last
+``RESULT_STORE_REUSE_HOURS`` returns that result at once instead of queueing
+a job. Results older than ``RESULT_STORE_RETENTION_DAYS`` are deleted by a
+periodic compaction.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+store_seconds = metrics.histogram(
+    "result_store_seconds",
+    "Result store operation latency by operation",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+)
+stored_bytes = metrics.counter("result_store_bytes_total", "Result bytes written before and after compression")
+compacted_results = metrics.counter("result_store_compacted_total", "Results deleted by retention compaction")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_request_hash ON results (request_hash, kind);
+CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+"""
+
+def request_hash(operation: str, request: BaseModel) -> str:
+    """Hash of an operation and its complete request (code, language, options...).
+
+    Args:
+        operation: Endpoint operation, e.g. "analyze" or "analyze_python2"
+        request: Request model
+    """
+    data = json.dumps({"operation": operation, "request": request.model_dump(mode="json")}, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """SQLite result store with a small connection pool."""
+
+    def __init__(self, path: str, pool_size: int, retention_days: float, compact_interval: float,
+                 reuse_hours: float = 0, busy_timeout: float = 10.0, compression_level: int = 6):
+        """Initialize the store; the database is opened on first use.
+
+        Args:
+            path: SQLite database file
+            pool_size: Maximum number of open connections
+            retention_days: Age after which results are deleted, 0 keeps them forever
+            compact_interval: Seconds between compactions
+            reuse_hours: Age up to which a result is returned for the same request, 0 disables reuse
+            busy_timeout: Seconds a write waits for another process holding the lock
+            compression_level: zlib level of stored payloads
+        """
+        self.path = Path(path)
+        self.pool_size = max(1, pool_size)
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self.reuse_hours = reuse_hours
+        self.busy_timeout = busy_timeout
+        self.compression_level = compression_level
+        self._idle: List[sqlite3.Connection] = []
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._compactor: Optional["asyncio.Task[None]"] = None
+        self._error: Optional[str] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the database on first use."""
+        with self._init_lock:
+            if not self._initialized:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.path),
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            if not self._initialized:
+                # Lets compaction return space to the OS. Only takes effect on a new database,
+                # before anything (including switching to WAL) writes its header
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL with synchronous=NORMAL is durable against crashes of the process, not of the OS
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._initialized:
+                self._migrate(conn)
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+            return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Bring a database created by an earlier version up to date."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(results)")]
+        if "content_hash" in columns:
+            conn.execute("DROP INDEX IF EXISTS results_content_hash")
+            conn.execute("ALTER TABLE results RENAME COLUMN content_hash TO request_hash")
+        if columns and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Created without incremental auto-vacuum: rebuild the file once to enable it
+            logger.info(f"Enabling incremental auto-vacuum on {self.path}")
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection; blocks while all pool_size connections are in use."""
+        with self._slots:
+            try:
+                conn = self._idle.pop()
+            except IndexError:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._idle.append(conn)
+
+    async def save(self, kind: str, id: str, operation: str, request: BaseModel, result: BaseModel) -> None:
+        """Persist a response; failures are logged and never fail the request.
+
+        Args:
+            kind: Result type, e.g. "analysis", "conversion" or "tests"
+            id: Request ID of the result
+            operation: Endpoint operation that produced it, e.g. "analyze_python2"
+            request: Request model
+            result: Response model
+        """
+        data = json.dumps(result.model_dump(mode="json")).encode("utf-8")
+        try:
+            await asyncio.to_thread(self._put, kind, id, request_hash(operation, request), data)
+            self._error = None
+        except Exception as e:
+            self._failed("save", e)
+
+    def _put(self, kind: str, id: str, request_hash: str, data: bytes) -> None:
+        start = time.monotonic()
+        payload = zlib.compress(data, self.compression_level)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (id, kind, request_hash, created_at, size, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (id, kind, request_hash, time.time(), len(data), payload)
+            )
+        store_seconds.observe(time.monotonic() - start, op="put")
+        stored_bytes.inc(len(data), form="raw")
+        stored_bytes.inc(len(payload), form="compressed")
+
+    async def get(self, kind: str, id: str) -> Optional[Dict[str, Any]]:
+        """Load a result by request ID.
+
+        Args:
+            kind: Result type
+            id: Request ID
+
+        Returns:
+            The stored response as a dict, or None if unknown (or the store failed)
+        """
+        try:
+            return await asyncio.to_thread(self._get, kind, id)
+        except Exception as e:
+            self._failed("get", e)
+            return None
+
+    def _get(self, kind: str, id: str) -> Optional[Dict[str, Any]]:
+        start = time.monotonic()
+        with self._connection() as conn:
+            row = conn.execute("SELECT payload FROM results WHERE id = ? AND kind = ?", (id, kind)).fetchone()
+        result = json.loads(zlib.decompress(row[0])) if row else None
+        store_seconds.observe(time.monotonic() - start, op="get")
+        return result
+
+    async def find(self, kind: str, operation: str, request: BaseModel) -> Optional[Dict[str, Any]]:
+        """Load the newest result of the same operation and request, if recent enough to reuse.
+
+        Results that were degraded to meet a request deadline are not reused.
+
+        Args:
+            kind: Result type
+            operation: Endpoint operation, as passed to ``save``
+            request: Request model
+
+        Returns:
+            The stored response as a dict, or None if there is none from the
+            last RESULT_STORE_REUSE_HOURS (or the store failed)
+        """
+        if self.reuse_hours <= 0:
+            return None
+        try:
+            result = await asyncio.to_thread(
+                self._find, kind, request_hash(operation, request), time.time() - self.reuse_hours * 3600
+            )
+        except Exception as e:
+            self._failed("find", e)
+            return None
+        if result is None or result.get("degraded"):
+            return None
+        return result
+
+    def _find(self, kind: str, request_hash: str, since: float) -> Optional[Dict[str, Any]]:
+        start = time.monotonic()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT payload FROM results WHERE request_hash = ? AND kind = ? AND created_at >= ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (request_hash, kind, since)
+            ).fetchone()
+        result = json.loads(zlib.decompress(row[0])) if row else None
+        store_seconds.observe(time.monotonic() - start, op="find")
+        return result
+
+    def compact(self) -> int:
+        """Delete results past the retention period and return freed pages to the OS.
+
+        Returns:
+            Number of deleted results
+        """
+        if self.retention_days <= 0:
+            return 0
+        start = time.monotonic()
+        cutoff = time.time() - self.retention_days * 86400
+        with self._connection() as conn:
+            deleted = conn.execute("DELETE FROM results WHERE created_at < ?", (cutoff,)).rowcount
+            if deleted:
+                conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        store_seconds.observe(time.monotonic() - start, op="compact")
+        if deleted:
+            compacted_results.inc(deleted)
+            logger.info(f"Result store compaction deleted {deleted} results older than {self.retention_days:g} days")
+        return deleted
+
+    async def start(self) -> None:
+        """Open the database and start periodic compaction."""
+        try:
+            await asyncio.to_thread(self.compact)
+        except Exception as e:
+            self._failed("compact", e)
+        if self.retention_days > 0 and self.compact_interval > 0:
+            self._compactor = asyncio.create_task(self._compact_loop())
+
+    async def stop(self) -> None:
+        """Stop compaction and close pooled connections."""
+        if self._compactor:
+            self._compactor.cancel()
+            await asyncio.gather(self._compactor, return_exceptions=True)
+            self._compactor = None
+        while self._idle:
+            self._idle.pop().close()
+
+    async def _compact_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.compact_interval)
+            try:
+                await asyncio.to_thread(self.compact)
+            except Exception as e:
+                self._failed("compact", e)
+
+    def _failed(self, op: str, error: Exception) -> None:
+        self._error = str(error)
+        # Escape curly braces in error message to avoid loguru format issues
+        error_msg = self._error.replace('{', '{{').replace('}', '}}')
+        logger.warning(f"Result store {op} failed: {error_msg}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store statistics for health checks."""
+        stats: Dict[str, Any] = {
+            "status": "unavailable" if self._error else "healthy",
+            "path": str(self.path),
+            "retention_days": self.retention_days,
+            "reuse_hours": self.reuse_hours,
+            "pool_size": self.pool_size,
+        }
+        if self.path.exists():
+            stats["size_bytes"] = self.path.stat().st_size
+        if self._error:
+            stats["error"] = self._error
+        return stats
+
+
+# Global result store
+result_store = ResultStore(
+    path=settings.result_store_path,
+    pool_size=settings.result_store_pool_size,
+    retention_days=settings.result_store_retention_days,
+    compact_interval=settings.result_store_compact_interval,
+    reuse_hours=settings.result_store_reuse_hours
+)
+
+def get_result_store() -> ResultStore:
+    """Get the global result store.
+
+    Returns:
+        ResultStore instance
+    """
+    return result_store
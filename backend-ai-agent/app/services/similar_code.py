@@ -0,0 +1,263 @@
+"""Similar-code retrieval of past LLM results, backed by ChromaDB.
+
+Every LLM result is stored in a persistent ChromaDB collection together with
+an embedding of the prompt body (the code). Before a new generation the
+nearest stored result of the same task (prompt prefix, model and options)
+is looked up. A result stored for the same code (same cache key) is reused
+instead of generating. A result for merely similar code is not: a flipped
+condition or constant barely moves the similarity but can make the old
+answer wrong, so it is given to the model as a reference example and the
+model still generates. Embeddings are computed locally by hashing token
+n-grams into a fixed-size vector, so nothing has to be downloaded and no
+model is needed.
+"""
+
+import asyncio
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+try:
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    CHROMADB_AVAILABLE = True
+except ImportError:
+    CHROMADB_AVAILABLE = False
+
+lookup_seconds = metrics.histogram("similar_code_lookup_seconds", "Similar-code retrieval latency by outcome")
+results_stored = metrics.counter("similar_code_stored_total", "LLM results stored for similar-code retrieval")
+
+_TOKEN = re.compile(r"\w+|[^\w\s]+")
+
+def embed_text(text: str, dimensions: int, max_n: int = 3) -> List[float]:
+    """Embed text by hashing its token n-grams (signed feature hashing).
+
+    Args:
+        text: Text to embed, typically source code
+        dimensions: Vector size
+        max_n: Longest n-gram
+
+    Returns:
+        L2-normalized vector; code sharing most of its token sequences ends up
+        with a high cosine similarity
+    """
+    tokens = _TOKEN.findall(text)
+    grams: Counter = Counter()
+    for n in range(1, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            grams[" ".join(tokens[i:i + n])] += 1
+
+    vector = [0.0] * dimensions
+    for gram, count in grams.items():
+        digest = hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign * (1.0 + math.log(count))
+
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+@dataclass
+class SimilarMatch:
+    """A stored result for the same or similar code."""
+
+    id: str
+    response: str
+    similarity: float
+    seconds: float
+
+
+class SimilarCodeStore:
+    """Persists LLM results and finds the nearest one for new code."""
+
+    def __init__(self, persist_directory: str, collection_name: str, threshold: float, dimensions: int):
+        """Initialize the store; the collection is opened on first use.
+
+        Args:
+            persist_directory: ChromaDB storage directory
+            collection_name: Collection holding the results
+            threshold: Minimum cosine similarity for using a result
+            dimensions: Embedding size
+        """
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self._collection: Any = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    async def open(self) -> None:
+        """Open the collection ahead of the first lookup, e.g. at startup."""
+        try:
+            await asyncio.to_thread(self._open)
+        except Exception as e:
+            self._failed(e)
+
+    def _open(self) -> Any:
+        """Open (or create) the collection."""
+        with self._lock:
+            if self._collection is None:
+                client = chromadb.PersistentClient(
+                    path=self.persist_directory,
+                    settings=ChromaSettings(anonymized_telemetry=False)
+                )
+                self._collection = client.get_or_create_collection(
+                    name=self.collection_name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+            return self._collection
+
+    async def lookup(self, task: str, text: str) -> Optional[SimilarMatch]:
+        """Find a stored result of the same task for similar text.
+
+        Args:
+            task: Task identity (prompt prefix, model and options)
+            text: Prompt body to match
+
+        Returns:
+            The nearest result if its similarity reaches the threshold, else None
+        """
+        start = time.monotonic()
+        try:
+            match = await asyncio.to_thread(self._query, task, embed_text(text, self.dimensions))
+        except Exception as e:
+            self._failed(e)
+            lookup_seconds.observe(time.monotonic() - start, outcome="error")
+            return None
+
+        elapsed = time.monotonic() - start
+        self._error = None
+        if match is None or match.similarity < self.threshold:
+            lookup_seconds.observe(elapsed, outcome="miss")
+            logger.debug(f"Similar-code lookup missed in {elapsed * 1000:.1f}ms"
+                         + (f" (nearest {match.similarity:.3f})" if match else ""))
+            return None
+        match.seconds = elapsed
+        lookup_seconds.observe(elapsed, outcome="hit")
+        logger.info(f"Found stored result {match.id[:12]} (similarity {match.similarity:.3f}), "
+                    f"retrieved in {elapsed * 1000:.1f}ms")
+        return match
+
+    def _query(self, task: str, embedding: List[float]) -> Optional[SimilarMatch]:
+        collection = self._open()
+        found = collection.query(
+            query_embeddings=[embedding],
+            n_results=1,
+            where={"task": task},
+            include=["metadatas", "distances"]
+        )
+        if not found["ids"] or not found["ids"][0]:
+            return None
+        # Cosine distance is 1 - similarity
+        similarity = 1.0 - found["distances"][0][0]
+        return SimilarMatch(found["ids"][0][0], found["metadatas"][0][0]["response"], similarity, 0.0)
+
+    async def store(self, id: str, task: str, text: str, response: str) -> None:
+        """Persist a result.
+
+        Args:
+            id: Content-addressed ID of the request (its cache key)
+            task: Task identity (prompt prefix, model and options)
+            text: Prompt body the result belongs to
+            response: Raw LLM response text
+        """
+        try:
+            await asyncio.to_thread(self._upsert, id, task, embed_text(text, self.dimensions), response)
+            results_stored.inc()
+            self._error = None
+        except Exception as e:
+            self._failed(e)
+
+    def _upsert(self, id: str, task: str, embedding: List[float], response: str) -> None:
+        self._open().upsert(
+            ids=[id],
+            embeddings=[embedding],
+            metadatas=[{"task": task, "response": response, "created": time.time()}]
+        )
+
+    def _failed(self, error: Exception) -> None:
+        self._error = str(error)
+        # Escape curly braces in error message to avoid loguru format issues
+        error_msg = self._error.replace('{', '{{').replace('}', '}}')
+        logger.warning(f"Similar-code store unavailable: {error_msg}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store statistics for health checks."""
+        stats: Dict[str, Any] = {
+            "status": "unavailable" if self._error else "healthy",
+            "collection": self.collection_name,
+            "persist_directory": self.persist_directory,
+            "threshold": self.threshold,
+        }
+        if self._collection is not None:
+            stats["results"] = self._collection.count()
+        if self._error:
+            stats["error"] = self._error
+        return stats
+
+
+# Stored results used by the current request as (similarity, reused as is),
+# None outside a request
+current_retrievals: ContextVar[Optional[List[Tuple[float, bool]]]] = ContextVar("similar_code_retrievals", default=None)
+
+def record_retrieval(similarity: float, reused: bool) -> None:
+    """Note a stored result used by the current request.
+
+    Args:
+        similarity: Cosine similarity of the stored result
+        reused: True if returned as is, False if given to the model as a reference
+    """
+    retrievals = current_retrievals.get()
+    if retrievals is not None:
+        retrievals.append((similarity, reused))
+
+def retrieval() -> Dict[str, Any]:
+    """Response fields reporting stored results used by the current request.
+
+    ``retrieved`` is true if a stored result was returned instead of
+    generating; ``similarity`` is the lowest similarity of the stored
+    results used, as is or as a reference, None if there were none.
+    """
+    retrievals = current_retrievals.get() or []
+    return {
+        "retrieved": any(reused for _, reused in retrievals),
+        "similarity": round(min(similarity for similarity, _ in retrievals), 4) if retrievals else None,
+    }
+
+
+# Global similar-code store, None when disabled or ChromaDB is not installed
+similar_code_store: Optional[SimilarCodeStore] = None
+if settings.similar_code_enabled:
+    if CHROMADB_AVAILABLE:
+        similar_code_store = SimilarCodeStore(
+            persist_directory=settings.chroma_persist_directory,
+            collection_name=settings.chroma_collection_name,
+            threshold=settings.similar_code_threshold,
+            dimensions=settings.similar_code_dimensions
+        )
+    else:
+        logger.warning("SIMILAR_CODE_ENABLED is set but chromadb is not installed; similar-code retrieval is off")
+
+def get_similar_code_store() -> Optional[SimilarCodeStore]:
+    """Get the global similar-code store.
+
+    Returns:
+        SimilarCodeStore instance, or None if retrieval is disabled
+    """
+    return similar_code_store
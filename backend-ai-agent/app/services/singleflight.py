@@ -0,0 +1,101 @@
+"""Single-flight coalescing of identical in-flight LLM calls.
+
+When the same prompt key is requested again while a generation for it is
+still running, the new caller awaits the existing generation instead of
+starting another one. Cancellation is reference-counted: the shared
+generation is only aborted once every waiter has gone away.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app.utils.logger import get_logger
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+T = TypeVar("T")
+
+flights_started = metrics.counter("llm_singleflight_started_total", "Generations started by the single-flight group")
+flights_coalesced = metrics.counter("llm_singleflight_coalesced_total", "Callers that joined an in-flight generation")
+flights_aborted = metrics.counter("llm_singleflight_aborted_total", "Shared generations aborted after every waiter left")
+flights_inflight = metrics.gauge("llm_singleflight_inflight", "Distinct generations currently in flight")
+
+
+class _Flight:
+    """A shared in-flight call and the number of callers awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+
+    def __init__(self, name: str = "llm"):
+        """Initialize the group.
+
+        Args:
+            name: Label used for metrics and logs
+        """
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls currently running."""
+        return len(self._flights)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` once per key, sharing the result with concurrent callers.
+
+        Args:
+            key: Identity of the call, e.g. an LLM cache key
+            fn: Zero-argument coroutine factory producing the result
+
+        Returns:
+            Result of the shared call
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            flights_started.inc(group=self.name)
+            flights_inflight.set(len(self._flights), group=self.name)
+        else:
+            flights_coalesced.inc(group=self.name)
+            logger.debug(f"Joined in-flight call {key[:12]} ({flight.waiters} waiting)")
+
+        flight.waiters += 1
+        try:
+            # Shield so one waiter's cancellation does not kill the shared call
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Last interested caller left - abort the generation
+                flight.task.cancel()
+                self._forget(key, flight)
+                flights_aborted.inc(group=self.name)
+                logger.info(f"Aborted in-flight call {key[:12]}: all waiters cancelled")
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+            flights_inflight.set(len(self._flights), group=self.name)
+
+
+# Global single-flight group shared by every LLM service
+llm_singleflight = SingleFlight("llm")
+
+def get_llm_singleflight() -> SingleFlight:
+    """Get the global single-flight group for LLM calls.
+
+    Returns:
+        SingleFlight instance
+    """
+    return llm_singleflight
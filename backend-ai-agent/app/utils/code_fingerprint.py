@@ -0,0 +1,120 @@
+"""Canonical fingerprints of source code for cache keys.
+
+Resubmitted code often differs only in whitespace, comments or formatting.
+Hashing a canonical form instead of the raw text lets such submissions share
+cached LLM and static analysis results. How much is ignored is set by the
+strictness level (``CACHE_KEY_STRICTNESS``):
+
+- ``exact``: the code byte for byte
+- ``normalized``: Python is compared by its AST (``ast.dump`` without
+  positions), so comments, blank lines, line breaks inside brackets and
+  quote styles are ignored; code that does not parse (e.g. Python 2) and
+  other languages are compared by their token stream without comments and
+  whitespace
+- ``loose``: as ``normalized``, and Python docstrings are ignored too
+
+Results that report line numbers need keys that also keep the line of every
+token (``positions=True``); those only ignore changes within lines.
+"""
+
+import ast
+import hashlib
+import io
+import re
+import tokenize
+from typing import Iterator, Optional
+
+from app.utils.config_basic import get_settings
+
+settings = get_settings()
+
+STRICTNESS_LEVELS = ("exact", "normalized", "loose")
+C_LIKE_LANGUAGES = {"javascript", "java", "cpp", "c"}
+
+_C_TOKENS = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+  | (?P<word>\w+)
+  | (?P<symbol>(?:(?!//|/\*)[^\w\s"'`])+)
+""", re.VERBOSE | re.DOTALL)
+
+_PYTHON_LAYOUT = {tokenize.INDENT: "<indent>", tokenize.DEDENT: "<dedent>", tokenize.NEWLINE: "<newline>"}
+
+def code_fingerprint(code: str, language: str, strictness: Optional[str] = None, positions: bool = False) -> str:
+    """Hash the canonical form of source code.
+
+    Args:
+        code: Source code
+        language: Language name (CodeLanguage value)
+        strictness: One of STRICTNESS_LEVELS, defaults to the setting
+        positions: Keep the line number of every token
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    strictness = strictness or settings.cache_key_strictness
+    canonical = canonical_source(code, language, strictness, positions)
+    material = f"{language}\0{strictness}\0{int(positions)}\0{canonical}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def canonical_source(code: str, language: str, strictness: str, positions: bool = False) -> str:
+    """Render the canonical form of source code at a strictness level.
+
+    Args:
+        code: Source code
+        language: Language name (CodeLanguage value)
+        strictness: One of STRICTNESS_LEVELS
+        positions: Keep the line number of every token
+
+    Returns:
+        Canonical text; equal for code that only differs in what the level ignores
+    """
+    if strictness not in STRICTNESS_LEVELS:
+        raise ValueError(f"Unknown cache key strictness {strictness!r}, expected one of {STRICTNESS_LEVELS}")
+    if strictness == "exact":
+        return code
+
+    if language == "python":
+        if not positions:
+            try:
+                tree = ast.parse(code)
+                if strictness == "loose":
+                    _strip_docstrings(tree)
+                return ast.dump(tree, include_attributes=False)
+            except (SyntaxError, ValueError):
+                # Python 2 or broken code: compare tokens instead
+                pass
+        try:
+            return "\n".join(_python_tokens(code, positions))
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            return code
+
+    return "\n".join(_generic_tokens(code, language, positions))
+
+def _strip_docstrings(tree: ast.AST) -> None:
+    """Remove the docstrings of modules, classes and functions in place."""
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) or not node.body:
+            continue
+        first = node.body[0]
+        if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) and isinstance(first.value.value, str):
+            node.body = node.body[1:] or [ast.Pass()]
+
+def _python_tokens(code: str, positions: bool) -> Iterator[str]:
+    """Python tokens without comments, blank lines and indentation width."""
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        if tok.type in (tokenize.COMMENT, tokenize.NL, tokenize.ENDMARKER):
+            continue
+        text = _PYTHON_LAYOUT.get(tok.type, tok.string)
+        yield f"{tok.start[0]}:{text}" if positions else text
+
+def _generic_tokens(code: str, language: str, positions: bool) -> Iterator[str]:
+    """Tokens of C-like (or unknown) languages without comments and whitespace."""
+    line, offset = 1, 0
+    for match in _C_TOKENS.finditer(code):
+        if positions:
+            line += code.count("\n", offset, match.start())
+            offset = match.start()
+        if match.lastgroup == "comment" and language in C_LIKE_LANGUAGES:
+            continue
+        yield f"{line}:{match.group()}" if positions else match.group()
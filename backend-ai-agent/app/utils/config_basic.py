@@ -2,7 +2,7 @@
 
 import os
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple, Union
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -15,6 +15,17 @@ class BasicSettings:
         # Ollama configuration
         self.ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
         self.ollama_model = os.getenv("OLLAMA_MODEL", "llama3.2")
+        self.ollama_timeout = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+        
+        # Model warm-up and residency. keep_alive is an Ollama duration ("30m")
+        # or a number of seconds (-1 keeps the model loaded indefinitely).
+        keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        try:
+            self.ollama_keep_alive: Union[float, str] = float(keep_alive)
+        except ValueError:
+            self.ollama_keep_alive = keep_alive
+        self.ollama_warmup_enabled = os.getenv("OLLAMA_WARMUP_ENABLED", "true").lower() == "true"
+        self.ollama_keepalive_ping_interval = float(os.getenv("OLLAMA_KEEPALIVE_PING_INTERVAL", "240"))
         
         # FastAPI configuration
         self.api_host = os.getenv("API_HOST", "0.0.0.0")
@@ -24,6 +35,89 @@ class BasicSettings:
         # ChromaDB configuration
         self.chroma_persist_directory = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
         self.chroma_collection_name = os.getenv("CHROMA_COLLECTION_NAME", "code_embeddings")
+        # Reuse stored LLM results for similar code (needs chromadb)
+        self.similar_code_enabled = os.getenv("SIMILAR_CODE_ENABLED", "false").lower() == "true"
+        self.similar_code_threshold = float(os.getenv("SIMILAR_CODE_THRESHOLD", "0.97"))
+        self.similar_code_dimensions = int(os.getenv("SIMILAR_CODE_DIMENSIONS", "1024"))
+        
+        # LLM response cache configuration
+        self.llm_cache_enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.llm_cache_ttl = float(os.getenv("LLM_CACHE_TTL", "86400"))
+        self.llm_cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+        self.llm_cache_max_bytes = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.llm_cache_disk_dir = os.getenv("LLM_CACHE_DISK_DIR", "")
+        self.llm_cache_disk_max_bytes = int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+        
+        # Coalesce identical in-flight LLM prompts into one generation
+        self.llm_singleflight_enabled = os.getenv("LLM_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+        # What resubmitted code may differ in and still share cached results: exact, normalized or loose
+        self.cache_key_strictness = os.getenv("CACHE_KEY_STRICTNESS", "normalized").lower()
+        
+        # Pack small compatible LLM requests arriving within a window into one generation
+        self.llm_micro_batch = os.getenv("LLM_MICRO_BATCH", "false").lower() == "true"
+        self.llm_batch_window_ms = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))
+        self.llm_batch_max_size = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+        self.llm_batch_max_tokens = int(os.getenv("LLM_BATCH_MAX_TOKENS", "3000"))
+        
+        # Admission control for LLM generations (per provider)
+        self.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.llm_max_queue = int(os.getenv("LLM_MAX_QUEUE", "32"))
+        self.llm_queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+        
+        # Worker threads for CPU-bound static analysis
+        self.static_analysis_workers = int(os.getenv("STATIC_ANALYSIS_WORKERS", "4"))
+        # In-memory cache of static analysis results, 0 disables it
+        self.static_analysis_cache_max_entries = int(os.getenv("STATIC_ANALYSIS_CACHE_MAX_ENTRIES", "1024"))
+        
+        # Cancel request handlers (and their LLM generations) when the client disconnects
+        self.cancel_on_disconnect = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true"
+        # Seconds of the caller's X-Request-Timeout budget kept for assembling and sending the response
+        self.request_deadline_reserve = float(os.getenv("REQUEST_DEADLINE_RESERVE", "0.5"))
+        
+        # Asynchronous jobs (?async=true) for analysis and conversion
+        self.job_store_dir = os.getenv("JOB_STORE_DIR", "./jobs")
+        self.job_workers = int(os.getenv("JOB_WORKERS", "2"))
+        self.job_max_queued = int(os.getenv("JOB_MAX_QUEUED", "100"))
+        self.job_timeout = float(os.getenv("JOB_TIMEOUT", "600"))
+        self.job_retention_days = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+        
+        # Embedded SQLite store of analysis, conversion and test generation results
+        self.result_store_path = os.getenv("RESULT_STORE_PATH", "./data/results.db")
+        self.result_store_pool_size = int(os.getenv("RESULT_STORE_POOL_SIZE", "4"))
+        self.result_store_retention_days = float(os.getenv("RESULT_STORE_RETENTION_DAYS", "30"))
+        self.result_store_compact_interval = float(os.getenv("RESULT_STORE_COMPACT_INTERVAL", "3600"))
+        self.result_store_reuse_hours = float(os.getenv("RESULT_STORE_REUSE_HOURS", "24"))
+        
+        # Map-reduce analysis of code larger than one prompt
+        self.llm_chunk_max_chars = int(os.getenv("LLM_CHUNK_MAX_CHARS", "12000"))
+        self.llm_chunk_concurrency = int(os.getenv("LLM_CHUNK_CONCURRENCY", "4"))
+        
+        # Prompt construction
+        self.prompt_compress_source = os.getenv("PROMPT_COMPRESS_SOURCE", "true").lower() == "true"
+        self.prompt_strip_docstrings = os.getenv("PROMPT_STRIP_DOCSTRINGS", "false").lower() == "true"
+        self.prompt_tokenizer = os.getenv("PROMPT_TOKENIZER", "approx")
+        self.prompt_token_budget_default = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+        # Send the static prompt prefix as a cacheable system block
+        self.prompt_prefix_cache = os.getenv("PROMPT_PREFIX_CACHE", "true").lower() == "true"
+        self.prompt_prefix_cache_ttl = float(os.getenv("PROMPT_PREFIX_CACHE_TTL", "300"))
+        
+        # Context window (Ollama num_ctx): one size for all calls, or chosen per call from the prompt length
+        # with LLM_CONTEXT_PER_REQUEST; LLM_CONTEXT_MAX=0 leaves it to the server
+        self.llm_context_min = int(os.getenv("LLM_CONTEXT_MIN", "4096"))
+        self.llm_context_max = int(os.getenv("LLM_CONTEXT_MAX", "16384"))
+        self.llm_context_per_request = os.getenv("LLM_CONTEXT_PER_REQUEST", "false").lower() == "true"
+        
+        # Constrain LLM output to the response schema. Off by default: Ollama structured
+        # outputs need Ollama >= 0.5, older servers reject a schema as format
+        self.llm_structured_output = os.getenv("LLM_STRUCTURED_OUTPUT", "false").lower() == "true"
+        
+        # Retries and circuit breaking for LLM providers
+        self.llm_retry_count = int(os.getenv("LLM_RETRY_COUNT", "3"))
+        self.llm_retry_base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+        self.llm_retry_max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+        self.llm_breaker_failure_threshold = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+        self.llm_breaker_recovery_timeout = float(os.getenv("LLM_BREAKER_RECOVERY_TIMEOUT", "10"))
+        self.llm_breaker_max_recovery_timeout = float(os.getenv("LLM_BREAKER_MAX_RECOVERY_TIMEOUT", "300"))
         
         # Logging configuration
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
@@ -36,6 +130,62 @@ class BasicSettings:
         extensions_str = os.getenv("ALLOWED_FILE_EXTENSIONS", ".py,.js,.java,.cpp,.c")
         self.allowed_file_extensions = [ext.strip() for ext in extensions_str.split(",") if ext.strip()]
     
+    def llm_admission_limits(self, provider: str) -> Tuple[int, int, float]:
+        """Get admission limits for an LLM provider.
+        
+        Provider-specific variables such as ``LLM_MAX_CONCURRENCY_OLLAMA``
+        override the global defaults.
+        
+        Args:
+            provider: Provider name
+            
+        Returns:
+            Tuple of (max concurrency, max queue length, queue timeout in seconds)
+        """
+        suffix = provider.upper()
+        return (
+            int(os.getenv(f"LLM_MAX_CONCURRENCY_{suffix}", str(self.llm_max_concurrency))),
+            int(os.getenv(f"LLM_MAX_QUEUE_{suffix}", str(self.llm_max_queue))),
+            float(os.getenv(f"LLM_QUEUE_TIMEOUT_{suffix}", str(self.llm_queue_timeout)))
+        )
+    
+    def prompt_token_budget(self, prompt: str) -> int:
+        """Token budget for a prompt.
+        
+        ``PROMPT_TOKEN_BUDGET_<PROMPT>`` (e.g. PROMPT_TOKEN_BUDGET_BUSINESS_LOGIC)
+        overrides the global ``PROMPT_TOKEN_BUDGET``.
+        
+        Args:
+            prompt: Prompt name
+            
+        Returns:
+            Maximum prompt size in tokens
+        """
+        return int(os.getenv(f"PROMPT_TOKEN_BUDGET_{prompt.upper()}", self.prompt_token_budget_default))
+    
+    def generation_overrides(self, prompt: str) -> Dict[str, float]:
+        """Configured overrides of a prompt's generation profile.
+        
+        ``LLM_NUM_PREDICT_<PROMPT>``, ``LLM_TEMPERATURE_<PROMPT>`` and
+        ``LLM_TOP_P_<PROMPT>`` (e.g. LLM_NUM_PREDICT_CONVERSION_VALIDATION)
+        replace the profile's values.
+        
+        Args:
+            prompt: Prompt name
+            
+        Returns:
+            Profile field to value, for the variables that are set
+        """
+        suffix = prompt.upper()
+        overrides: Dict[str, float] = {}
+        if os.getenv(f"LLM_NUM_PREDICT_{suffix}"):
+            overrides["num_predict"] = int(os.getenv(f"LLM_NUM_PREDICT_{suffix}"))
+        for field in ("temperature", "top_p"):
+            value = os.getenv(f"LLM_{field.upper()}_{suffix}")
+            if value:
+                overrides[field] = float(value)
+        return overrides
+    
     def __repr__(self):
         return f"Settings(ollama_host={self.ollama_host}, api_port={self.api_port})"
 
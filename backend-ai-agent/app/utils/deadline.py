@@ -0,0 +1,142 @@
+"""Request deadlines propagated from the caller.
+
+The Go backend's ``PythonAgentClient`` gives up on a request once its own
+HTTP timeout passes; anything the service still computes after that is
+thrown away. Callers send how long they are willing to wait in the
+``X-Request-Timeout`` header (seconds), which becomes the request's budget.
+A relative timeout rather than an absolute time keeps clock skew between
+the hosts out of the budget.
+
+Static analysis and rule-based conversion are fast and form the core of
+every response, so they always run. The LLM calls are optional enrichment:
+each one checks the remaining budget before it starts and is skipped when
+the provider's typical generation time does not fit, or cut off when the
+budget runs out while it is running. The endpoints then return the static
+results with the LLM fallback, marked ``degraded`` and listing the
+``skipped_stages``, instead of timing out.
+"""
+
+import asyncio
+import math
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Mapping, Optional, TypeVar
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+T = TypeVar("T")
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+stages_skipped = metrics.counter(
+    "request_deadline_skipped_stages_total",
+    "Optional stages skipped (or cut off while running) to meet the request deadline"
+)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when an optional stage does not fit in the remaining request budget."""
+
+    def __init__(self, stage: str, remaining: float):
+        self.stage = stage
+        self.remaining = remaining
+        super().__init__(f"Request deadline leaves {max(remaining, 0.0):.2f}s, not enough for {stage}")
+
+
+class Deadline:
+    """Time budget of one request."""
+
+    def __init__(self, timeout: float):
+        """Start the budget.
+
+        Args:
+            timeout: Seconds the caller is willing to wait
+        """
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.skipped: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left for work, keeping REQUEST_DEADLINE_RESERVE to send the response."""
+        return self.expires_at - time.monotonic() - settings.request_deadline_reserve
+
+    def skip(self, stage: str, reason: str) -> None:
+        """Record a stage left out of the response.
+
+        Args:
+            stage: Stage name, e.g. the prompt name of an LLM call
+            reason: "skipped" (not started) or "cut_off" (stopped while running)
+        """
+        self.skipped.append(stage)
+        stages_skipped.inc(stage=stage, reason=reason)
+        logger.info(f"Request deadline of {self.timeout:g}s: {stage} {reason.replace('_', ' ')}")
+
+
+# Budget of the current request, None when the caller sent no deadline
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+def deadline_from_headers(headers: Mapping[str, str]) -> Optional[Deadline]:
+    """Create the budget of a request from its ``X-Request-Timeout`` header.
+
+    Args:
+        headers: Request headers
+
+    Returns:
+        Deadline, or None if the header is missing or invalid
+    """
+    value = headers.get(DEADLINE_HEADER)
+    if not value:
+        return None
+    try:
+        timeout = float(value)
+    except ValueError:
+        timeout = math.nan
+    if not math.isfinite(timeout):
+        logger.warning(f"Ignoring invalid {DEADLINE_HEADER} header: {value!r}")
+        return None
+    return Deadline(max(timeout, 0.0))
+
+async def within_deadline(stage: str, awaitable: Awaitable[T], expected_seconds: float) -> T:
+    """Run an optional stage if it fits in the current request's budget.
+
+    Args:
+        stage: Stage name used in metrics and in the response's skipped_stages
+        awaitable: The stage's work, not started yet
+        expected_seconds: Typical duration of the stage
+
+    Returns:
+        Result of the stage
+
+    Raises:
+        DeadlineExceededError: The stage was skipped or cut off
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return await awaitable
+
+    remaining = deadline.remaining()
+    if remaining < expected_seconds:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        deadline.skip(stage, "skipped")
+        raise DeadlineExceededError(stage, remaining)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=remaining)
+    except asyncio.TimeoutError:
+        if deadline.remaining() > 0:
+            # Timed out on its own, not by the deadline
+            raise
+        deadline.skip(stage, "cut_off")
+        raise DeadlineExceededError(stage, 0.0) from None
+
+def degradation() -> Dict[str, Any]:
+    """Response fields reporting the stages left out to meet the current request's deadline."""
+    deadline = current_deadline.get()
+    skipped = list(dict.fromkeys(deadline.skipped)) if deadline else []
+    return {"degraded": bool(skipped), "skipped_stages": skipped}
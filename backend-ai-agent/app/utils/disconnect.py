@@ -0,0 +1,86 @@
+"""Cancel request handlers whose client has disconnected.
+
+When the Go backend's HTTP client times out or the user leaves the page, a
+handler would keep waiting for the LLM while the model generates tokens
+nobody reads. Routers created with ``route_class=CancelOnDisconnectRoute``
+run each handler next to a watcher task that waits for the client's
+``http.disconnect`` message; once the client is gone the handler task is
+cancelled. The cancellation reaches the awaited LLM call, which closes its
+streamed HTTP request, so the model server stops generating and the
+admission slot is freed at once. Streaming (SSE) responses are already
+cancelled by Starlette on disconnect.
+
+The watcher blocks on the receive channel rather than polling
+``Request.is_disconnected``: behind ``@app.middleware("http")`` (Starlette's
+BaseHTTPMiddleware) the non-blocking check never sees the disconnect.
+"""
+
+import asyncio
+from typing import Any, Callable, Coroutine
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.services.llm_telemetry import current_endpoint
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+clients_disconnected = metrics.counter(
+    "http_client_disconnects_total",
+    "Requests whose handler was cancelled because the client disconnected"
+)
+
+# Non-standard status (from nginx) for requests the client closed; nobody receives it
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _watch(request: Request, handler: "asyncio.Task[Response]") -> bool:
+    """Cancel ``handler`` once the client disconnects.
+
+    Must only be started after the request body has been read, since it
+    consumes the request's messages.
+
+    Returns:
+        Whether the handler was cancelled
+    """
+    while not handler.done():
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            handler.cancel()
+            return True
+    return False
+
+
+class CancelOnDisconnectRoute(APIRoute):
+    """API route whose handler is cancelled when its client disconnects."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handle = super().get_route_handler()
+        if not settings.cancel_on_disconnect:
+            return handle
+
+        async def route_handler(request: Request) -> Response:
+            # Read the body first; the watcher consumes every later message
+            await request.body()
+            handler = asyncio.ensure_future(handle(request))
+            watcher = asyncio.ensure_future(_watch(request, handler))
+            try:
+                return await handler
+            except asyncio.CancelledError:
+                if watcher.done() and not watcher.cancelled() and watcher.result():
+                    endpoint = current_endpoint.get()
+                    clients_disconnected.inc(endpoint=endpoint)
+                    logger.info(f"Client disconnected from {endpoint}, request cancelled")
+                    return Response(status_code=CLIENT_CLOSED_REQUEST)
+                # The request itself was cancelled (e.g. shutdown)
+                handler.cancel()
+                raise
+            finally:
+                watcher.cancel()
+
+        return route_handler
@@ -0,0 +1,290 @@
+"""Incremental parsing, schema validation and repair of JSON produced by LLMs."""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.metrics import get_metrics
+
+metrics = get_metrics()
+
+json_repairs = metrics.counter("llm_json_repaired_total", "LLM outputs that only parsed after repairing truncated JSON")
+schema_divergences = metrics.counter("llm_schema_divergence_total", "Generations aborted because the output diverged from the schema")
+
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+class IncrementalJSONParser:
+    """Emit the top-level fields of a streamed JSON object as they complete.
+
+    Text is fed in arbitrary chunks. As soon as the value of a top-level key
+    is syntactically complete it is decoded and returned from ``feed``, so
+    ``"business_logic_summary"`` can be shown long before ``"recommendations"``
+    has finished generating.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk of text.
+
+        Args:
+            text: Next piece of the generated output
+
+        Returns:
+            (key, value) pairs for every top-level field completed by this chunk
+        """
+        self.buffer += text
+        completed: List[Tuple[str, Any]] = []
+
+        while self._pos < len(self.buffer):
+            ch = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(self.buffer[self._key_start:self._pos + 1])
+                        self._key_start = None
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None and self._value_start is None:
+                    self._key_start = self._pos
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1 and ch == "}":
+                    self._complete_value(completed)
+                self._depth -= 1
+            elif ch == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = self._pos + 1
+            elif ch == "," and self._depth == 1:
+                self._complete_value(completed)
+
+            self._pos += 1
+
+        return completed
+
+    def _complete_value(self, completed: List[Tuple[str, Any]]) -> None:
+        """Decode the pending top-level value ending at the current position."""
+        if self._key is not None and self._value_start is not None:
+            raw = self.buffer[self._value_start:self._pos].strip()
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = None
+            else:
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+        self._key = None
+        self._value_start = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether the top-level object has been closed."""
+        return self._depth == 0 and "{" in self.buffer
+
+    def result(self) -> Dict[str, Any]:
+        """Return the fully decoded object, or as much of it as can be repaired."""
+        try:
+            return parse_json_output(self.buffer)
+        except ValueError:
+            return dict(self.fields)
+
+
+class SchemaMismatchError(ValueError):
+    """LLM output that does not match the expected JSON schema."""
+
+
+def schema_errors(value: Any, schema: Dict[str, Any], path: str = "$", partial: bool = False) -> List[str]:
+    """Check a decoded value against the subset of JSON schema used by the prompts.
+
+    Supports ``type``, ``enum``, ``properties``, ``required``,
+    ``additionalProperties: false`` and ``items``.
+
+    Args:
+        value: Decoded JSON value
+        schema: JSON schema
+        path: Location of ``value``, used in the messages
+        partial: Skip ``required`` checks (for values still being generated)
+
+    Returns:
+        Human-readable problems, empty if the value matches
+    """
+    expected = schema.get("type")
+    if expected:
+        types = JSON_TYPES.get(expected, object)
+        # bool is an int subclass, but never a valid number
+        if not isinstance(value, types) or (isinstance(value, bool) and expected in ("integer", "number")):
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+    if "enum" in schema and value not in schema["enum"]:
+        return [f"{path}: {value!r} is not one of {schema['enum']}"]
+
+    errors: List[str] = []
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        if not partial:
+            errors.extend(f"{path}: missing {key}" for key in schema.get("required", []) if key not in value)
+        for key, item in value.items():
+            if key in properties:
+                errors.extend(schema_errors(item, properties[key], f"{path}.{key}", partial))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}: unexpected key {key}")
+    elif isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            errors.extend(schema_errors(item, schema["items"], f"{path}[{index}]", partial))
+    return errors
+
+
+class StreamingSchemaValidator:
+    """Detect as early as possible that a streamed JSON object diverges from its schema.
+
+    The output must open with ``{`` and every top-level field must match its
+    property schema the moment it completes, so a generation that wanders
+    into prose or produces a wrongly typed field can be aborted instead of
+    running to its token limit.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        """Initialize the validator.
+
+        Args:
+            schema: JSON schema of the expected object
+        """
+        self.schema = schema
+        self._opened = False
+
+    def check_text(self, buffer: str) -> None:
+        """Check the raw output received so far.
+
+        Raises:
+            SchemaMismatchError: The output does not start a JSON object
+        """
+        if self._opened:
+            return
+        stripped = buffer.lstrip()
+        if not stripped:
+            return
+        if not stripped.startswith("{"):
+            raise SchemaMismatchError(f"output does not start with a JSON object: {stripped[:40]!r}")
+        self._opened = True
+
+    def check_field(self, key: str, value: Any) -> None:
+        """Check a completed top-level field.
+
+        Raises:
+            SchemaMismatchError: The field is unknown or has the wrong shape
+        """
+        errors = schema_errors({key: value}, self.schema, partial=True)
+        if errors:
+            raise SchemaMismatchError("; ".join(errors))
+
+
+def parse_json_output(text: str) -> Dict[str, Any]:
+    """Decode the JSON object in an LLM output.
+
+    Text around the object (prose, Markdown code fences) is ignored. If the
+    object is truncated, e.g. because the generation hit its token limit, it
+    is repaired by dropping the incomplete trailing element and closing the
+    open strings, arrays and objects.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        Decoded object
+
+    Raises:
+        ValueError: No JSON object could be decoded or repaired
+    """
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("no JSON object in the output")
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text, start)
+        return value
+    except ValueError:
+        pass
+
+    value = repair_json(text[start:])
+    if not isinstance(value, dict):
+        raise ValueError("output is not a JSON object")
+    json_repairs.inc()
+    return value
+
+def repair_json(text: str) -> Any:
+    """Complete a truncated JSON document.
+
+    First the document is closed where it stops (finishing an open string
+    and dropping a dangling comma or key); if that is not valid JSON it is
+    cut back to the last complete element of its innermost container and
+    closed there, retrying further back until it decodes.
+
+    Args:
+        text: JSON document that may stop part-way through
+
+    Returns:
+        Decoded value
+
+    Raises:
+        ValueError: The document cannot be repaired
+    """
+    stack: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    in_string = False
+    escape = False
+    for pos, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return json.loads(text[:pos + 1])
+        elif ch == ",":
+            # Everything before a comma is a complete element of the container
+            cuts.append((pos, "".join(reversed(stack))))
+
+    tail = text + '"' if in_string else text
+    if escape:
+        tail = tail[:-2] + '"'
+    tail = tail.rstrip().rstrip(",")
+    if tail.endswith(":"):
+        tail += " null"
+    candidates = [tail + "".join(reversed(stack))]
+    candidates.extend(text[:pos] + closers for pos, closers in reversed(cuts))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    raise ValueError("truncated JSON could not be repaired")
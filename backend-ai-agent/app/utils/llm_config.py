@@ -2,46 +2,85 @@
 
 import os
 from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from dotenv import load_dotenv
+
+# 与 config_basic 一样先加载 .env，不论哪个模块先被导入
+load_dotenv()
 
 class LLMConfig(BaseModel):
-    """LLM配置"""
+    """LLM配置
+
+    各字段从 validation_alias 指定的环境变量读取（见 get_llm_config）。
+    普通 BaseModel 不会处理 Field(env=...)，所以这里不能依赖它。
+    """
+    
+    # 代码中仍可按字段名构造，如 LLMConfig(provider="openai")
+    model_config = ConfigDict(populate_by_name=True)
     
     # 提供商配置
-    provider: str = Field(default="ollama", env="LLM_PROVIDER")  # ollama, openai, anthropic, deepseek, kimi
+    provider: str = Field(default="ollama", validation_alias="LLM_PROVIDER")  # ollama, openai, anthropic, deepseek, kimi
     
     # Ollama配置
-    ollama_host: str = Field(default="http://localhost:11434", env="OLLAMA_HOST")
-    ollama_model: str = Field(default="llama3.2", env="OLLAMA_MODEL")
+    ollama_host: str = Field(default="http://localhost:11434", validation_alias="OLLAMA_HOST")
+    ollama_model: str = Field(default="llama3.2", validation_alias="OLLAMA_MODEL")
     
     # OpenAI配置
-    openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
-    openai_model: str = Field(default="gpt-3.5-turbo", env="OPENAI_MODEL")
-    openai_base_url: Optional[str] = Field(default=None, env="OPENAI_BASE_URL")
+    openai_api_key: Optional[str] = Field(default=None, validation_alias="OPENAI_API_KEY")
+    openai_model: str = Field(default="gpt-3.5-turbo", validation_alias="OPENAI_MODEL")
+    openai_base_url: Optional[str] = Field(default=None, validation_alias="OPENAI_BASE_URL")
     
     # Anthropic配置
-    anthropic_api_key: Optional[str] = Field(default=None, env="ANTHROPIC_API_KEY")
-    anthropic_model: str = Field(default="claude-3-haiku-20240307", env="ANTHROPIC_MODEL")
+    anthropic_api_key: Optional[str] = Field(default=None, validation_alias="ANTHROPIC_API_KEY")
+    anthropic_model: str = Field(default="claude-3-haiku-20240307", validation_alias="ANTHROPIC_MODEL")
     
     # DeepSeek配置
-    deepseek_api_key: Optional[str] = Field(default=None, env="DEEPSEEK_API_KEY")
-    deepseek_model: str = Field(default="deepseek-chat", env="DEEPSEEK_MODEL")
-    deepseek_base_url: str = Field(default="https://api.deepseek.com", env="DEEPSEEK_BASE_URL")
+    deepseek_api_key: Optional[str] = Field(default=None, validation_alias="DEEPSEEK_API_KEY")
+    deepseek_model: str = Field(default="deepseek-chat", validation_alias="DEEPSEEK_MODEL")
+    deepseek_base_url: str = Field(default="https://api.deepseek.com", validation_alias="DEEPSEEK_BASE_URL")
     
     # Kimi配置
-    kimi_api_key: Optional[str] = Field(default=None, env="KIMI_API_KEY")
-    kimi_model: str = Field(default="moonshot-v1-8k", env="KIMI_MODEL")
-    kimi_base_url: str = Field(default="https://api.moonshot.cn/v1", env="KIMI_BASE_URL")
+    kimi_api_key: Optional[str] = Field(default=None, validation_alias="KIMI_API_KEY")
+    kimi_model: str = Field(default="moonshot-v1-8k", validation_alias="KIMI_MODEL")
+    kimi_base_url: str = Field(default="https://api.moonshot.cn/v1", validation_alias="KIMI_BASE_URL")
     
     # 通用配置
-    max_tokens: int = Field(default=2000, env="LLM_MAX_TOKENS")
-    temperature: float = Field(default=0.1, env="LLM_TEMPERATURE")
-    timeout: int = Field(default=30, env="LLM_TIMEOUT")
-    retry_count: int = Field(default=3, env="LLM_RETRY_COUNT")
+    max_tokens: int = Field(default=2000, validation_alias="LLM_MAX_TOKENS")
+    temperature: float = Field(default=0.1, validation_alias="LLM_TEMPERATURE")
+    timeout: int = Field(default=30, validation_alias="LLM_TIMEOUT")
+    retry_count: int = Field(default=3, validation_alias="LLM_RETRY_COUNT")
+    
+    # 故障转移与对冲请求
+    provider_chain: str = Field(default="", validation_alias="LLM_PROVIDER_CHAIN")  # 逗号分隔的备用提供商顺序，如 "ollama,deepseek"
+    hedge_enabled: bool = Field(default=False, validation_alias="LLM_HEDGE_ENABLED")
+    hedge_percentile: float = Field(default=0.9, validation_alias="LLM_HEDGE_PERCENTILE")
+    hedge_default_delay: float = Field(default=5.0, validation_alias="LLM_HEDGE_DEFAULT_DELAY")
+    hedge_min_delay: float = Field(default=0.5, validation_alias="LLM_HEDGE_MIN_DELAY")
+    hedge_max_delay: float = Field(default=20.0, validation_alias="LLM_HEDGE_MAX_DELAY")
+    health_ewma_alpha: float = Field(default=0.2, validation_alias="LLM_HEALTH_EWMA_ALPHA")
+    
+    # 连接池配置
+    pool_max_connections: int = Field(default=100, validation_alias="LLM_POOL_MAX_CONNECTIONS")
+    pool_max_keepalive: int = Field(default=20, validation_alias="LLM_POOL_MAX_KEEPALIVE")
+    pool_keepalive_expiry: float = Field(default=60.0, validation_alias="LLM_POOL_KEEPALIVE_EXPIRY")
+    connect_timeout: float = Field(default=5.0, validation_alias="LLM_CONNECT_TIMEOUT")
+    http2: bool = Field(default=True, validation_alias="LLM_HTTP2")
 
 def get_llm_config() -> LLMConfig:
-    """获取LLM配置"""
-    return LLMConfig()
+    """获取LLM配置（从环境变量读取，空值视为未设置）"""
+    return LLMConfig.model_validate({name: value for name, value in os.environ.items() if value})
+
+# 支持 response_format={"type": "json_schema"} 的 OpenAI 模型前缀（更早的模型只支持 json_object）
+JSON_SCHEMA_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+# 前缀匹配但不支持 json_schema 的快照
+JSON_SCHEMA_UNSUPPORTED_MODELS = ("gpt-4o-2024-05-13", "o1-preview", "o1-mini")
+
+def supports_json_schema(model: str) -> bool:
+    """OpenAI 模型是否支持按 JSON schema 约束输出"""
+    model = model.lower()
+    if model.startswith(JSON_SCHEMA_UNSUPPORTED_MODELS):
+        return False
+    return model.startswith(JSON_SCHEMA_MODEL_PREFIXES)
 
 def get_available_providers() -> Dict[str, Dict[str, Any]]:
     """获取可用的LLM提供商"""
@@ -0,0 +1,194 @@
+"""Lightweight in-process metrics for the AI Agent backend.
+
+Counters, gauges and histograms are kept in memory and rendered in the
+Prometheus text exposition format by the ``/api/v1/metrics`` endpoint.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    """Turn a label dict into a hashable, order-independent key."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    """Render labels as ``{a="b",c="d"}`` for the exposition format."""
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for a label set."""
+        return self._values.get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return all values keyed by rendered label set."""
+        return {_format_labels(k) or "total": v for k, v in self._values.items()}
+
+    def render(self) -> List[str]:
+        """Render the metric in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge to a value."""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrement the gauge."""
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket boundaries."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation."""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """Estimate a quantile from the bucket counts.
+
+        Args:
+            q: Quantile between 0 and 1
+            labels: Label set to read
+
+        Returns:
+            Upper bound of the bucket containing the quantile, or None without data
+        """
+        counts = self._counts.get(_label_key(labels))
+        if not counts:
+            return None
+        total = sum(counts)
+        target = q * total
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return count, sum and mean per label set."""
+        result = {}
+        for key, counts in self._counts.items():
+            total = sum(counts)
+            result[_format_labels(key) or "total"] = {
+                "count": total,
+                "sum": round(self._sums[key], 6),
+                "mean": round(self._sums[key] / total, 6) if total else 0.0,
+            }
+        return result
+
+    def render(self) -> List[str]:
+        """Render the metric in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for key, counts in sorted(self._counts.items()):
+            running = 0
+            for bound, count in zip(self.buckets, counts):
+                running += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': str(bound)})} {running}")
+            running += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registry holding every metric created by the application."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text format."""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return a JSON-friendly view of all metrics."""
+        return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Get the global metrics registry.
+
+    Returns:
+        MetricsRegistry instance
+    """
+    return metrics
@@ -0,0 +1,138 @@
+"""Concurrent request pipelines with per-stage timing.
+
+Endpoints combine static analysis with one or more LLM calls. Stages that do
+not depend on each other are run concurrently, so a request takes as long as
+its slowest stage instead of the sum of all of them. The static services are
+``async def`` but do their work synchronously, so they are offloaded to a
+worker thread to keep the event loop free for in-flight LLM streams.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.utils.deadline import current_deadline
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+T = TypeVar("T")
+
+stage_seconds = metrics.histogram("pipeline_stage_seconds", "Duration of request pipeline stages")
+
+# Notified with (stage, seconds) when a stage of the current request finishes, e.g. for job progress
+stage_observer: ContextVar[Optional[Callable[[str, float], None]]] = ContextVar("stage_observer", default=None)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.static_analysis_workers,
+            thread_name_prefix="static-analysis"
+        )
+    return _executor
+
+async def offload(fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+    """Run a CPU-bound coroutine function on a worker thread.
+
+    The coroutine gets its own event loop in the worker, so it must not
+    touch objects bound to the main loop.
+
+    Args:
+        fn: Coroutine function, e.g. ``code_analyzer.analyze``
+        *args: Positional arguments for ``fn``
+        **kwargs: Keyword arguments for ``fn``
+
+    Returns:
+        Result of the coroutine
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(asyncio.run, fn(*args, **kwargs))
+    )
+
+def shutdown_offload_executor() -> None:
+    """Stop the worker threads; called from the application lifespan."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class StageTimer:
+    """Records how long each stage of a request pipeline takes."""
+
+    def __init__(self, pipeline: str):
+        """Initialize the timer.
+
+        Args:
+            pipeline: Pipeline name used in metrics and logs (e.g. "analyze")
+        """
+        self.pipeline = pipeline
+        self.timings: Dict[str, float] = {}
+        self._start = time.monotonic()
+
+    async def run(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """Await a stage and record its duration, including when it fails."""
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.record(stage, time.monotonic() - start)
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record the duration of a stage timed elsewhere."""
+        self.timings[stage] = seconds
+        stage_seconds.observe(seconds, pipeline=self.pipeline, stage=stage)
+        observer = stage_observer.get()
+        if observer and stage != "total":
+            observer(stage, seconds)
+
+    def finish(self) -> Dict[str, float]:
+        """Record the end-to-end duration and log all stage timings.
+
+        Returns:
+            Stage durations in seconds, including ``total``
+        """
+        self.record("total", time.monotonic() - self._start)
+        timings = ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in self.timings.items())
+        deadline = current_deadline.get()
+        if deadline is not None:
+            timings += f", deadline budget left={deadline.remaining():.3f}s"
+        logger.info(f"Pipeline {self.pipeline} timings: {timings}")
+        return dict(self.timings)
+
+
+async def run_stages(pipeline: str, stages: Dict[str, Awaitable[Any]]) -> Dict[str, Any]:
+    """Run independent stages concurrently and time each of them.
+
+    If a stage raises, the remaining stages are cancelled and the error is
+    propagated.
+
+    Args:
+        pipeline: Pipeline name used in metrics and logs
+        stages: Stage name to awaitable
+
+    Returns:
+        Stage name to result
+    """
+    timer = StageTimer(pipeline)
+    tasks = {name: asyncio.ensure_future(timer.run(name, awaitable)) for name, awaitable in stages.items()}
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    finally:
+        timer.finish()
+    return {name: task.result() for name, task in tasks.items()}
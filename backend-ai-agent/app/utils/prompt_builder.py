@@ -0,0 +1,358 @@
+"""Token-budgeted prompt construction with optional source compression.
+
+Prompt templates are dedented before the code is substituted, source code
+can be stripped of comments, docstrings and blank lines, and every prompt is
+held to a per-prompt token budget. Token counts come from a pluggable
+tokenizer so the budget can match the model actually serving the prompt.
+
+Prompts put their fixed instructions and output schema first and the code
+last. The instructions form a static prefix that is identical across calls
+of the same kind, which providers can keep in their prefix/KV cache instead
+of prefilling it again on every call.
+"""
+
+import io
+import math
+import textwrap
+import tokenize
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.utils.logger import get_logger
+from app.utils.config_basic import get_settings
+from app.utils.metrics import get_metrics
+from app.utils.code_fingerprint import C_LIKE_LANGUAGES, code_fingerprint
+
+logger = get_logger(__name__)
+settings = get_settings()
+metrics = get_metrics()
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+prompt_tokens = metrics.histogram(
+    "llm_prompt_tokens", "Prompt size in tokens after compression",
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+)
+prompt_tokens_saved = metrics.counter("llm_prompt_tokens_saved_total", "Prompt tokens saved by dedenting and compression")
+prompt_truncations = metrics.counter("llm_prompt_truncated_total", "Prompts truncated to fit their token budget")
+
+
+class Prompt(str):
+    """Prompt text that remembers where its static prefix ends.
+
+    Behaves as the full prompt string everywhere (logging, hashing), while
+    provider calls can send ``prefix`` as a cacheable system block and
+    ``body`` as the per-call message. ``identity`` is the prompt with each
+    source replaced by its canonical fingerprint, used for cache keys.
+    ``name`` selects the generation profile and ``tokens`` is the measured
+    prompt length, when known.
+    """
+
+    def __new__(cls, prefix: str, body: str, identity: Optional[str] = None,
+                name: Optional[str] = None, tokens: Optional[int] = None):
+        prompt = super().__new__(cls, prefix + body)
+        prompt.prefix = prefix
+        prompt.identity = identity
+        prompt.name = name
+        prompt.tokens = tokens
+        return prompt
+
+    def __getnewargs__(self) -> Tuple[str, str]:
+        return self.prefix, self.body
+
+    @property
+    def body(self) -> str:
+        return str(self)[len(self.prefix):]
+
+def split_prompt(prompt: str) -> Tuple[str, str]:
+    """Split a prompt into its static prefix and per-call body.
+
+    Args:
+        prompt: Prompt built by PromptBuilder, or any plain string
+
+    Returns:
+        Tuple of (prefix, body); the prefix is empty for plain strings
+    """
+    if isinstance(prompt, Prompt):
+        return prompt.prefix, prompt.body
+    return "", str(prompt)
+
+def cache_identity(prompt: str) -> str:
+    """Text identifying a prompt for caching.
+
+    Prompts built by PromptBuilder are identified by the canonical
+    fingerprint of their sources (see ``code_fingerprint``), so code that
+    only differs in formatting or comments shares cache entries.
+
+    Args:
+        prompt: Prompt built by PromptBuilder, or any plain string
+
+    Returns:
+        Identity text, the prompt itself if it has none
+    """
+    identity = getattr(prompt, "identity", None)
+    return identity if identity is not None else str(prompt)
+
+
+class TokenCounter:
+    """Counts tokens in a piece of text."""
+
+    name = "base"
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+
+class ApproxTokenCounter(TokenCounter):
+    """Dependency-free estimate of roughly four characters per token."""
+
+    name = "approx"
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class TiktokenCounter(TokenCounter):
+    """Exact counts for OpenAI-style BPE vocabularies via tiktoken."""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        if not TIKTOKEN_AVAILABLE:
+            raise ImportError("tiktoken is not installed")
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+_tokenizers: Dict[str, Callable[..., TokenCounter]] = {
+    "approx": lambda arg=None: ApproxTokenCounter(float(arg) if arg else 4.0),
+    "tiktoken": lambda arg=None: TiktokenCounter(arg or "cl100k_base"),
+}
+
+def register_tokenizer(name: str, factory: Callable[..., TokenCounter]) -> None:
+    """Register a tokenizer usable as ``PROMPT_TOKENIZER=<name>[:<arg>]``.
+
+    Args:
+        name: Tokenizer name
+        factory: Callable taking an optional argument string and returning a TokenCounter
+    """
+    _tokenizers[name] = factory
+
+def get_token_counter(spec: str) -> TokenCounter:
+    """Create a token counter from a ``name[:arg]`` spec.
+
+    Unknown names, or tokenizers whose dependency is missing, fall back to
+    the approximate counter.
+
+    Args:
+        spec: Tokenizer spec, e.g. "approx" or "tiktoken:cl100k_base"
+
+    Returns:
+        TokenCounter instance
+    """
+    name, _, arg = spec.partition(":")
+    factory = _tokenizers.get(name)
+    if factory is None:
+        logger.warning(f"Unknown tokenizer {name}, using approximate token counts")
+        return ApproxTokenCounter()
+    try:
+        return factory(arg or None)
+    except ImportError as e:
+        logger.warning(f"Tokenizer {name} unavailable ({e}), using approximate token counts")
+        return ApproxTokenCounter()
+
+
+def compress_source(code: str, language: str, strip_docstrings: bool = False) -> str:
+    """Remove parts of source code that cost tokens without carrying logic.
+
+    Python is processed with ``tokenize``: comments (and optionally
+    docstrings) are removed, while string literals are left untouched.
+    C-like languages only lose whole-line ``//`` comments. For every
+    language trailing whitespace and blank lines are dropped.
+
+    Args:
+        code: Source code
+        language: Language name (CodeLanguage value)
+        strip_docstrings: Also remove Python docstrings
+
+    Returns:
+        Compressed source code
+    """
+    if language == "python":
+        try:
+            return _compress_python(code, strip_docstrings)
+        except (tokenize.TokenError, SyntaxError):
+            # Python 2 or broken code: fall back to whitespace-only compression
+            pass
+
+    lines = []
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if language in C_LIKE_LANGUAGES and stripped.startswith("//"):
+            continue
+        lines.append(line.rstrip())
+    return "\n".join(lines)
+
+def _compress_python(code: str, strip_docstrings: bool) -> str:
+    """Tokenize-based compression of Python source."""
+    tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    lines = code.splitlines()
+    # Rows inside multi-line string literals must be kept byte for byte
+    protected: Set[int] = set()
+    # Column at which to cut each row (comments), and rows to drop or replace
+    cut_at: Dict[int, int] = {}
+    replaced: Dict[int, Optional[str]] = {}
+    string_types = {tokenize.STRING, getattr(tokenize, "FSTRING_MIDDLE", -1)}
+
+    significant = [t for t in tokens if t.type not in (tokenize.NL, tokenize.COMMENT)]
+    for i, tok in enumerate(significant):
+        if tok.type in string_types and tok.end[0] > tok.start[0]:
+            protected.update(range(tok.start[0], tok.end[0] + 1))
+
+        if not strip_docstrings or tok.type != tokenize.STRING:
+            continue
+        previous = significant[i - 1].type if i else tokenize.NEWLINE
+        following = significant[i + 1].type if i + 1 < len(significant) else tokenize.ENDMARKER
+        if previous not in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT) or following != tokenize.NEWLINE:
+            continue
+        # A bare string statement; keep a placeholder if it is the whole body
+        after = significant[i + 2].type if i + 2 < len(significant) else tokenize.ENDMARKER
+        sole_body = previous == tokenize.INDENT and after in (tokenize.DEDENT, tokenize.ENDMARKER)
+        indent = lines[tok.start[0] - 1][:tok.start[1]]
+        for row in range(tok.start[0], tok.end[0] + 1):
+            replaced[row] = None
+            protected.discard(row)
+        if sole_body:
+            replaced[tok.start[0]] = indent + "..."
+
+    for tok in tokens:
+        if tok.type == tokenize.COMMENT:
+            cut_at[tok.start[0]] = tok.start[1]
+
+    result: List[str] = []
+    for row, line in enumerate(lines, start=1):
+        if row in replaced:
+            if replaced[row] is not None:
+                result.append(replaced[row])
+            continue
+        if row in protected:
+            result.append(line)
+            continue
+        if row in cut_at:
+            line = line[:cut_at[row]]
+        line = line.rstrip()
+        if line:
+            result.append(line)
+    return "\n".join(result)
+
+
+class PromptBuilder:
+    """Builds prompts from templates within a per-prompt token budget."""
+
+    def __init__(self, counter: Optional[TokenCounter] = None):
+        """Initialize the builder.
+
+        Args:
+            counter: Token counter, defaults to the PROMPT_TOKENIZER setting
+        """
+        self.counter = counter or get_token_counter(settings.prompt_tokenizer)
+
+    def build(self, name: str, template: str, sources: Dict[str, str], source_language: str = "",
+              instructions: str = "", **values: Any) -> Prompt:
+        """Render a prompt template.
+
+        The template is dedented first, so the substituted code keeps its own
+        indentation. Sources are compressed according to the settings and, if
+        the prompt exceeds the budget for ``name``, truncated to fit.
+
+        Args:
+            name: Prompt name, used for the budget, metrics and logs
+            template: ``str.format`` template of the per-call part
+            sources: Source code fields of the template
+            source_language: Language of the sources (CodeLanguage value)
+            instructions: ``str.format`` template of the static prefix; it
+                must only use values that are the same for every call of
+                this prompt (never sources)
+            **values: Other template fields
+
+        Returns:
+            Rendered prompt
+        """
+        prefix = textwrap.dedent(instructions).strip().format(**values) + "\n\n" if instructions else ""
+        body = textwrap.dedent(template).strip() + "\n"
+        naive_tokens = self.counter.count(instructions.format(**values) + template.format(**values, **sources))
+        identity = prefix + body.format(**values, **{
+            key: f"<{source_language or 'source'} {code_fingerprint(code, source_language)}>"
+            for key, code in sources.items()
+        })
+
+        if settings.prompt_compress_source:
+            sources = {
+                key: compress_source(code, source_language, settings.prompt_strip_docstrings)
+                for key, code in sources.items()
+            }
+        prompt = Prompt(prefix, body.format(**values, **sources))
+        tokens = self.counter.count(prompt)
+
+        budget = settings.prompt_token_budget(name)
+        truncated = False
+        if tokens > budget and sources:
+            prompt, tokens = self._fit_budget(prefix, body, sources, values, tokens, budget)
+            truncated = True
+            prompt_truncations.inc(prompt=name)
+        prompt.identity = identity
+        prompt.name = name
+        prompt.tokens = tokens
+
+        saved = max(0, naive_tokens - tokens)
+        prompt_tokens.observe(tokens, prompt=name)
+        prompt_tokens_saved.inc(saved, prompt=name)
+        logger.info(
+            f"Prompt {name}: {tokens} tokens ({self.counter.name}, {self.counter.count(prefix)} static prefix), "
+            f"{saved} saved of {naive_tokens}{', truncated to budget' if truncated else ''}"
+        )
+        return prompt
+
+    def _fit_budget(self, prefix: str, body: str, sources: Dict[str, str], values: Dict[str, Any],
+                    tokens: int, budget: int) -> Tuple[Prompt, int]:
+        """Truncate the sources proportionally so the prompt fits the budget."""
+        source_tokens = {key: self.counter.count(code) for key, code in sources.items()}
+        overhead = tokens - sum(source_tokens.values())
+        available = max(0, budget - overhead)
+        total = max(1, sum(source_tokens.values()))
+
+        fitted = {
+            key: self._truncate(code, int(available * source_tokens[key] / total))
+            for key, code in sources.items()
+        }
+        prompt = Prompt(prefix, body.format(**values, **fitted))
+        tokens = self.counter.count(prompt)
+        if tokens > budget:
+            logger.warning(f"Prompt template alone exceeds the token budget ({tokens} > {budget})")
+        return prompt, tokens
+
+    def _truncate(self, code: str, max_tokens: int) -> str:
+        """Keep whole leading lines of ``code`` within ``max_tokens``."""
+        lines = code.splitlines()
+        kept: List[str] = []
+        used = 0
+        for line in lines:
+            cost = self.counter.count(line + "\n")
+            if used + cost > max_tokens:
+                break
+            kept.append(line)
+            used += cost
+        omitted = len(lines) - len(kept)
+        if omitted:
+            kept.append(f"... ({omitted} more lines omitted to fit the prompt token budget)")
+        return "\n".join(kept)
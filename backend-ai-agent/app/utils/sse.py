@@ -0,0 +1,52 @@
+"""Server-Sent Events helpers."""
+
+import json
+from typing import Any, AsyncIterator, Dict
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Disable proxy buffering (nginx) so events reach the client immediately
+    "X-Accel-Buffering": "no",
+}
+
+def format_sse(event: str, data: Any) -> str:
+    """Format a single Server-Sent Event.
+
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+
+    Returns:
+        Encoded event ready to be written to the response stream
+    """
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+async def relay_llm_events(llm_events: AsyncIterator[Dict[str, Any]], result: Dict[str, Any]) -> AsyncIterator[str]:
+    """Forward streamed LLM events as SSE, collecting the decoded object.
+
+    Errors are reported as an ``error`` event rather than raised, so the
+    caller can still finish the stream with the static results.
+
+    Args:
+        llm_events: Event iterator from one of the LLMService stream methods
+        result: Dict that receives the final decoded LLM object
+
+    Yields:
+        Encoded ``token``, ``field`` and ``error`` events
+    """
+    try:
+        async for event in llm_events:
+            if event["type"] == "token":
+                yield format_sse("token", {"text": event["text"]})
+            elif event["type"] == "field":
+                yield format_sse("field", {"field": event["field"], "value": event["value"]})
+            elif event["type"] == "result":
+                result.update(event["value"])
+    except Exception as e:
+        error = {"stage": "llm", "error": str(e)}
+        retry_after = getattr(e, "retry_after", None)
+        if retry_after is not None:
+            error["retry_after"] = retry_after
+        yield format_sse("error", error)
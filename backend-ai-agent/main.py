@@ -12,7 +12,16 @@ from fastapi.staticfiles import StaticFiles
 from app.utils.config_basic import get_settings, create_directories
 from app.utils.logger import setup_logging, get_logger
 from app.models.schemas import HealthResponse, ErrorResponse
-from app.api import analysis, conversion, testing, health
+from app.api import analysis, conversion, testing, health, metrics, pipeline
+from app.services.llm_clients import get_client_registry
+from app.utils.pipeline import shutdown_offload_executor
+from app.services.model_warmup import get_model_warmer
+from app.services.similar_code import current_retrievals, get_similar_code_store
+from app.services.job_queue import get_job_queue
+from app.services.result_store import get_result_store
+from app.services.admission import LLMOverloadedError
+from app.services.llm_telemetry import current_endpoint, endpoint_label
+from app.utils.deadline import current_deadline, deadline_from_headers
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -41,10 +50,36 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info(f"Ollama host: {settings.ollama_host}")
     logger.info(f"Ollama model: {settings.ollama_model}")
     
+    # Open pooled keep-alive connections to the LLM providers
+    client_registry = get_client_registry()
+    await client_registry.startup()
+    
+    # Load the model in the background; /api/v1/health/ready reports 503 until done
+    model_warmer = get_model_warmer()
+    await model_warmer.start()
+    
+    # Open the similar-code collection now rather than on the first request
+    similar_code_store = get_similar_code_store()
+    if similar_code_store:
+        await similar_code_store.open()
+    
+    # Open the result store and start retention compaction
+    result_store = get_result_store()
+    await result_store.start()
+    
+    # Run asynchronous jobs, including those queued before a restart
+    job_queue = get_job_queue()
+    await job_queue.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down CodeSage AI Agent Backend...")
+    await job_queue.stop()
+    await result_store.stop()
+    await model_warmer.stop()
+    await client_registry.shutdown()
+    shutdown_offload_executor()
     logger.info("Application shutdown complete")
 
 # Create FastAPI application
@@ -89,6 +124,24 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
         content=error_response.model_dump(mode='json')
     )
 
+# LLM admission control rejections
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError) -> JSONResponse:
+    """Turn admission rejections into fast 429/503 responses with Retry-After."""
+    request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
+    
+    error_response = ErrorResponse(
+        error="LLM service is busy, please retry later",
+        detail=str(exc),
+        request_id=request_id
+    )
+    
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=error_response.model_dump(mode='json'),
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # General exception handler
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
@@ -117,6 +170,12 @@ async def add_request_id(request: Request, call_next):
     """Add request ID to all requests."""
     request_id = str(uuid.uuid4())
     request.state.request_id = request_id
+    # LLM telemetry is labelled with the route that triggered the call
+    current_endpoint.set(endpoint_label(request))
+    # Budget from the caller's X-Request-Timeout; optional LLM stages that do not fit are skipped
+    current_deadline.set(deadline_from_headers(request.headers))
+    # Stored LLM results used by the request, reported as retrieved/similarity
+    current_retrievals.set([])
     
     response = await call_next(request)
     response.headers["X-Request-ID"] = request_id
@@ -128,6 +187,8 @@ app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(analysis.router, prefix="/api/v1", tags=["analysis"])
 app.include_router(conversion.router, prefix="/api/v1", tags=["conversion"])
 app.include_router(testing.router, prefix="/api/v1", tags=["testing"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
+app.include_router(pipeline.router, prefix="/api/v1", tags=["pipeline"])
 
 # Root endpoint
 @app.get("/", response_model=dict)
@@ -0,0 +1,326 @@
+"""Local stand-in for an LLM server, for offline load and latency testing.
+
+Speaks enough of the Ollama (``/api/generate``, ``/api/tags``) and
+OpenAI-compatible (``/chat/completions``, ``/v1/chat/completions``)
+protocols for the backend to run against it without a GPU. Responses follow
+the requested JSON schema (Ollama ``format`` / OpenAI ``response_format``)
+and are produced at a configurable speed: a time to first token drawn from a
+latency distribution plus prompt prefill, then tokens at a given rate.
+Errors and hanging requests can be injected at fixed rates.
+
+Usage:
+    python scripts/fake_llm_server.py --port 11435 --ttft lognormal:0.3,0.5 --tps 40 --parallel 4
+    OLLAMA_HOST=http://localhost:11435 DEEPSEEK_BASE_URL=http://localhost:11435 uvicorn main:app
+    python scripts/load_test.py --url http://localhost:8000 --concurrency 16
+
+Latency distributions: ``fixed:S``, ``uniform:MIN,MAX``, ``normal:MEAN,STD``
+and ``lognormal:MEDIAN,SIGMA`` (seconds).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_OBJECT = {
+    "business_logic_summary": "Computes order totals and applies tier discounts.",
+    "key_functions": ["apply_discount: applies the customer tier discount"],
+    "data_flow": "Order total and tier in, discounted total out.",
+    "business_rules": ["Gold customers get 20% off", "Silver customers get 10% off"],
+    "recommendations": ["Move discount rates to configuration"],
+}
+
+
+def parse_distribution(spec: str) -> Callable[[], float]:
+    """Build a sampler from a ``kind:params`` latency spec.
+
+    Args:
+        spec: e.g. "fixed:0.2", "uniform:0.1,0.5", "normal:0.3,0.05", "lognormal:0.3,0.5"
+
+    Returns:
+        Function returning a non-negative sample in seconds
+    """
+    kind, _, raw = spec.partition(":")
+    params = [float(p) for p in raw.split(",") if p]
+    samplers = {
+        "fixed": lambda: params[0],
+        "uniform": lambda: random.uniform(params[0], params[1]),
+        "normal": lambda: random.gauss(params[0], params[1]),
+        "lognormal": lambda: params[0] * math.exp(random.gauss(0.0, params[1])),
+    }
+    if kind not in samplers:
+        raise argparse.ArgumentTypeError(f"unknown latency distribution {kind!r}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (four characters per token)."""
+    return max(1, math.ceil(len(text) / 4))
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into pseudo-tokens of about four characters."""
+    return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+def sample_from_schema(schema: Dict[str, Any], name: str = "value") -> Any:
+    """Produce a value that satisfies a (simple) JSON schema.
+
+    Args:
+        schema: JSON schema
+        name: Property name, used to make sample strings readable
+
+    Returns:
+        Schema-valid sample value
+    """
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "string")
+    if kind == "object":
+        return {key: sample_from_schema(sub, key) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [sample_from_schema(schema.get("items", {}), f"{name}_{i}") for i in range(2)]
+    if kind == "integer":
+        return 42
+    if kind == "number":
+        return 75.0
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return f"sample {name.replace('_', ' ')}"
+
+
+class FakeLLM:
+    """Shared generation behaviour of both protocols."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.ttft = parse_distribution(args.ttft)
+        self.slots = asyncio.Semaphore(args.parallel)
+        self.loaded_until = 0.0
+        # Prefixes (system prompts) currently held in the simulated KV/prompt cache
+        self.prefixes: "OrderedDict[str, float]" = OrderedDict()
+        self.requests = 0
+
+    def output(self, schema: Optional[Dict[str, Any]], json_mode: bool) -> str:
+        """Canned output: schema-valid JSON, generic JSON, or plain text."""
+        if schema:
+            return json.dumps(sample_from_schema(schema))
+        if json_mode:
+            return json.dumps(DEFAULT_OBJECT)
+        return "This is a canned response from the fake LLM server. " * 4
+
+    def cached_tokens(self, prefix: str) -> int:
+        """Simulate a prefix cache: prefixes seen recently count as cached."""
+        if not prefix:
+            return 0
+        digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        hit = digest in self.prefixes
+        self.prefixes[digest] = time.monotonic()
+        self.prefixes.move_to_end(digest)
+        while len(self.prefixes) > self.args.parallel:
+            self.prefixes.popitem(last=False)
+        return count_tokens(prefix) if hit else 0
+
+    def injected_failure(self) -> Optional[str]:
+        """Decide whether this request fails ("error"), hangs ("timeout") or succeeds (None)."""
+        roll = random.random()
+        if roll < self.args.error_rate:
+            return "error"
+        if roll < self.args.error_rate + self.args.timeout_rate:
+            return "timeout"
+        return None
+
+    async def generate(self, prompt_tokens: int, cached: int, text: str,
+                       max_tokens: Optional[int]) -> AsyncIterator[Tuple[str, Dict[str, float]]]:
+        """Emit the output token by token at the configured speed.
+
+        Yields:
+            (token, timings) pairs; timings holds the load, prefill and
+            generation durations in seconds so far
+        """
+        tokens = split_tokens(text)
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        async with self.slots:
+            self.requests += 1
+            now = time.monotonic()
+            load = self.args.load_time if now > self.loaded_until else 0.0
+            self.loaded_until = now + self.args.keep_alive
+            prefill = (prompt_tokens - cached) / self.args.prefill_tps
+            await asyncio.sleep(load + prefill + self.ttft())
+            timings = {"load": load, "prefill": prefill, "eval": 0.0}
+            start = time.monotonic()
+            for token in tokens:
+                jitter = random.uniform(1 - self.args.tps_jitter, 1 + self.args.tps_jitter)
+                await asyncio.sleep(1.0 / (self.args.tps * jitter))
+                timings["eval"] = time.monotonic() - start
+                yield token, timings
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    """Build the fake server application."""
+    app = FastAPI(title="Fake LLM server")
+    llm = FakeLLM(args)
+
+    async def failure_response(kind: str) -> JSONResponse:
+        if kind == "timeout":
+            await asyncio.sleep(args.hang_seconds)
+        status = random.choice(args.error_status)
+        return JSONResponse({"error": f"injected failure ({status})"}, status_code=status)
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name, "model": name, "size": 0} for name in args.models]}
+
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        body = await request.json()
+        failure = llm.injected_failure()
+        if failure:
+            return await failure_response(failure)
+
+        system, prompt = body.get("system", ""), body.get("prompt", "")
+        fmt = body.get("format")
+        text = llm.output(fmt if isinstance(fmt, dict) else None, fmt == "json")
+        prompt_tokens = count_tokens(system + prompt)
+        cached = llm.cached_tokens(system)
+        max_tokens = (body.get("options") or {}).get("num_predict")
+        model = body.get("model", args.models[0])
+        started = time.monotonic()
+
+        def final(timings: Dict[str, float], emitted: int, done_reason: str) -> Dict[str, Any]:
+            return {
+                "model": model,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "response": "",
+                "done": True,
+                "done_reason": done_reason,
+                "total_duration": int((time.monotonic() - started) * 1e9),
+                "load_duration": int(timings["load"] * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(timings["prefill"] * 1e9),
+                "eval_count": emitted,
+                "eval_duration": int(timings["eval"] * 1e9),
+            }
+
+        total = len(split_tokens(text))
+        if body.get("stream", True):
+            async def chunks() -> AsyncIterator[str]:
+                emitted, timings = 0, {"load": 0.0, "prefill": 0.0, "eval": 0.0}
+                async for token, timings in llm.generate(prompt_tokens, cached, text, max_tokens):
+                    emitted += 1
+                    yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+                yield json.dumps(final(timings, emitted, "stop" if emitted == total else "length")) + "\n"
+            return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+        pieces, timings = [], {"load": 0.0, "prefill": 0.0, "eval": 0.0}
+        async for token, timings in llm.generate(prompt_tokens, cached, text, max_tokens):
+            pieces.append(token)
+        return {**final(timings, len(pieces), "stop" if len(pieces) == total else "length"),
+                "response": "".join(pieces)}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = llm.injected_failure()
+        if failure:
+            return await failure_response(failure)
+
+        messages = body.get("messages", [])
+        system = "".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        prompt_tokens = count_tokens("".join(m.get("content", "") for m in messages))
+        cached = llm.cached_tokens(system)
+        response_format = body.get("response_format") or {}
+        schema = (response_format.get("json_schema") or {}).get("schema")
+        text = llm.output(schema, response_format.get("type") == "json_object")
+        model = body.get("model", args.models[0])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        total = len(split_tokens(text))
+
+        def usage(emitted: int) -> Dict[str, Any]:
+            return {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": emitted,
+                "total_tokens": prompt_tokens + emitted,
+                "prompt_tokens_details": {"cached_tokens": cached},
+                "prompt_cache_hit_tokens": cached,
+                "prompt_cache_miss_tokens": prompt_tokens - cached,
+            }
+
+        if body.get("stream"):
+            async def events() -> AsyncIterator[str]:
+                emitted = 0
+                async for token, _ in llm.generate(prompt_tokens, cached, text, body.get("max_tokens")):
+                    emitted += 1
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop" if emitted == total else "length"}],
+                         "usage": usage(emitted)}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        pieces = [token async for token, _ in llm.generate(prompt_tokens, cached, text, body.get("max_tokens"))]
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(pieces)},
+                "finish_reason": "stop" if len(pieces) == total else "length",
+            }],
+            "usage": usage(len(pieces)),
+        }
+
+    app.post("/chat/completions")(chat_completions)
+    app.post("/v1/chat/completions")(chat_completions)
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": llm.requests, "cached_prefixes": len(llm.prefixes)}
+
+    return app
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake Ollama / OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", nargs="+", default=["llama3.2"], help="models listed by /api/tags")
+    parser.add_argument("--ttft", default="lognormal:0.3,0.4",
+                        help="latency distribution added before the first token (seconds)")
+    parser.add_argument("--tps", type=float, default=40.0, help="generated tokens per second")
+    parser.add_argument("--tps-jitter", type=float, default=0.2, help="relative jitter of the token rate")
+    parser.add_argument("--prefill-tps", type=float, default=2000.0, help="prompt tokens evaluated per second")
+    parser.add_argument("--load-time", type=float, default=0.0,
+                        help="model load time paid by the first request after --keep-alive seconds idle")
+    parser.add_argument("--keep-alive", type=float, default=300.0)
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent generations, like OLLAMA_NUM_PARALLEL")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing immediately")
+    parser.add_argument("--error-status", type=int, nargs="+", default=[500, 503])
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=600.0, help="how long hanging requests hang")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible runs")
+    args = parser.parse_args()
+    parse_distribution(args.ttft)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,99 @@
+"""Concurrency load test for the AI Agent backend.
+
+Fires a burst of concurrent LLM-backed requests at a running server while
+polling the health endpoint, then reports whether the requests overlapped
+or were serialized behind each other.
+
+Usage:
+    python scripts/load_test.py --url http://localhost:8000 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+SAMPLE_CODE = '''
+def apply_discount(order_total, customer_tier):
+    if customer_tier == "gold":
+        return order_total * 0.8
+    if customer_tier == "silver":
+        return order_total * 0.9
+    return order_total
+'''
+
+
+async def timed_request(client: httpx.AsyncClient, index: int, t0: float) -> Dict[str, Any]:
+    """Send one analysis request and record when it started and finished."""
+    start = time.perf_counter() - t0
+    response = await client.post(
+        "/api/v1/analyze",
+        json={"code": SAMPLE_CODE + f"\n# request {index}\n", "language": "python"},
+    )
+    end = time.perf_counter() - t0
+    return {"index": index, "start": start, "end": end, "status": response.status_code}
+
+
+async def poll_health(client: httpx.AsyncClient, stop: asyncio.Event) -> List[float]:
+    """Measure /health latency while the burst is running."""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.2)
+    return latencies
+
+
+def max_overlap(results: List[Dict[str, Any]]) -> int:
+    """Return the largest number of requests that were in flight at once."""
+    events = []
+    for r in results:
+        events.append((r["start"], 1))
+        events.append((r["end"], -1))
+    in_flight = peak = 0
+    for _, delta in sorted(events, key=lambda e: (e[0], e[1])):
+        in_flight += delta
+        peak = max(peak, in_flight)
+    return peak
+
+
+async def main(url: str, concurrency: int, timeout: float) -> None:
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        stop = asyncio.Event()
+        health_task = asyncio.create_task(poll_health(client, stop))
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(timed_request(client, i, t0) for i in range(concurrency)))
+        wall = time.perf_counter() - t0
+
+        stop.set()
+        health_latencies = await health_task
+
+    busy = sum(r["end"] - r["start"] for r in results)
+    for r in sorted(results, key=lambda r: r["start"]):
+        print(f"request {r['index']:>3}: {r['start']:7.2f}s -> {r['end']:7.2f}s  HTTP {r['status']}")
+
+    print()
+    print(f"wall time:              {wall:.2f}s")
+    print(f"sum of request times:   {busy:.2f}s")
+    print(f"effective parallelism:  {busy / wall if wall else 0:.2f}x")
+    print(f"peak requests in flight: {max_overlap(results)}/{concurrency}")
+    if health_latencies:
+        print(f"/health latency during burst: max {max(health_latencies) * 1000:.0f} ms "
+              f"over {len(health_latencies)} probes")
+
+    if max_overlap(results) <= 1 and concurrency > 1:
+        print("\nWARNING: requests ran one after another - the event loop is being blocked")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for LLM-backed endpoints")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running service")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of simultaneous requests")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.concurrency, args.timeout))
@@ -0,0 +1,25 @@
+"""Tests for the static analysis cache."""
+
+import asyncio
+
+from app.services.analysis_cache import StaticAnalysisCache
+from app.services.code_analyzer import CodeAnalyzer
+
+
+def test_key_covers_comments_and_layout():
+    cache = StaticAnalysisCache(max_entries=8)
+    plain = cache.key("python2", "x = 1\n", "python")
+    assert cache.key("python2", "x = 1\n", "python") == plain
+    assert cache.key("python2", "x = 1  # was: xrange(10)\n", "python") != plain
+    assert cache.key("python2", "x  =  1\n", "python") != plain
+
+
+def test_python2_issues_in_comments_are_not_served_from_cache():
+    analyzer = CodeAnalyzer()
+    analyzer.cache = StaticAnalysisCache(max_entries=8)
+
+    clean = asyncio.run(analyzer.analyze_python2_specific("x = 1\n"))
+    commented = asyncio.run(analyzer.analyze_python2_specific("x = 1  # was: for i in xrange(10)\n"))
+
+    assert clean["python3_issues"] == []
+    assert [issue["pattern"] for issue in commented["python3_issues"]] == [r"xrange\s*\("]
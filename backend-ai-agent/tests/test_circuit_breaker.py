@@ -0,0 +1,102 @@
+"""Tests for the circuit breaker state machine."""
+
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    """Replaces time.monotonic in the breaker module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", failure_threshold=2, recovery_timeout=10, max_recovery_timeout=25)
+
+
+def fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(RuntimeError):
+        with breaker.protect():
+            raise RuntimeError("boom")
+
+
+def succeed(breaker: CircuitBreaker) -> None:
+    with breaker.protect():
+        pass
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        succeed(breaker)
+
+
+def test_success_resets_failure_count(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    succeed(breaker)
+    fail(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    fail(breaker)
+
+    clock.now += 10
+    with breaker.protect():
+        assert breaker.state == HALF_OPEN
+        # Only one probe at a time while half-open
+        with pytest.raises(CircuitOpenError):
+            succeed(breaker)
+    assert breaker.state == CLOSED
+    assert breaker.recovery_timeout == 10
+
+
+def test_half_open_probe_failure_reopens_with_backoff(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    fail(breaker)
+
+    clock.now += 10
+    fail(breaker)
+    assert breaker.state == OPEN
+    assert breaker.recovery_timeout == 20
+
+    clock.now += 19
+    with pytest.raises(CircuitOpenError):
+        succeed(breaker)
+
+    clock.now += 1
+    fail(breaker)
+    # Backoff is capped at max_recovery_timeout
+    assert breaker.recovery_timeout == 25
+
+
+def test_ignored_errors_do_not_count(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            with breaker.protect(ignore=(KeyError,)):
+                raise KeyError("not the provider's fault")
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
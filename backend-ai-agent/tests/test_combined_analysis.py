@@ -0,0 +1,61 @@
+"""Tests for answering several pipeline tasks with one generation."""
+
+import asyncio
+import json
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_service import LLMService
+
+CODE = "print 'total', sum(items)\n"
+
+
+class Stream:
+    def __init__(self, text):
+        self.chunks = [{"response": text}, {"response": "", "done": True, "eval_count": 1}]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self):
+        pass
+
+
+class Client:
+    """Answers the combined prompt without shadow scenarios, and any other prompt with them."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt="", system="", **kwargs):
+        self.calls += 1
+        if "python2_migration" in system + prompt:
+            return Stream(json.dumps({"python2_migration": {"issues": []}}))
+        return Stream(json.dumps({"shadow_scenarios": []}))
+
+
+def service():
+    llm = LLMService()
+    llm.client = Client()
+    llm.cache = LLMResponseCache(ttl=60, max_entries=16, max_bytes=1 << 20)
+    llm.similar = None
+    llm.batcher = None
+    return llm
+
+
+def test_counts_only_generations_sent_to_the_model():
+    llm = service()
+    tasks = ["python2_migration", "shadow_scenarios"]
+
+    results, generations = asyncio.run(llm.analyze_combined(CODE, tasks))
+    assert set(results) == set(tasks)
+    assert generations == llm.client.calls == 2
+
+    # Both the combined and the follow-up generation are cached now
+    results, generations = asyncio.run(llm.analyze_combined(CODE, tasks))
+    assert set(results) == set(tasks)
+    assert generations == 0
+    assert llm.client.calls == 2
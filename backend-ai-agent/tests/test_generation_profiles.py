@@ -0,0 +1,39 @@
+"""Tests for choosing the context size (Ollama num_ctx) of generations."""
+
+import pytest
+
+from app.services import generation_profiles
+from app.services.generation_profiles import context_size, default_context_size
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    settings = generation_profiles.settings
+    monkeypatch.setattr(settings, "llm_context_min", 2048)
+    monkeypatch.setattr(settings, "llm_context_max", 32768)
+    monkeypatch.setattr(settings, "llm_context_per_request", False)
+    monkeypatch.setattr(settings, "prompt_token_budget", lambda prompt: 3000)
+    return settings
+
+
+def test_all_generations_share_one_context_size(limits):
+    # 3000 tokens * 1.2 margin + largest cap 2048 = 5648
+    assert default_context_size() == 8192
+    assert {context_size(tokens, 384) for tokens in (10, 1000, 3000)} == {8192}
+
+
+def test_only_prompts_that_do_not_fit_get_more(limits):
+    assert context_size(8000, 1024) == 16384
+    assert context_size(40000, 1024) == 32768
+
+
+def test_per_request_sizing_is_opt_in(limits, monkeypatch):
+    monkeypatch.setattr(limits, "llm_context_per_request", True)
+    assert context_size(100, 384) == 2048
+    assert context_size(3000, 1024) == 8192
+
+
+def test_context_size_left_to_server(limits, monkeypatch):
+    monkeypatch.setattr(limits, "llm_context_max", 0)
+    assert default_context_size() is None
+    assert context_size(100, 384) is None
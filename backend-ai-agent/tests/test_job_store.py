@@ -0,0 +1,119 @@
+"""Tests for the persistent job store and abandoned job detection."""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from app.services.job_queue import JobQueue, JobStore
+
+
+def job(status="queued"):
+    return {
+        "job_id": str(uuid.uuid4()),
+        "kind": "analyze",
+        "status": status,
+        "progress": 0.0,
+        "stage": None,
+        "error": None,
+        "created_at": "2026-01-01T00:00:00",
+        "started_at": None,
+        "finished_at": None,
+        "payload": {},
+        "result": None,
+    }
+
+
+def age(store, job_id, seconds):
+    """Move a job's files back in time."""
+    past = time.time() - seconds
+    for suffix in (".json", ".claim"):
+        path = store._path(job_id, suffix)
+        if path.exists():
+            os.utime(path, (past, past))
+
+
+def test_purge_deletes_old_finished_and_abandoned_jobs(tmp_path):
+    store = JobStore(str(tmp_path))
+    old_done, new_done, old_queued, old_claimed = job("succeeded"), job("failed"), job(), job()
+    for record in (old_done, new_done, old_queued, old_claimed):
+        store.create(record)
+    for record in (old_done, new_done, old_claimed):
+        store.claim(record["job_id"])
+    for record in (old_done, old_queued, old_claimed):
+        age(store, record["job_id"], 3600)
+
+    assert store.purge(time.time() - 60) == 2
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([
+        f"{new_done['job_id']}.json", f"{new_done['job_id']}.claim", f"{old_queued['job_id']}.json"
+    ])
+
+
+def test_claimed_job_left_queued_is_abandoned(tmp_path):
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(store, workers=1, max_queued=10, timeout=10)
+    fresh, stale, unclaimed = job(), job(), job()
+    for record in (fresh, stale, unclaimed):
+        store.create(record)
+        age(store, record["job_id"], 3600)
+    store.claim(fresh["job_id"])
+    store.claim(stale["job_id"])
+    age(store, stale["job_id"], 3600)
+
+    assert asyncio.run(queue.get(fresh["job_id"]))["status"] == "queued"
+    assert asyncio.run(queue.get(unclaimed["job_id"]))["status"] == "queued"
+    abandoned = asyncio.run(queue.get(stale["job_id"]))
+    assert abandoned["status"] == "failed"
+    assert json.loads(store._path(stale["job_id"]).read_text())["status"] == "failed"
+
+
+def test_only_one_worker_claims_a_job(tmp_path):
+    # Two processes sharing JOB_STORE_DIR, each with its own store
+    first, second = JobStore(str(tmp_path)), JobStore(str(tmp_path))
+    record = job()
+    first.create(record)
+
+    async def claim_concurrently():
+        return await asyncio.gather(
+            asyncio.to_thread(first.claim, record["job_id"]),
+            asyncio.to_thread(second.claim, record["job_id"]),
+        )
+
+    assert sorted(asyncio.run(claim_concurrently())) == [False, True]
+    assert first.queued() == second.queued() == []
+    assert not first.claim(record["job_id"])
+
+
+def test_queued_job_runs_once_when_two_queues_pick_it_up(tmp_path):
+    runs = []
+
+    async def runner(job_id, payload):
+        runs.append(job_id)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def run():
+        queues = [JobQueue(JobStore(str(tmp_path)), workers=1, max_queued=10, timeout=10) for _ in range(2)]
+        for queue in queues:
+            queue.register("analyze", runner, "/api/v1/analyze/{job_id}")
+        record = job()
+        queues[0].store.create(record)
+        await asyncio.gather(*(queue._run(record["job_id"]) for queue in queues))
+        return await queues[1].get(record["job_id"])
+
+    finished = asyncio.run(run())
+    assert runs == [finished["job_id"]]
+    assert finished["status"] == "succeeded"
+
+
+def test_directory_is_created_on_first_write(tmp_path):
+    store = JobStore(str(tmp_path / "jobs"))
+    assert not store.directory.exists()
+    assert store.queued() == [] and store.load(str(uuid.uuid4())) is None
+
+    record = job()
+    assert store.create(record)
+    assert store.claim(record["job_id"])
+    assert store.directory.is_dir()
@@ -0,0 +1,37 @@
+"""Tests for completing truncated JSON output."""
+
+import pytest
+
+from app.utils.json_stream import repair_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"summary": "The function comp', {"summary": "The function comp"}),
+    ('{"items": [1, 2, 3', {"items": [1, 2, 3]}),
+    ('{"a": {"b": ["c", "d', {"a": {"b": ["c", "d"]}}),
+    ('{"a": 1, "b":', {"a": 1, "b": None}),
+    ('{"a": 1, "b', {"a": 1}),
+    ('{"a": 1,', {"a": 1}),
+    ('{"a": "x\\', {"a": "x"}),
+    ('{"a": "say \\"hi\\" and', {"a": 'say "hi" and'}),
+])
+def test_truncated_document_is_closed(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_cuts_back_to_last_complete_element():
+    # "tru" cannot be closed, so the document is cut at the preceding comma
+    assert repair_json('{"ok": true, "valid": tru') == {"ok": True}
+    assert repair_json('{"tests": [{"name": "a"}, {"name": "b", "cases": [1, nu') == {
+        "tests": [{"name": "a"}, {"name": "b", "cases": [1]}]
+    }
+
+
+def test_complete_document_ignores_trailing_text():
+    assert repair_json('{"a": [1, {"b": "}"}]} and some explanation') == {"a": [1, {"b": "}"}]}
+
+
+@pytest.mark.parametrize("text", ["", "not json", '{"a": tru'])
+def test_unrepairable_input_raises(text):
+    with pytest.raises(ValueError):
+        repair_json(text)
@@ -0,0 +1,40 @@
+"""Tests for caching responses of the v2 service across provider failover."""
+
+import asyncio
+
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_service_v2 import LLMService
+
+
+def service(down):
+    llm = LLMService()
+    llm.config = llm.config.model_copy(update={"provider": "ollama", "hedge_enabled": False})
+    llm.cache = LLMResponseCache(ttl=60, max_entries=16, max_bytes=1 << 20)
+    llm.inflight = None
+    llm._provider_chain = lambda: ["ollama", "openai"]
+    llm.calls = []
+
+    async def call_provider(provider, prompt, schema=None):
+        llm.calls.append(provider)
+        if provider in down:
+            raise ConnectionError(f"{provider} is down")
+        return f'{{"answer": "{provider}"}}'
+
+    llm._call_provider = call_provider
+    return llm
+
+
+def test_fallback_response_is_cached_under_its_own_provider():
+    llm = service(down={"ollama"})
+
+    assert asyncio.run(llm._call_llm("Analyze this code")) == '{"answer": "openai"}'
+    assert llm.calls == ["ollama", "openai"]
+    assert asyncio.run(llm.cache.get(llm._cache_key("openai", "Analyze this code"))) == '{"answer": "openai"}'
+    assert asyncio.run(llm.cache.get(llm._cache_key("ollama", "Analyze this code"))) is None
+
+    # Once the primary is back, it answers instead of the fallback's cached output
+    recovered = service(down=set())
+    recovered.cache = llm.cache
+    assert asyncio.run(recovered._call_llm("Analyze this code")) == '{"answer": "ollama"}'
+    assert asyncio.run(recovered._call_llm("Analyze this code")) == '{"answer": "ollama"}'
+    assert recovered.calls == ["ollama"]
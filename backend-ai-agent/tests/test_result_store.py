@@ -0,0 +1,91 @@
+"""Tests for finding earlier results of the same request in the result store."""
+
+import asyncio
+import sqlite3
+import time
+
+from pydantic import BaseModel
+
+from app.models.schemas import CodeAnalysisRequest, CodeLanguage
+from app.services.result_store import ResultStore
+
+
+class Result(BaseModel):
+    analysis_id: str
+    degraded: bool = False
+
+
+def store(tmp_path, reuse_hours=24):
+    return ResultStore(str(tmp_path / "results.db"), pool_size=1, retention_days=0,
+                       compact_interval=0, reuse_hours=reuse_hours)
+
+
+def request(code="x = 1\n", **fields):
+    return CodeAnalysisRequest(code=code, language=CodeLanguage.PYTHON, **fields)
+
+
+def test_finds_result_of_the_same_request_only(tmp_path):
+    results = store(tmp_path)
+    asyncio.run(results.save("analysis", "a1", "analyze", request(), Result(analysis_id="a1")))
+
+    assert asyncio.run(results.find("analysis", "analyze", request())) == {"analysis_id": "a1", "degraded": False}
+    assert asyncio.run(results.find("analysis", "analyze_python2", request())) is None
+    assert asyncio.run(results.find("analysis", "analyze", request("x = 2\n"))) is None
+    assert asyncio.run(results.find("analysis", "analyze", request(filename="billing.py"))) is None
+
+
+def test_skips_degraded_old_and_disabled_reuse(tmp_path):
+    results = store(tmp_path)
+    asyncio.run(results.save("analysis", "a1", "analyze", request(), Result(analysis_id="a1", degraded=True)))
+    assert asyncio.run(results.find("analysis", "analyze", request())) is None
+
+    asyncio.run(results.save("analysis", "a2", "analyze", request("y = 1\n"), Result(analysis_id="a2")))
+    with results._connection() as conn:
+        conn.execute("UPDATE results SET created_at = ? WHERE id = 'a2'", (time.time() - 25 * 3600,))
+    assert asyncio.run(results.find("analysis", "analyze", request("y = 1\n"))) is None
+
+    asyncio.run(results.save("analysis", "a3", "analyze", request("z = 1\n"), Result(analysis_id="a3")))
+    results.reuse_hours = 0
+    assert asyncio.run(results.find("analysis", "analyze", request("z = 1\n"))) is None
+
+
+def test_new_database_uses_incremental_auto_vacuum(tmp_path):
+    results = store(tmp_path)
+    with results._connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_compaction_returns_space(tmp_path):
+    results = store(tmp_path)
+    results.retention_days = 1
+    for i in range(50):
+        asyncio.run(results.save("analysis", f"a{i}", "analyze", request(f"x = {i}\n" * 200),
+                                 Result(analysis_id=f"a{i}" * 500)))
+    with results._connection() as conn:
+        conn.execute("UPDATE results SET created_at = 0")
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    assert results.compact() == 50
+    with results._connection() as conn:
+        assert conn.execute("PRAGMA page_count").fetchone()[0] < pages
+
+
+def test_migrates_database_of_earlier_versions(tmp_path):
+    path = tmp_path / "results.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE results (id TEXT PRIMARY KEY, kind TEXT NOT NULL, content_hash TEXT NOT NULL,
+                              created_at REAL NOT NULL, size INTEGER NOT NULL, payload BLOB NOT NULL);
+        CREATE INDEX results_content_hash ON results (content_hash, kind);
+    """)
+    conn.close()
+
+    results = store(tmp_path)
+    asyncio.run(results.save("analysis", "a1", "analyze", request(), Result(analysis_id="a1")))
+
+    assert asyncio.run(results.find("analysis", "analyze", request()))["analysis_id"] == "a1"
+    with results._connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert "request_hash" in [row[1] for row in conn.execute("PRAGMA table_info(results)")]
@@ -0,0 +1,88 @@
+"""Tests for validating streamed LLM output against the response schema."""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services import llm_service as llm_module
+from app.services.llm_service import LLMService
+from app.services.llm_tasks import RESPONSE_SCHEMAS
+from app.utils.json_stream import SchemaMismatchError
+
+# Off-schema but usable: key_functions as objects and an extra key
+OUTPUT = json.dumps({
+    "business_logic_summary": "Computes order totals.",
+    "key_functions": [{"name": "total", "purpose": "sums the items"}],
+    "data_flow": "items -> total",
+    "business_rules": ["Discounts apply above 100"],
+    "recommendations": [],
+    "confidence": 0.8,
+})
+
+
+class Stream:
+    def __init__(self, text):
+        self.chunks = [{"response": text[i:i + 16]} for i in range(0, len(text), 16)]
+        self.chunks.append({"response": "", "done": True, "eval_count": len(self.chunks)})
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self):
+        pass
+
+
+class Client:
+    def __init__(self):
+        self.formats = []
+
+    async def generate(self, format=None, **kwargs):
+        self.formats.append(format)
+        return Stream(OUTPUT)
+
+
+@pytest.fixture
+def llm():
+    service = LLMService()
+    service.client = Client()
+    return service
+
+
+def call(llm):
+    return asyncio.run(llm._call_ollama("Analyze this code", {"num_predict": 256}, RESPONSE_SCHEMAS["business_logic"]))
+
+
+def test_json_mode_output_is_not_held_to_the_schema(llm, monkeypatch):
+    monkeypatch.setattr(llm_module.settings, "llm_structured_output", False)
+
+    response = call(llm)
+
+    assert llm.client.formats == ["json"]
+    assert json.loads(response["response"])["key_functions"][0]["name"] == "total"
+
+
+def test_structured_output_aborts_on_divergence(llm, monkeypatch):
+    monkeypatch.setattr(llm_module.settings, "llm_structured_output", True)
+
+    with pytest.raises(SchemaMismatchError):
+        call(llm)
+    assert llm.client.formats == [RESPONSE_SCHEMAS["business_logic"]]
+
+
+def test_json_mode_stream_yields_all_fields(llm, monkeypatch):
+    monkeypatch.setattr(llm_module.settings, "llm_structured_output", False)
+    llm.cache = llm.similar = None
+
+    async def collect():
+        return [event async for event in llm._stream_json(
+            "Analyze this code", {"num_predict": 256}, RESPONSE_SCHEMAS["business_logic"]
+        )]
+
+    events = asyncio.run(collect())
+    assert [event["field"] for event in events if event["type"] == "field"][-1] == "confidence"
+    assert events[-1]["value"]["data_flow"] == "items -> total"
@@ -0,0 +1,80 @@
+"""Tests for reusing stored LLM results of the same or similar code."""
+
+import asyncio
+
+from app.services.llm_service import LLMService
+from app.services.similar_code import SimilarMatch, current_retrievals, retrieval
+from app.utils.prompt_builder import Prompt
+
+PREFIX = "Convert this Python 2 code to Python 3 and report whether it is valid."
+
+
+class Store:
+    """Similar-code store that always finds the same stored result."""
+
+    def __init__(self, match):
+        self.match = match
+        self.stored = []
+
+    async def lookup(self, task, text):
+        return self.match
+
+    async def store(self, id, task, text, response):
+        self.stored.append((id, text, response))
+
+
+def service(match):
+    llm = LLMService()
+    llm.cache = None
+    llm.inflight = None
+    llm.batcher = None
+    llm.similar = Store(match)
+    llm.sent = []
+
+    async def call_ollama(prompt, options, schema=None):
+        llm.sent.append(prompt)
+        return {"response": '{"valid": false}'}
+
+    llm._call_ollama = call_ollama
+    return llm
+
+
+def generate(llm, body):
+    async def run():
+        current_retrievals.set([])
+        response = await llm._generate(Prompt(PREFIX, body), {"temperature": 0.1})
+        return response, retrieval()
+    return asyncio.run(run())
+
+
+def stored_key(body):
+    """Cache key a previous request for ``body`` was stored under."""
+    llm = service(None)
+    asyncio.run(llm._generate(Prompt(PREFIX, body), {"temperature": 0.1}))
+    return llm.similar.stored[-1][0]
+
+
+def test_result_for_same_code_is_reused():
+    body = "total = sum(items)\nif total < 0: total = total * 0.8\n"
+    llm = service(SimilarMatch(stored_key(body), '{"valid": true}', 1.0, 0.001))
+
+    response, fields = generate(llm, body)
+
+    assert response["response"] == '{"valid": true}'
+    assert llm.sent == []
+    assert fields == {"retrieved": True, "similarity": 1.0}
+
+
+def test_result_for_similar_code_is_only_a_reference():
+    body = "total = sum(items)\nif total > 0: total = total * 1.8\n"
+    llm = service(SimilarMatch("key-of-other-code", '{"valid": true}', 0.974, 0.001))
+
+    response, fields = generate(llm, body)
+
+    assert response["response"] == '{"valid": false}'
+    [sent] = llm.sent
+    assert sent.prefix == PREFIX
+    assert '{"valid": true}' in sent.body and sent.body.endswith(body)
+    assert fields == {"retrieved": False, "similarity": 0.974}
+    # Stored under the request's own code, without the reference
+    assert llm.similar.stored[-1][1:] == (body, '{"valid": false}')
@@ -0,0 +1,84 @@
+"""Tests for single-flight coalescing of in-flight calls."""
+
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+class Generation:
+    """Call that runs until released and records how often it started."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "result"
+
+
+async def test_concurrent_callers_share_one_call():
+    group = SingleFlight("test")
+    generation = Generation()
+    waiters = [asyncio.create_task(group.do("key", generation)) for _ in range(3)]
+    await asyncio.sleep(0)
+    generation.release.set()
+
+    assert await asyncio.gather(*waiters) == ["result"] * 3
+    assert generation.calls == 1
+    assert group.in_flight() == 0
+
+
+async def test_cancelled_waiter_does_not_abort_shared_call():
+    group = SingleFlight("test")
+    generation = Generation()
+    first = asyncio.create_task(group.do("key", generation))
+    second = asyncio.create_task(group.do("key", generation))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert not generation.cancelled
+    assert group.in_flight() == 1
+
+    generation.release.set()
+    assert await second == "result"
+    assert generation.calls == 1
+
+
+async def test_last_waiter_cancelled_aborts_call():
+    group = SingleFlight("test")
+    generation = Generation()
+    waiters = [asyncio.create_task(group.do("key", generation)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert generation.cancelled
+    assert group.in_flight() == 0
+
+
+async def test_new_call_starts_after_abort():
+    group = SingleFlight("test")
+    aborted = Generation()
+    waiter = asyncio.create_task(group.do("key", aborted))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    fresh = Generation()
+    fresh.release.set()
+    assert await group.do("key", fresh) == "result"
+    assert fresh.calls == 1
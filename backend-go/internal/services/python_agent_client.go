@@ -7,6 +7,7 @@ import (
 	"fmt"
 	"io"
 	"net/http"
+	"strconv"
 	"time"
 
 	"github.com/xiaocainiao633/Code_agent/backend-go/internal/config"
@@ -142,6 +143,10 @@ func (c *PythonAgentClient) doRequest(ctx context.Context, url string, body []by
 	// 设置请求头
 	req.Header.Set("Accept", "application/json")
 	req.Header.Set("User-Agent", "CodeSage-Go-Backend/1.0")
+	// 告知 Python 服务本次请求的时间预算，超出预算的可选 LLM 步骤会被跳过并返回降级结果
+	if timeout, ok := c.requestTimeout(ctx); ok {
+		req.Header.Set("X-Request-Timeout", strconv.FormatFloat(timeout.Seconds(), 'f', 3, 64))
+	}
 
 	utils.Debug("Calling Python Agent API: %s", url)
 
@@ -172,6 +177,17 @@ func (c *PythonAgentClient) doRequest(ctx context.Context, url string, body []by
 	return result, nil
 }
 
+// requestTimeout 计算本次请求的剩余时间：HTTP 客户端超时与 ctx 截止时间中较早者
+func (c *PythonAgentClient) requestTimeout(ctx context.Context) (time.Duration, bool) {
+	timeout := c.httpClient.Timeout
+	if deadline, ok := ctx.Deadline(); ok {
+		if remaining := time.Until(deadline); timeout <= 0 || remaining < timeout {
+			timeout = remaining
+		}
+	}
+	return timeout, timeout > 0
+}
+
 // shouldRetry 判断是否应该重试
 func (c *PythonAgentClient) shouldRetry(err error) bool {
 	// 网络错误重试